@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基于asyncio的串口传输
+在端口文件描述符上用loop.add_reader等待数据，一个事件循环即可驱动
+几十个串口，不需要每个串口一个线程。用于无界面的桥接和自动化测试。
+
+仅支持提供文件描述符的平台（Linux/macOS）；Windows请使用SerialThread。
+
+无界面桥接用法：
+    python async_serial.py PORT [PORT ...] [--baudrate 115200] [--config 映射配置.json]
+                           [--on-change] [--keepalive 1000]
+每个串口收到的5A输入帧按映射配置转换为A5输出帧后写回同一串口（帧格式取自映射配置中的frame_layout），
+映射和CRC逻辑与主界面的convert_data相同（mapping_engine.MappingEngine）。
+--on-change时只在输出帧变化时写回，输出不变时每隔--keepalive毫秒重发一次。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from collections import deque
+
+import serial
+
+from frame_assembler import FrameAssembler
+from mapping_engine import MappingEngine
+from output_gate import OutputGate
+
+
+class AsyncSerialPort:
+    """单个串口的asyncio传输
+
+    frame_assembler不为None时read_frame()返回完整帧，否则返回到达的原始数据块。
+    尚未被读取的数据最多保留max_pending项，超出时丢弃最旧的并计入dropped_count。
+    """
+
+    def __init__(self, port, baudrate=115200, frame_assembler=None, max_pending=1024, **serial_kwargs):
+        self.port = port
+        self.baudrate = baudrate
+        self.frame_assembler = frame_assembler
+        self.serial_kwargs = serial_kwargs
+        self.ser = None
+        self.rx_count = 0
+        self.tx_count = 0
+        self.dropped_count = 0  # 因读取不及时被丢弃的帧数
+        self._pending = deque(maxlen=max_pending)
+        self._loop = None
+        self._fd = None
+        self._readable = None  # 有数据可读时置位
+        self._write_lock = None
+        self._writer_future = None  # 等待可写时的future，关闭时以ConnectionError结束
+        self._error = None
+
+    @property
+    def is_open(self):
+        return self._fd is not None
+
+    async def open(self):
+        """打开串口并注册到当前事件循环，失败时抛出异常"""
+        self._loop = asyncio.get_running_loop()
+        self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=0, **self.serial_kwargs)
+        self._fd = self.ser.fileno()
+        os.set_blocking(self._fd, False)
+        self._readable = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._error = None
+        try:
+            self._loop.add_reader(self._fd, self._on_readable)
+        except NotImplementedError:
+            self.ser.close()
+            self._fd = None
+            raise
+
+    def close(self):
+        """注销文件描述符并关闭串口，等待中的read_frame()和write()抛出ConnectionError"""
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            self._loop.remove_writer(self._fd)
+            self._fd = None
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+        if self._readable is not None:
+            self._readable.set()
+        future = self._writer_future
+        if future is not None and not future.done():
+            future.set_exception(self._error or ConnectionError(f"{self.port} 已关闭"))
+
+    def _on_readable(self):
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data = b''
+            self._error = e
+        if not data:
+            # 设备断开：停止监听，唤醒等待者
+            if self._error is None:
+                self._error = ConnectionError(f"{self.port} 已断开")
+            self.close()
+            return
+        self.rx_count += len(data)
+        items = self.frame_assembler.feed(data) if self.frame_assembler is not None else (data,)
+        pending = self._pending
+        overflow = len(pending) + len(items) - pending.maxlen
+        if overflow > 0:
+            self.dropped_count += overflow
+        pending.extend(items)
+        if pending:
+            self._readable.set()
+
+    async def read_frame(self):
+        """等待并返回下一帧（或原始数据块），串口关闭后抛出ConnectionError"""
+        while not self._pending:
+            if self._fd is None:
+                raise self._error or ConnectionError(f"{self.port} 未打开")
+            self._readable.clear()
+            await self._readable.wait()
+        return self._pending.popleft()
+
+    async def write(self, data):
+        """写入全部数据，内核缓冲区满时等待可写，不阻塞事件循环"""
+        view = memoryview(bytes(data))
+        async with self._write_lock:
+            while view:
+                if self._fd is None:
+                    raise self._error or ConnectionError(f"{self.port} 未打开")
+                try:
+                    count = os.write(self._fd, view)
+                except BlockingIOError:
+                    count = 0
+                view = view[count:]
+                if view:
+                    await self._wait_writable()
+        self.tx_count += len(data)
+
+    async def _wait_writable(self):
+        future = self._writer_future = self._loop.create_future()
+
+        def on_writable():
+            # 可写回调在future完成后、等待者恢复前可能再次触发
+            if not future.done():
+                future.set_result(None)
+
+        self._loop.add_writer(self._fd, on_writable)
+        try:
+            await future
+        finally:
+            self._writer_future = None
+            if self._fd is not None:
+                self._loop.remove_writer(self._fd)
+
+
+async def bridge_port(port, engine, gate=None):
+    """把port收到的每个输入帧按映射转换后写回，直到串口关闭
+
+    gate为OutputGate时只写回变化的输出帧，没有输入时按保活周期重发上次的帧
+    """
+    try:
+        while True:
+            timeout = gate.keepalive_remaining() if gate is not None else None
+            if timeout is not None:
+                try:
+                    frame = await asyncio.wait_for(port.read_frame(), timeout)
+                except asyncio.TimeoutError:
+                    keepalive_frame = gate.keepalive_due()
+                    if keepalive_frame is not None:
+                        await port.write(keepalive_frame)
+                        gate.mark_sent(keepalive_frame)
+                    continue
+            else:
+                frame = await port.read_frame()
+            output = engine.convert(frame)
+            if gate is None:
+                await port.write(output)
+            elif gate.should_send(output):
+                await port.write(output)
+                gate.mark_sent(output)
+    except OSError as e:
+        # 包括ConnectionError和拔出设备时写入的EIO，只结束这个串口的桥接
+        print(f"{port.port} 桥接结束: {str(e)}")
+
+
+async def run_bridge(ports, baudrate, config, on_change=False, keepalive=1.0):
+    """为每个串口打开传输并运行桥接，各串口使用独立的自锁状态和发送判断"""
+    sessions = []
+    try:
+        for name in ports:
+            engine = MappingEngine.from_config(config) if config else MappingEngine()
+            port = AsyncSerialPort(name, baudrate, frame_assembler=FrameAssembler.for_layout(engine.layout))
+            await port.open()
+            gate = OutputGate(keepalive=keepalive) if on_change else None
+            sessions.append((port, engine, gate))
+            print(f"已打开 {name}")
+        await asyncio.gather(*(bridge_port(port, engine, gate) for port, engine, gate in sessions))
+    finally:
+        for port, _, gate in sessions:
+            port.close()
+            text = f"{port.port} 接收: {port.rx_count}  发送: {port.tx_count}  丢弃帧: {port.dropped_count}"
+            if gate is not None:
+                text += f"  未发送: {gate.suppressed_count} 帧 {gate.saved_bytes} 字节  保活: {gate.keepalive_count}"
+            print(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='无界面串口映射桥接')
+    parser.add_argument('ports', nargs='+', help='串口名称')
+    parser.add_argument('--baudrate', type=int, default=115200, help='波特率')
+    parser.add_argument('--config', help='映射配置文件（主界面"保存映射配置"导出的JSON）')
+    parser.add_argument('--on-change', action='store_true', help='只在输出帧变化时写回')
+    parser.add_argument('--keepalive', type=int, default=1000, help='--on-change时的保活周期(ms)，0为不保活')
+    args = parser.parse_args()
+
+    config = None
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    try:
+        asyncio.run(run_bridge(args.ports, args.baudrate, config, args.on_change, args.keepalive / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量映射转换（NumPy）
+一次调用把成千上万个输入帧转换为输出帧，用于回放、离线分析和批量回归。
+语义与AdvancedSerialTool.convert_data（mapping_engine.MappingEngine.convert）相同，
+包括自锁位的上升沿翻转；自锁状态在整批处理后写回引擎。
+
+需要NumPy（可选依赖，主界面不需要）：pip install numpy
+
+用法：
+    python batch_convert.py --bench [--frames 1000000]
+"""
+
+import numpy as np
+
+from crc16 import CRC16_TABLE
+from frame_layout import BIT_ORDER_LSB, CRC_END
+
+CHUNK_FRAMES = 65536  # 分块处理，限制位矩阵占用的内存
+
+
+def _make_crc16_word_table():
+    """16位CRC一次吸收16位数据时，新状态 = 表[状态 ^ 数据字]，表项是把状态移出16个0位的结果"""
+    state = np.arange(65536, dtype=np.uint32)
+    for _ in range(16):
+        state = np.where(state & 1, (state >> 1) ^ 0xA001, state >> 1)
+    return state.astype(np.uint16)
+
+
+_CRC16_TABLE = np.array(CRC16_TABLE, dtype=np.uint16)
+_CRC16_WORD_TABLE = _make_crc16_word_table()
+
+
+def crc16_batch(data):
+    """对[N, L]的每一行计算Modbus CRC16，返回未交换字节序的原始值数组
+
+    每次处理两列（小端组成16位字）查64K表，奇数长度的最后一列按字节查表。
+    """
+    columns = np.ascontiguousarray(data.T)  # 按列连续，逐列运算时顺序访问内存
+    crc = np.full(len(data), 0xFFFF, dtype=np.uint16)
+    word_table = _CRC16_WORD_TABLE
+    length = columns.shape[0]
+    for i in range(0, length - 1, 2):
+        word = columns[i].astype(np.uint16) | (columns[i + 1].astype(np.uint16) << 8)
+        crc = word_table[crc ^ word]
+    if length % 2:
+        crc = (crc >> 8) ^ _CRC16_TABLE[(crc ^ columns[-1]) & 0xFF]
+    return crc
+
+
+def _compile_batch(engine):
+    """由引擎的映射计划生成批量转换所需的索引
+
+    位矩阵的列（N为帧格式的位数）：0~N-1为输入位，N为常量0，N+1起为各自锁步骤的自锁状态。
+    返回(来源层列表, 自锁步骤列表)。每层是长度N的来源列数组，第o个元素是输出位o的一个来源列，
+    没有更多来源时为常量0列；第一层包含每个输出位的第一个来源，有多个来源（扇入）的
+    输出位其余来源依次放在后面的层中，各层打包后按位或。
+    """
+    plan = engine.compile()
+    if engine.rule_program is not None:
+        raise ValueError("映射配置含逻辑规则，不支持批量转换")
+    layout = engine.layout
+    bit_count = layout.bit_count
+    zero_column = bit_count
+    routes = {}  # 输出位 -> [来源列]
+    latch_steps = []
+
+    def bit_number(byte_index, mask):
+        """计划中的(字节下标, 位掩码)还原为位号，也是unpackbits按帧格式位序展开后的列号"""
+        if layout.bit_order == BIT_ORDER_LSB:
+            return byte_index * 8 + mask.bit_length() - 1
+        return byte_index * 8 + 8 - mask.bit_length()
+
+    for input_index, input_mask, outputs, latch_bit in plan:
+        input_bit = bit_number(input_index - layout.data_offset, input_mask)
+        if latch_bit is not None:
+            column = zero_column + 1 + len(latch_steps)
+            latch_steps.append((input_bit, latch_bit))
+        else:
+            column = input_bit
+        for output_index, output_mask in outputs:
+            routes.setdefault(bit_number(output_index, output_mask), []).append(column)
+
+    layers = []
+    for depth in range(max((len(columns) for columns in routes.values()), default=1)):
+        source = np.full(bit_count, zero_column, dtype=np.intp)
+        for output_bit, columns in routes.items():
+            if len(columns) > depth:
+                source[output_bit] = columns[depth]
+        layers.append(source)
+    return layers, latch_steps
+
+
+def convert_batch(engine, frames):
+    """批量转换
+
+    Args:
+        engine: MappingEngine，自锁状态从中读取，处理完后写回；帧格式为engine.layout
+        frames: uint8数组[N, 输入帧长]（默认格式为5A + D0~D23 + B24），可以更长，多余的列被忽略
+
+    Returns:
+        uint8数组[N, 输出帧长]，每行为帧头 + 数据区 + 帧尾 + CRC16（默认格式为A5 + D0~D23 + B24 + CRC16）
+    """
+    layout = engine.layout
+    bit_count = layout.bit_count
+    begin = layout.data_offset
+    end = begin + layout.data_length
+    bitorder = 'little' if layout.bit_order == BIT_ORDER_LSB else 'big'
+    frames = np.asarray(frames, dtype=np.uint8)
+    if frames.ndim != 2 or frames.shape[1] < end:
+        raise ValueError(f"frames必须是[N, {layout.input_frame_length}]的数组")
+    layers, latch_steps = _compile_batch(engine)
+    result = np.empty((len(frames), layout.output_frame_length), dtype=np.uint8)
+    result[:, 0] = layout.output_header
+    trailer_end = end + len(layout.output_trailer)
+    result[:, end:trailer_end] = np.frombuffer(layout.output_trailer, dtype=np.uint8)
+
+    for start in range(0, len(frames), CHUNK_FRAMES):
+        chunk = frames[start:start + CHUNK_FRAMES]
+        out = result[start:start + CHUNK_FRAMES]
+        # 位矩阵的列：N个输入位、常量0、各自锁步骤的自锁状态
+        bits = np.empty((len(chunk), bit_count + 1 + len(latch_steps)), dtype=np.uint8)
+        bits[:, :bit_count] = np.unpackbits(chunk[:, begin:end], axis=1, bitorder=bitorder)
+        bits[:, bit_count] = 0
+        if latch_steps:
+            bits[:, bit_count + 1:] = _latch_states(engine, bits, latch_steps)
+        # np.take结果按行连续，packbits走快速路径（花式索引bits[:, source]的结果不是）
+        data = out[:, begin:end]
+        data[:] = np.packbits(np.take(bits, layers[0], axis=1), axis=1, bitorder=bitorder)
+        for source in layers[1:]:
+            data |= np.packbits(np.take(bits, source, axis=1), axis=1, bitorder=bitorder)  # 扇入：多个来源按位或
+        if layout.crc == CRC_END:
+            crc = crc16_batch(out[:, :trailer_end])
+            low, high = trailer_end, trailer_end + 1
+            if layout.crc_byteorder != 'little':
+                low, high = high, low
+            out[:, low] = crc & 0xFF
+            out[:, high] = crc >> 8
+    return result
+
+
+def _latch_states(engine, bits, latch_steps):
+    """计算每帧处理后的自锁状态，并把最后一帧的状态写回引擎
+
+    上升沿矩阵edges[t, j] = 输入[t] & ~输入[t-1]（t=0时与引擎中的上一次值比较），
+    自锁状态 = 初始状态 异或 上升沿累计次数的奇偶。
+    """
+    inputs = bits[:, [input_bit for input_bit, _ in latch_steps]]
+    latch_bits = [latch_bit for _, latch_bit in latch_steps]
+    prev = np.array([1 if engine.prev_bits & bit else 0 for bit in latch_bits], dtype=np.uint8)
+    initial = np.array([1 if engine.latch_bits & bit else 0 for bit in latch_bits], dtype=np.uint8)
+
+    previous = np.vstack((prev, inputs[:-1]))
+    edges = inputs & (previous ^ 1)
+    states = (np.cumsum(edges, axis=0, dtype=np.uint32) & 1).astype(np.uint8) ^ initial
+
+    mask = sum(latch_bits)
+    engine.prev_bits = (engine.prev_bits & ~mask) | sum(bit for bit, value in zip(latch_bits, inputs[-1]) if value)
+    engine.latch_bits = (engine.latch_bits & ~mask) | sum(bit for bit, state in zip(latch_bits, states[-1]) if state)
+    return states
+
+
+def benchmark(frame_count):
+    import random
+    import time
+    from frame_layout import DEFAULT_LAYOUT
+    from mapping_engine import MappingEngine
+
+    rnd = random.Random(0)
+    layout = DEFAULT_LAYOUT
+    frames = np.random.default_rng(0).integers(0, 256, (frame_count, layout.input_frame_length), dtype=np.uint8)
+    frames[:, 0] = layout.input_header
+    print(f"批量转换 {frame_count} 帧（帧/s）")
+    print(f"{'启用映射':>8}{'自锁':>6}{'逐帧convert':>14}{'convert_batch':>16}")
+    for count, latch_ratio in ((0, 0), (16, 0), (192, 0), (192, 0.25)):
+        engine = MappingEngine(layout)
+        for i in rnd.sample(range(layout.bit_count), count):
+            engine.enabled[str(i)] = True
+            engine.mapping[str(i)] = rnd.randrange(layout.bit_count)
+            engine.latch[str(i)] = rnd.random() < latch_ratio
+        engine.invalidate()
+
+        sample = [bytes(row) for row in frames[:20000]]
+        start = time.perf_counter()
+        for frame in sample:
+            engine.convert(frame)
+        single_rate = len(sample) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        convert_batch(engine, frames)
+        batch_rate = frame_count / (time.perf_counter() - start)
+        latch_count = sum(1 for step in engine.compile() if step[3] is not None)
+        print(f"{count:>8}{latch_count:>6}{single_rate:>14.0f}{batch_rate:>16.0f}")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='批量映射转换')
+    parser.add_argument('--bench', action='store_true', help='对比逐帧与批量转换的速度')
+    parser.add_argument('--frames', type=int, default=1000000, help='测试帧数')
+    args = parser.parse_args()
+    if args.bench:
+        benchmark(args.frames)
+    else:
+        parser.print_help()
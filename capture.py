@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口原始数据录制与回放
+
+录制文件格式（小端）：
+    文件头  8字节 CAPTURE_MAGIC
+    记录    <QBI 时间戳(单调时钟纳秒) + 方向(0接收/1发送) + 长度，随后是原始数据
+
+录制在读取线程/发送线程中直接写入，记录的是串口上的原始字节，不经过显示格式化。
+回放把接收记录按原始时间间隔（或尽快）送回读取处理流程，用于复现现场问题
+和在真实数据上测试处理性能。
+
+用法：
+    python capture.py info 文件.cap
+    python capture.py bench 文件.cap [--config 映射配置.json]
+"""
+
+import argparse
+import json
+import struct
+import threading
+import time
+
+from frame_assembler import FrameAssembler
+from mapping_engine import MappingEngine
+
+CAPTURE_MAGIC = b'COMCAP\x00\x01'
+RECORD_HEADER = struct.Struct('<QBI')
+DIRECTION_RX = 0
+DIRECTION_TX = 1
+
+
+class CaptureRecorder:
+    """录制器，可被读取线程和发送线程同时调用"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb', buffering=65536)
+        self._file.write(CAPTURE_MAGIC)
+        self._lock = threading.Lock()
+        self.record_count = 0
+        self.byte_count = 0
+
+    def record(self, direction, data):
+        """写入一条记录，data可以是bytes或memoryview"""
+        header = RECORD_HEADER.pack(time.monotonic_ns(), direction, len(data))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(header)
+            self._file.write(data)
+            self.record_count += 1
+            self.byte_count += len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path):
+    """逐条读取录制文件，生成(时间戳纳秒, 方向, 数据)"""
+    with open(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path} 不是录制文件")
+        header_size = RECORD_HEADER.size
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                return
+            timestamp_ns, direction, length = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+            if len(data) < length:
+                return  # 录制中断留下的不完整记录
+            yield timestamp_ns, direction, data
+
+
+class CaptureReplayer:
+    """回放循环，接口与SerialReader相同，可直接替换读取线程中的读取器
+
+    realtime为True时按录制时的时间间隔（除以speed）交付接收记录，否则尽快交付。
+    """
+
+    def __init__(self, path, on_data, realtime=True, speed=1.0, on_idle=None, wait_timeout=0.2):
+        self.path = path
+        self.on_data = on_data
+        self.on_idle = on_idle  # 等待下一条记录期间按wait_timeout回调
+        self.realtime = realtime
+        self.speed = speed
+        self.wait_timeout = wait_timeout
+        self.running = False
+        self._stop_event = threading.Event()
+        self.record_count = 0  # 已回放的接收记录数
+        self.byte_count = 0
+
+    def run(self):
+        """回放循环，直到文件结束或stop()被调用"""
+        self.running = True
+        self._stop_event.clear()
+        try:
+            start = time.monotonic()
+            first_ns = None
+            for timestamp_ns, direction, data in read_capture(self.path):
+                if direction != DIRECTION_RX:
+                    continue
+                if self.realtime:
+                    if first_ns is None:
+                        first_ns = timestamp_ns
+                    due = start + (timestamp_ns - first_ns) / 1e9 / self.speed
+                    if not self._wait_until(due):
+                        break
+                elif not self.running:
+                    break
+                self.on_data(data)
+                self.record_count += 1
+                self.byte_count += len(data)
+        except Exception as e:
+            print(f"回放数据错误: {str(e)}")
+        finally:
+            self.running = False
+
+    def _wait_until(self, due):
+        """等待到due时刻，期间按wait_timeout回调on_idle；被stop()中断时返回False"""
+        while True:
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                return self.running
+            timeout = min(remaining, self.wait_timeout)
+            if self._stop_event.wait(timeout):
+                return False
+            if timeout < remaining and self.on_idle is not None:
+                self.on_idle()
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+
+
+def run_info(args):
+    counts = {DIRECTION_RX: [0, 0], DIRECTION_TX: [0, 0]}
+    first_ns = last_ns = None
+    for timestamp_ns, direction, data in read_capture(args.file):
+        if first_ns is None:
+            first_ns = timestamp_ns
+        last_ns = timestamp_ns
+        counts[direction][0] += 1
+        counts[direction][1] += len(data)
+    duration = (last_ns - first_ns) / 1e9 if first_ns is not None else 0
+    print(f"时长: {duration:.3f} s")
+    print(f"接收: {counts[DIRECTION_RX][0]} 条 {counts[DIRECTION_RX][1]} 字节")
+    print(f"发送: {counts[DIRECTION_TX][0]} 条 {counts[DIRECTION_TX][1]} 字节")
+
+
+def run_bench(args):
+    """把接收记录尽快送入组帧和映射转换，测量处理路径的吞吐（按映射配置中的帧格式组帧）"""
+    chunks = [data for _, direction, data in read_capture(args.file) if direction == DIRECTION_RX]
+    engine = MappingEngine()
+    if args.config:
+        with open(args.config, 'r') as f:
+            engine = MappingEngine.from_config(json.load(f))
+    assembler = FrameAssembler.for_layout(engine.layout)
+    convert = engine.convert
+
+    start = time.perf_counter()
+    frames = 0
+    for _ in range(args.repeat):
+        for data in chunks:
+            for frame in assembler.feed(data):
+                convert(frame)
+                frames += 1
+    elapsed = time.perf_counter() - start
+    total = sum(len(data) for data in chunks) * args.repeat
+    print(f"{len(chunks)} 条接收记录 x {args.repeat} 次，共 {total} 字节，{frames} 帧")
+    print(f"耗时 {elapsed * 1000:.1f} ms，{frames / elapsed:.0f} 帧/s，{total / elapsed / 1e6:.2f} MB/s")
+    print(f"重同步: {assembler.resync_count}  丢弃字节: {assembler.garbage_bytes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='串口录制文件工具')
+    sub = parser.add_subparsers(dest='command')
+
+    info = sub.add_parser('info', help='显示录制文件概要')
+    info.add_argument('file', help='录制文件')
+    info.set_defaults(func=run_info)
+
+    bench = sub.add_parser('bench', help='用录制数据测试组帧和映射转换的吞吐')
+    bench.add_argument('file', help='录制文件')
+    bench.add_argument('--config', help='映射配置文件')
+    bench.add_argument('--repeat', type=int, default=1, help='重复回放次数')
+    bench.set_defaults(func=run_bench)
+
+    args = parser.parse_args()
+    if not hasattr(args, 'func'):
+        parser.print_help()
+        return
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CRC16/Modbus校验
+主界面发送、映射输出帧、模拟器和批量转换共用的唯一CRC实现。
+
+- crc16_modbus():  返回原始CRC值，短数据按字节查256项表，较长数据按16位字查64K表（slice-by-2）
+- crc16_bytes():   返回要追加到数据后面的2个校验字节，byteorder指定字节顺序
+- Crc16:           增量计算，数据分多次到达时逐段update()
+
+字节顺序（按原始CRC值）：
+    'little'  低字节在前，Modbus标准顺序，A5输出帧和多命令发送使用
+    'big'     高字节在前，主界面普通发送使用
+
+用法：
+    python crc16.py --bench
+"""
+
+import sys
+
+CRC16_POLY = 0xA001  # Modbus，反射多项式0x8005
+CRC16_INIT = 0xFFFF
+BYTEORDER_LITTLE = 'little'
+BYTEORDER_BIG = 'big'
+SLICE_MIN_LENGTH = 16  # 不短于此长度时按16位字查表
+
+
+def _make_crc16_table():
+    table = [0] * 256
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ CRC16_POLY
+            else:
+                crc >>= 1
+        table[i] = crc
+    return table
+
+
+CRC16_TABLE = _make_crc16_table()
+_word_table = None
+
+
+def _get_word_table():
+    """64K表：状态异或一个16位字后，再移出16个0位的结果，首次使用时生成"""
+    global _word_table
+    if _word_table is None:
+        table = CRC16_TABLE
+        half = [(i >> 8) ^ table[i & 0xFF] for i in range(65536)]  # 移出8位
+        _word_table = [half[x] for x in half]
+    return _word_table
+
+
+def crc16_bitwise(data, crc=CRC16_INIT):
+    """逐位计算，只作为测试和性能对比的参考实现"""
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ CRC16_POLY
+            else:
+                crc >>= 1
+    return crc
+
+
+def crc16_bytewise(data, crc=CRC16_INIT):
+    """按字节查表"""
+    table = CRC16_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_sliced(data, crc=CRC16_INIT):
+    """按16位字查64K表，每次吸收2个字节
+
+    CPython中每次查表的解释开销远大于查表本身，slice-by-4/8要做4~8次查表和移位，
+    实测并不比按字节查表快；一次查64K表处理2个字节是纯Python下最快的切片方式。
+    """
+    view = memoryview(data).cast('B')
+    even = len(view) & ~1
+    if even:
+        words = view[:even].cast('H')
+        if sys.byteorder != 'little':
+            import array
+            words = array.array('H', words)
+            words.byteswap()
+        table = _get_word_table()
+        for word in words:
+            crc = table[crc ^ word]
+    if len(view) & 1:
+        crc = (crc >> 8) ^ CRC16_TABLE[(crc ^ view[-1]) & 0xFF]
+    return crc
+
+
+def crc16_modbus(data, crc=CRC16_INIT):
+    """计算Modbus CRC16，返回原始值（未交换字节序），crc为续算时的初始状态"""
+    if len(data) >= SLICE_MIN_LENGTH:
+        return crc16_sliced(data, crc)
+    return crc16_bytewise(data, crc)
+
+
+def swap_bytes(crc):
+    return ((crc & 0xFF) << 8) | (crc >> 8)
+
+
+def crc16_swapped(data):
+    """返回高低字节交换后的CRC值，主界面CRC显示和旧的crc16()接口使用这种形式"""
+    return swap_bytes(crc16_modbus(data))
+
+
+def crc16_bytes(data, byteorder=BYTEORDER_LITTLE):
+    """返回要追加在数据后面的2个CRC字节"""
+    return crc16_modbus(data).to_bytes(2, byteorder=byteorder)
+
+
+class Crc16:
+    """增量CRC16计算，数据可按任意长度分段update()"""
+
+    def __init__(self, data=b''):
+        self.value = CRC16_INIT
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        self.value = crc16_modbus(data, self.value)
+        return self
+
+    def digest(self, byteorder=BYTEORDER_LITTLE):
+        return self.value.to_bytes(2, byteorder=byteorder)
+
+    def reset(self):
+        self.value = CRC16_INIT
+
+    def copy(self):
+        other = Crc16()
+        other.value = self.value
+        return other
+
+
+def benchmark():
+    import os
+    import time
+
+    variants = (('逐位', crc16_bitwise), ('按字节查表', crc16_bytewise),
+                ('16位字查表', crc16_sliced), ('crc16_modbus', crc16_modbus))
+    _get_word_table()
+    print("CRC16/Modbus 计算速度（MB/s）")
+    print(f"{'长度':>8}" + ''.join(f"{name:>14}" for name, _ in variants))
+    for size in (8, 28, 256, 4096, 65536):
+        data = os.urandom(size)
+        repeat = max(1, 400000 // size)
+        line = f"{size:>8}"
+        for _, func in variants:
+            if func is crc16_bitwise:
+                count = max(1, repeat // 10)
+            else:
+                count = repeat
+            start = time.perf_counter()
+            for _ in range(count):
+                func(data)
+            elapsed = time.perf_counter() - start
+            line += f"{count * size / elapsed / 1e6:>14.2f}"
+        print(line)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='CRC16/Modbus校验')
+    parser.add_argument('--bench', action='store_true', help='对比各种实现的速度')
+    args = parser.parse_args()
+    if args.bench:
+        benchmark()
+    else:
+        parser.print_help()
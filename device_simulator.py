@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口设备模拟器
+创建Linux伪终端(pty)对，以指定速率发送5A输入帧，并接收、校验程序发回的A5输出帧。
+COMTool（或async_serial.py）像打开普通串口一样打开打印出的从端路径即可，
+无需真实硬件就能对读取线程、显示刷新和映射路径做负载与延迟测试。
+
+用法：
+    python device_simulator.py [--rate 100] [--pattern walking|random|burst]
+                               [--corrupt 0.01] [--config 映射配置.json] [--echo]
+                               [--link /tmp/ttyCOMTool] [--duration 60] [--data-length 64]
+
+--config指定映射配置时，按该配置计算每个输入帧应得到的输出帧，
+收到的A5帧与最近发送的输入帧比对，统计匹配数和响应延迟
+（从产生该输出的最近一次输入帧发出到收到输出帧的时间）。
+配置中含自锁位或定时器规则时输出依赖程序的采样时机，只校验帧格式和CRC。
+帧格式取自映射配置（frame_layout），没有配置时为--data-length字节的默认格式。
+"""
+
+import argparse
+import json
+import os
+import random
+import select
+import statistics
+import sys
+import threading
+import time
+import tty
+from collections import deque
+
+from crc16 import crc16_bytes
+from frame_assembler import FrameAssembler
+from frame_layout import CRC_END, DEFAULT_LAYOUT, FrameLayout
+from mapping_engine import MappingEngine
+
+MIN_RATE = 10
+MAX_RATE = 10000
+SEND_TICK = 0.001  # 发送节拍（秒），高速率时每个节拍发送多帧
+MAX_BACKLOG = 65536  # 等待写入伪终端的最大字节数，超出时新帧计为未被读取
+
+
+class PatternGenerator:
+    """输入位图案生成器，next_state()返回帧格式数据区的输入数据（默认24字节D0~D23）
+
+    - walking: 单个1位依次走过全部输入位
+    - random:  每帧随机翻转toggles个位
+    - burst:   安静期保持不变，每burst_period帧中有burst_length帧随机变化
+    """
+    PATTERNS = ('walking', 'random', 'burst')
+
+    def __init__(self, pattern, toggles=1, burst_period=100, burst_length=10, seed=None, layout=DEFAULT_LAYOUT):
+        self.layout = layout
+        self.pattern = pattern
+        self.toggles = toggles
+        self.burst_period = burst_period
+        self.burst_length = burst_length
+        self.random = random.Random(seed)
+        self.state = bytearray(layout.data_length)
+        self.index = 0
+
+    def _toggle(self, bit):
+        byte_index, mask = self.layout.bit_mask(bit)  # 与映射相同的位序
+        self.state[byte_index] ^= mask
+
+    def next_state(self):
+        layout = self.layout
+        if self.pattern == 'walking':
+            self.state[:] = bytes(layout.data_length)
+            self._toggle(self.index % layout.bit_count)
+        elif self.pattern == 'random':
+            for _ in range(self.toggles):
+                self._toggle(self.random.randrange(layout.bit_count))
+        elif self.index % self.burst_period < self.burst_length:
+            self.state[:] = self.random.randbytes(layout.data_length)
+        self.index += 1
+        return bytes(self.state)
+
+
+def build_input_frame(state, layout=DEFAULT_LAYOUT):
+    """由输入数据组装输入帧，默认格式为5A + D0~D23 + B24"""
+    return layout.build_input_frame(state)
+
+
+class DeviceSimulator:
+    """伪终端设备模拟器"""
+
+    def __init__(self, rate, generator, corrupt=0.0, engine=None, echo=False, link=None, seed=None):
+        self.rate = rate
+        self.generator = generator
+        self.corrupt = corrupt
+        self.engine = engine  # 用于计算预期输出，None表示只校验帧格式
+        self.echo = echo
+        self.link = link
+        self.random = random.Random(seed)
+        self.master_fd, self.slave_fd = os.openpty()
+        self.slave_name = os.ttyname(self.slave_fd)
+        tty.setraw(self.slave_fd)  # 程序打开前不回显，避免发出的数据被读回
+        os.set_blocking(self.master_fd, False)
+        self._backlog = bytearray()
+        self.running = False
+        # 最近发送的(发送时间, 预期输出)，用于比对输出帧
+        self.expected = deque(maxlen=max(1000, rate * 2))
+        self.expected_lock = threading.Lock()
+        self.stats = {
+            'sent': 0, 'corrupted': 0, 'blocked': 0,
+            'received': 0, 'bad_crc': 0, 'matched': 0, 'unmatched': 0,
+        }
+        self.latencies = []
+
+    def start(self):
+        if self.link:
+            if os.path.islink(self.link):
+                os.unlink(self.link)
+            os.symlink(self.slave_name, self.link)
+        self.running = True
+        self.receiver = threading.Thread(target=self._receive_loop, daemon=True)
+        self.receiver.start()
+
+    def stop(self):
+        self.running = False
+        self.receiver.join(1)
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+    def _corrupt_frame(self, frame):
+        """随机破坏一帧：翻转字节、截断或在前面插入垃圾字节"""
+        kind = self.random.randrange(3)
+        if kind == 0:
+            frame = bytearray(frame)
+            frame[self.random.randrange(1, len(frame))] ^= 0xFF
+            return bytes(frame)
+        if kind == 1:
+            return frame[:self.random.randrange(1, len(frame))]
+        return self.random.randbytes(self.random.randrange(1, 8)) + frame
+
+    def run(self, duration=None):
+        """按设定速率发送输入帧，duration为None时一直运行到Ctrl+C"""
+        start = time.perf_counter()
+        last_report = start
+        while self.running:
+            now = time.perf_counter()
+            if duration is not None and now - start >= duration:
+                break
+            # 追赶到当前时刻应发送的帧数，高速率时一次写入多帧
+            due = int((now - start) * self.rate) - self.stats['sent'] - self.stats['blocked']
+            if due > 0:
+                self._send_frames(due)
+            else:
+                self._flush()
+            if now - last_report >= 1:
+                last_report = now
+                self.report()
+            time.sleep(SEND_TICK)
+
+    def _send_frames(self, count):
+        chunks = []
+        sent_at = time.perf_counter()
+        expected = []
+        for _ in range(count):
+            frame = build_input_frame(self.generator.next_state(), self.generator.layout)
+            if self.engine is not None:
+                expected.append((sent_at, bytes(self.engine.convert(frame))))
+            if self.corrupt and self.random.random() < self.corrupt:
+                frame = self._corrupt_frame(frame)
+                self.stats['corrupted'] += 1
+            chunks.append(frame)
+        if len(self._backlog) >= MAX_BACKLOG:
+            # 程序未读取，伪终端缓冲区已满
+            self.stats['blocked'] += count
+            return
+        self._backlog += b''.join(chunks)
+        self.stats['sent'] += count
+        if expected:
+            with self.expected_lock:
+                self.expected.extend(expected)
+        self._flush()
+
+    def _flush(self):
+        """把积压的数据尽量写入伪终端主端"""
+        if not self._backlog:
+            return
+        try:
+            written = os.write(self.master_fd, self._backlog)
+        except BlockingIOError:
+            return
+        del self._backlog[:written]
+
+    def _receive_loop(self):
+        layout = self.generator.layout
+        assembler = FrameAssembler(layout.output_header, layout.output_frame_length)
+        while self.running:
+            readable, _, _ = select.select([self.master_fd], [], [], 0.2)
+            if not readable:
+                continue
+            try:
+                data = os.read(self.master_fd, 65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                time.sleep(0.1)  # 从端暂时无人打开
+                continue
+            received_at = time.perf_counter()
+            for frame in assembler.feed(data):
+                self._check_output(frame, received_at)
+
+    def _check_output(self, frame, received_at):
+        self.stats['received'] += 1
+        if self.echo:
+            print(f"<- {frame.hex(' ').upper()}")
+        layout = self.generator.layout
+        if layout.crc == CRC_END and crc16_bytes(frame[:-2], layout.crc_byteorder) != frame[-2:]:
+            self.stats['bad_crc'] += 1
+            return
+        if self.engine is None or not self.engine.stateless:
+            return
+        with self.expected_lock:
+            for sent_at, output in reversed(self.expected):
+                if output == frame:
+                    self.stats['matched'] += 1
+                    self.latencies.append((received_at - sent_at) * 1000)
+                    return
+        self.stats['unmatched'] += 1
+
+    def report(self):
+        stats = self.stats
+        text = (f"发送 {stats['sent']} 帧（损坏 {stats['corrupted']}，未被读取 {stats['blocked']}）  "
+                f"收到 {stats['received']} 帧（CRC错误 {stats['bad_crc']}")
+        if self.engine is not None:
+            text += f"，匹配 {stats['matched']}，不匹配 {stats['unmatched']}"
+        text += "）"
+        latencies = self.latencies
+        if latencies:
+            ordered = sorted(latencies)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            text += f"  响应延迟 平均 {statistics.mean(ordered):.2f} ms  P99 {p99:.2f} ms"
+            self.latencies = latencies[-10000:]
+        print(text)
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        print("模拟器依赖Linux伪终端，请在Linux下运行")
+        return
+
+    parser = argparse.ArgumentParser(description='串口设备模拟器（伪终端）')
+    parser.add_argument('--rate', type=int, default=100, help=f'输入帧速率(Hz)，{MIN_RATE}~{MAX_RATE}')
+    parser.add_argument('--pattern', choices=PatternGenerator.PATTERNS, default='walking', help='输入位图案')
+    parser.add_argument('--toggles', type=int, default=1, help='random图案每帧翻转的位数')
+    parser.add_argument('--burst-period', type=int, default=100, help='burst图案的周期（帧）')
+    parser.add_argument('--burst-length', type=int, default=10, help='burst图案每周期的变化帧数')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='每帧被破坏的概率(0~1)')
+    parser.add_argument('--config', help='映射配置文件，用于校验输出帧内容')
+    parser.add_argument('--echo', action='store_true', help='打印收到的A5输出帧')
+    parser.add_argument('--link', help='创建指向从端的符号链接，如/tmp/ttyCOMTool')
+    parser.add_argument('--duration', type=float, help='运行时长(s)，默认一直运行')
+    parser.add_argument('--seed', type=int, help='随机种子')
+    parser.add_argument('--data-length', type=int, default=DEFAULT_LAYOUT.data_length,
+                        help='数据区字节数（未指定--config时使用，如64、128）')
+    args = parser.parse_args()
+
+    if not MIN_RATE <= args.rate <= MAX_RATE:
+        parser.error(f"--rate 必须在 {MIN_RATE}~{MAX_RATE} 之间")
+
+    engine = None
+    layout = FrameLayout(args.data_length)
+    if args.config:
+        with open(args.config, 'r') as f:
+            engine = MappingEngine.from_config(json.load(f))
+        layout = engine.layout
+
+    generator = PatternGenerator(args.pattern, args.toggles, args.burst_period, args.burst_length, args.seed, layout)
+    simulator = DeviceSimulator(args.rate, generator, args.corrupt, engine, args.echo, args.link, args.seed)
+    simulator.start()
+    print(f"模拟设备已启动：{simulator.slave_name}" + (f" -> {args.link}" if args.link else ""))
+    print(f"速率 {args.rate} Hz，图案 {args.pattern}，帧长 {layout.input_frame_length} 字节，按Ctrl+C停止")
+    try:
+        simulator.run(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.report()
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+接收区显示缓冲
+只限制交给接收区显示的数据量，不影响映射、自锁和录制等协议处理
+"""
+
+from collections import deque
+
+
+class DisplayBuffer:
+    """有界显示缓冲区，元素为(数据, 时间戳, ...)，数据之后的字段原样交给显示
+
+    缓冲区满时按溢出策略处理新数据：
+    - drop_oldest: 丢弃最旧的条目，只显示最近capacity条
+    - drop_newest: 保留已缓冲的条目，丢弃后续条目，只显示每次刷新的前capacity条
+    - sample:      均匀抽样，缓冲区满时隔一条丢一条，之后的新数据也按加倍的间隔抽取
+    - summarize:   保留已缓冲的条目，后续条目只累计条数和字节数，显示时以一行摘要代替
+    """
+    POLICY_DROP_OLDEST = 'drop_oldest'
+    POLICY_DROP_NEWEST = 'drop_newest'
+    POLICY_SAMPLE = 'sample'
+    POLICY_SUMMARIZE = 'summarize'
+    POLICIES = (POLICY_DROP_OLDEST, POLICY_DROP_NEWEST, POLICY_SAMPLE, POLICY_SUMMARIZE)
+
+    def __init__(self, capacity=500, policy=POLICY_DROP_OLDEST):
+        self.policy = policy
+        self._entries = deque()
+        self.capacity = capacity
+        self.dropped_count = 0  # 累计未显示的条目数
+        self._stride = 1  # 抽样间隔
+        self._skip = 0
+        self._summary = None  # [条数, 字节数, 首条时间戳, 末条时间戳]
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, capacity):
+        self._capacity = max(2, capacity)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, items):
+        """加入一批(数据, 时间戳, ...)"""
+        entries = self._entries
+        capacity = self._capacity
+        for item in items:
+            if len(entries) < capacity and self._stride == 1:
+                entries.append(item)
+                continue
+            if self.policy == self.POLICY_SAMPLE:
+                self._add_sampled(item)
+            elif self.policy == self.POLICY_SUMMARIZE:
+                self._add_summary(item)
+            elif self.policy == self.POLICY_DROP_NEWEST:
+                self.dropped_count += 1
+            else:
+                entries.popleft()
+                entries.append(item)
+                self.dropped_count += 1
+
+    def _add_sampled(self, item):
+        entries = self._entries
+        self._skip += 1
+        if self._skip < self._stride:
+            self.dropped_count += 1
+            return
+        self._skip = 0
+        if len(entries) >= self._capacity:
+            # 丢弃一半条目，保留均匀分布的样本，之后抽样间隔加倍
+            kept = list(entries)[::2]
+            self.dropped_count += len(entries) - len(kept)
+            entries.clear()
+            entries.extend(kept)
+            self._stride *= 2
+        entries.append(item)
+
+    def _add_summary(self, item):
+        data, timestamp = item[0], item[1]
+        summary = self._summary
+        if summary is None:
+            self._summary = [1, len(data), timestamp, timestamp]
+        else:
+            summary[0] += 1
+            summary[1] += len(data)
+            summary[3] = timestamp
+        self.dropped_count += 1
+
+    def take(self):
+        """取出所有待显示条目，返回(条目列表, 摘要)
+
+        摘要为None或(省略条数, 省略字节数, 首条时间戳, 末条时间戳)
+        """
+        entries = list(self._entries)
+        self._entries.clear()
+        summary = tuple(self._summary) if self._summary else None
+        self._summary = None
+        self._stride = 1
+        self._skip = 0
+        return entries, summary
+
+    def clear(self):
+        self.take()
+
+    def reset_stats(self):
+        self.dropped_count = 0
@@ -0,0 +1,82 @@
+"""
+串口帧组装
+把任意切分的原始数据块重组为以0x5A开头的定长帧（帧头和帧长由帧格式决定）
+"""
+
+from frame_layout import DEFAULT_LAYOUT
+
+# 设备到PC的输入帧（默认格式）：5A + D0~D23 + B24
+INPUT_FRAME_HEADER = DEFAULT_LAYOUT.input_header
+INPUT_FRAME_LENGTH = DEFAULT_LAYOUT.input_frame_length
+
+
+class FrameAssembler:
+    """增量帧组装器
+
+    每次feed()追加一个数据块，返回其中所有完整帧。帧头不对齐时用
+    bytearray.find跳到下一个帧头重新同步，不逐字节循环。
+    """
+
+    def __init__(self, header=INPUT_FRAME_HEADER, frame_length=INPUT_FRAME_LENGTH):
+        self.header = header
+        self.frame_length = frame_length
+        self._buffer = bytearray()
+        self._in_sync = True
+        self.frame_count = 0  # 已输出的完整帧数
+        self.resync_count = 0  # 失步后重新同步的次数
+        self.garbage_bytes = 0  # 同步过程中丢弃的字节数
+
+    @classmethod
+    def for_layout(cls, layout):
+        """按帧格式（frame_layout.FrameLayout）的输入帧创建"""
+        return cls(layout.input_header, layout.input_frame_length)
+
+    def feed(self, data):
+        """追加数据块，返回完整帧列表"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        header = self.header
+        length = self.frame_length
+        end = len(buffer)
+        pos = 0
+
+        while pos < end:
+            if buffer[pos] != header:
+                # 失步：跳到下一个帧头，同一次失步只计一次
+                if self._in_sync:
+                    self._in_sync = False
+                    self.resync_count += 1
+                next_pos = buffer.find(header, pos)
+                if next_pos < 0:
+                    self.garbage_bytes += end - pos
+                    pos = end
+                    break
+                self.garbage_bytes += next_pos - pos
+                pos = next_pos
+            if end - pos < length:
+                break
+            frames.append(bytes(buffer[pos:pos + length]))
+            pos += length
+            self._in_sync = True
+
+        del buffer[:pos]
+        self.frame_count += len(frames)
+        return frames
+
+    def reset(self):
+        """清空未完成的数据和统计"""
+        self._buffer.clear()
+        self._in_sync = True
+        self.reset_stats()
+
+    def reset_stats(self):
+        """只清零统计计数"""
+        self.frame_count = 0
+        self.resync_count = 0
+        self.garbage_bytes = 0
+
+    @property
+    def pending_bytes(self):
+        """缓冲区中尚未组成完整帧的字节数"""
+        return len(self._buffer)
@@ -0,0 +1,149 @@
+"""
+帧格式定义
+输入帧（设备到PC）和输出帧（PC到设备）的帧头、数据长度、帧尾字节、CRC位置和位序，
+映射引擎、帧组装、信号检测表、指令生成器和批量转换都由同一个FrameLayout推导，
+不再假定24个数据字节（192位）。
+
+    输入帧：input_header + D0~Dn-1 + input_trailer
+    输出帧：output_header + D0~Dn-1 + output_trailer [+ CRC16]
+
+位号从D0开始递增，bit_order为'msb'时I0是D0的最高位（原有格式），'lsb'时I0是D0的最低位。
+引擎内部的位状态整数（自锁状态、逻辑规则）总是按I0为最高位编号，与位序无关。
+"""
+
+from crc16 import BYTEORDER_LITTLE, crc16_bytes
+
+BIT_ORDER_MSB = 'msb'
+BIT_ORDER_LSB = 'lsb'
+CRC_END = 'end'  # CRC16追加在输出帧末尾，覆盖帧头到帧尾的全部字节
+CRC_NONE = 'none'  # 输出帧不带CRC
+
+BIT_REVERSE_TABLE = bytes(int(f'{i:08b}'[::-1], 2) for i in range(256))  # 字节内位序反转，用于bytes.translate
+
+
+class FrameLayout:
+    """一种帧格式，创建后不应再修改（映射引擎按它编译查找表）"""
+
+    def __init__(self, data_length=24, input_header=0x5A, output_header=0xA5,
+                 input_trailer=b'\x01', output_trailer=b'\x01',
+                 crc=CRC_END, crc_byteorder=BYTEORDER_LITTLE, bit_order=BIT_ORDER_MSB):
+        if data_length <= 0:
+            raise ValueError("数据长度必须大于0")
+        if crc not in (CRC_END, CRC_NONE):
+            raise ValueError(f"不支持的CRC位置: {crc}")
+        if bit_order not in (BIT_ORDER_MSB, BIT_ORDER_LSB):
+            raise ValueError(f"不支持的位序: {bit_order}")
+        self.data_length = data_length
+        self.input_header = input_header
+        self.output_header = output_header
+        self.input_trailer = bytes(input_trailer)
+        self.output_trailer = bytes(output_trailer)
+        self.crc = crc
+        self.crc_byteorder = crc_byteorder
+        self.bit_order = bit_order
+
+        self.bit_count = data_length * 8
+        self.data_offset = 1  # 帧头之后是D0
+        self.input_frame_length = 1 + data_length + len(self.input_trailer)
+        self.output_frame_length = 1 + data_length + len(self.output_trailer) + (2 if crc == CRC_END else 0)
+        self.default_output_frame = bytes(self.build_output_frame(bytes(data_length)))
+
+    def __eq__(self, other):
+        return isinstance(other, FrameLayout) and self.to_config() == other.to_config()
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.to_config().items())))
+
+    def __repr__(self):
+        return f"FrameLayout({self.describe()})"
+
+    def bit_mask(self, pos):
+        """位号pos在数据区中的(字节下标, 位掩码)，字节下标从D0算起"""
+        if self.bit_order == BIT_ORDER_MSB:
+            return pos // 8, 1 << (7 - pos % 8)
+        return pos // 8, 1 << (pos % 8)
+
+    def reorder(self, bits):
+        """在数据区按大端组成的整数和按位号编号的整数（I0为最高位）之间转换，两个方向相同"""
+        if self.bit_order == BIT_ORDER_MSB:
+            return bits
+        data = bits.to_bytes(self.data_length, 'big').translate(BIT_REVERSE_TABLE)
+        return int.from_bytes(data, 'big')
+
+    def payload(self, frame):
+        """帧的数据区D0~Dn-1，帧不完整时可能较短"""
+        return frame[self.data_offset:self.data_offset + self.data_length]
+
+    def bits_from_payload(self, payload):
+        """数据区转换为按位号编号的整数（I0为最高位），不足的字节按0处理"""
+        data = bytes(payload).ljust(self.data_length, b'\0')
+        if self.bit_order == BIT_ORDER_LSB:
+            data = data.translate(BIT_REVERSE_TABLE)
+        return int.from_bytes(data, 'big')
+
+    def build_input_frame(self, payload):
+        """由数据区组装输入帧"""
+        return bytes([self.input_header]) + bytes(payload) + self.input_trailer
+
+    def build_output_frame(self, payload):
+        """由数据区组装完整输出帧（帧头、帧尾字节和CRC16）"""
+        frame = bytearray([self.output_header])
+        frame += payload
+        frame += self.output_trailer
+        if self.crc == CRC_END:
+            frame += crc16_bytes(frame, self.crc_byteorder)
+        return frame
+
+    def describe(self):
+        """帧格式的简短说明，如 A5 D0~D23 01 CRC"""
+        last = self.data_length - 1
+        text = f"{self.output_header:02X} D0~D{last}"
+        if self.output_trailer:
+            text += ' ' + self.output_trailer.hex(' ').upper()
+        if self.crc == CRC_END:
+            text += ' CRC'
+        return f"{text}，{self.bit_count}位，{self.bit_order.upper()}在前"
+
+    def to_config(self):
+        """导出为配置文件的内容"""
+        return {
+            'data_length': self.data_length,
+            'input_header': self.input_header,
+            'output_header': self.output_header,
+            'input_trailer': self.input_trailer.hex(),
+            'output_trailer': self.output_trailer.hex(),
+            'crc': self.crc,
+            'crc_byteorder': self.crc_byteorder,
+            'bit_order': self.bit_order,
+        }
+
+    @classmethod
+    def from_config(cls, config):
+        """从配置文件的内容创建，缺少的字段使用原有24字节格式的默认值"""
+        default = DEFAULT_LAYOUT
+        return cls(data_length=int(config.get('data_length', default.data_length)),
+                   input_header=int(config.get('input_header', default.input_header)),
+                   output_header=int(config.get('output_header', default.output_header)),
+                   input_trailer=bytes.fromhex(config.get('input_trailer', default.input_trailer.hex())),
+                   output_trailer=bytes.fromhex(config.get('output_trailer', default.output_trailer.hex())),
+                   crc=config.get('crc', default.crc),
+                   crc_byteorder=config.get('crc_byteorder', default.crc_byteorder),
+                   bit_order=config.get('bit_order', default.bit_order))
+
+
+DEFAULT_LAYOUT = FrameLayout()  # 原有格式：5A + D0~D23 + B24 / A5 + D0~D23 + B24 + CRC16
+
+# 界面中可选的帧格式
+FRAME_LAYOUTS = {
+    '24字节 (192位)': DEFAULT_LAYOUT,
+    '64字节 (512位)': FrameLayout(64),
+    '128字节 (1024位)': FrameLayout(128),
+}
+
+
+def layout_name(layout):
+    """FRAME_LAYOUTS中的名称，不是预设格式时返回说明文字"""
+    for name, preset in FRAME_LAYOUTS.items():
+        if preset == layout:
+            return name
+    return layout.describe()
@@ -0,0 +1,214 @@
+"""
+收发记录存储
+接收和发送的每条数据按 (时间戳ns, 方向, 数据) 记录在预分配的环形数组中，接收区显示、保存接收数据
+和自动生成都从这里读取，不再解析接收区的文本。
+
+    记录元数据：array('q') 时间戳、偏移、长度、重复次数、末次时间戳 + bytearray 方向，下标为 序号 % 帧数上限
+    数据字节：  一块预分配的bytearray，按写入顺序环形存放
+
+帧数或字节数任一达到上限时淘汰最旧的记录。追加、按序号/下标访问都是O(1)，
+取最近N条只访问这N条，运行时间再长内存也不增长。
+连续相同的数据可以折叠为一条记录（repeat_last），只累加重复次数和末次时间戳。
+"""
+
+import sys
+import time
+from array import array
+
+DIRECTION_RX = 0  # 接收
+DIRECTION_TX = 1  # 发送
+
+DEFAULT_CAPACITY_FRAMES = 100000
+DEFAULT_CAPACITY_BYTES = 16 * 1024 * 1024
+
+
+class FrameStore:
+    """有界的收发记录环形存储
+
+    每条记录有一个递增的序号，淘汰后序号不再复用，界面可以只保存序号来引用记录。
+    """
+
+    def __init__(self, capacity_frames=DEFAULT_CAPACITY_FRAMES, capacity_bytes=DEFAULT_CAPACITY_BYTES):
+        self.first_seq = 0  # 最旧记录的序号
+        self.next_seq = 0  # 下一条记录的序号
+        self.evicted_count = 0  # 累计淘汰的记录数
+        self._allocate(capacity_frames, capacity_bytes)
+
+    def _allocate(self, capacity_frames, capacity_bytes):
+        if capacity_frames < 1 or capacity_bytes < 1:
+            raise ValueError("存储容量必须大于0")
+        self.capacity_frames = capacity_frames
+        self.capacity_bytes = capacity_bytes
+        self._timestamps = array('q', bytes(8 * capacity_frames))
+        self._offsets = array('q', bytes(8 * capacity_frames))
+        self._lengths = array('q', bytes(8 * capacity_frames))
+        self._counts = array('q', bytes(8 * capacity_frames))
+        self._last_timestamps = array('q', bytes(8 * capacity_frames))
+        self._directions = bytearray(capacity_frames)
+        self._data = bytearray(capacity_bytes)
+        self._write_pos = 0
+        self.byte_count = 0  # 现存记录的数据总字节数
+
+    def __len__(self):
+        return self.next_seq - self.first_seq
+
+    def __iter__(self):
+        """从最旧到最新遍历全部记录"""
+        for seq in range(self.first_seq, self.next_seq):
+            yield self._record(seq)
+
+    def __getitem__(self, index):
+        """按下标访问记录，0为最旧，-1为最新"""
+        count = self.next_seq - self.first_seq
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("记录下标超出范围")
+        return self._record(self.first_seq + index)
+
+    def _record(self, seq):
+        slot = seq % self.capacity_frames
+        offset = self._offsets[slot]
+        return (self._timestamps[slot], self._directions[slot],
+                bytes(self._data[offset:offset + self._lengths[slot]]))
+
+    def get(self, seq):
+        """按序号取记录 (时间戳ns, 方向, 数据)，已淘汰或不存在时返回None"""
+        if not self.first_seq <= seq < self.next_seq:
+            return None
+        return self._record(seq)
+
+    def repeat_info(self, seq):
+        """记录的 (重复次数, 末次时间戳ns)，未折叠的记录为 (1, 时间戳)；已淘汰时返回None"""
+        if not self.first_seq <= seq < self.next_seq:
+            return None
+        slot = seq % self.capacity_frames
+        return self._counts[slot], self._last_timestamps[slot]
+
+    def size(self, seq):
+        """记录的数据字节数，已淘汰时返回0"""
+        if not self.first_seq <= seq < self.next_seq:
+            return 0
+        return self._lengths[seq % self.capacity_frames]
+
+    def append(self, timestamp_ns, direction, payload):
+        """追加一条记录，返回序号；超过总字节容量的数据只保留末尾部分"""
+        size = len(payload)
+        if size > self.capacity_bytes:
+            payload = payload[size - self.capacity_bytes:]
+            size = self.capacity_bytes
+        if self.next_seq - self.first_seq == self.capacity_frames:
+            self._evict()
+
+        pos = self._write_pos
+        if pos + size > self.capacity_bytes:
+            # 末尾放不下，剩余空间作废，从头写入；先淘汰仍存放在写入位置之后的旧记录
+            while self.next_seq != self.first_seq and self._offsets[self.first_seq % self.capacity_frames] >= pos:
+                self._evict()
+            pos = 0
+        end = pos + size
+        # 记录按写入顺序存放，写入区间内的只会是最旧的记录
+        while self.next_seq != self.first_seq:
+            offset = self._offsets[self.first_seq % self.capacity_frames]
+            if offset < pos or offset >= end:
+                break
+            self._evict()
+
+        self._data[pos:end] = payload
+        seq = self.next_seq
+        slot = seq % self.capacity_frames
+        self._timestamps[slot] = timestamp_ns
+        self._directions[slot] = direction
+        self._offsets[slot] = pos
+        self._lengths[slot] = size
+        self._counts[slot] = 1
+        self._last_timestamps[slot] = timestamp_ns
+        self._write_pos = end
+        self.byte_count += size
+        self.next_seq = seq + 1
+        return seq
+
+    def repeat_last(self, seq, timestamp_ns):
+        """seq仍是最新记录时把一次重复折叠进它并返回True，否则返回False（调用方应追加新记录）"""
+        if seq != self.next_seq - 1 or seq < self.first_seq:
+            return False
+        slot = seq % self.capacity_frames
+        self._counts[slot] += 1
+        self._last_timestamps[slot] = timestamp_ns
+        return True
+
+    def _evict(self):
+        self.byte_count -= self._lengths[self.first_seq % self.capacity_frames]
+        self.first_seq += 1
+        self.evicted_count += 1
+
+    def last(self, count, direction=None):
+        """最近count条记录（从旧到新），direction不为None时只取该方向的记录"""
+        records = []
+        seq = self.next_seq - 1
+        directions = self._directions
+        while seq >= self.first_seq and len(records) < count:
+            if direction is None or directions[seq % self.capacity_frames] == direction:
+                records.append(self._record(seq))
+            seq -= 1
+        records.reverse()
+        return records
+
+    def last_payload(self, direction=DIRECTION_RX):
+        """该方向最新一条记录的数据，没有时返回None"""
+        records = self.last(1, direction)
+        return records[0][2] if records else None
+
+    def resize(self, capacity_frames, capacity_bytes):
+        """修改容量，保留新容量能容纳的最新记录，序号不变"""
+        kept = []
+        total = 0
+        for seq in range(self.next_seq - 1, self.first_seq - 1, -1):
+            size = self._lengths[seq % self.capacity_frames]
+            if len(kept) == capacity_frames or total + size > capacity_bytes:
+                break
+            kept.append((self._record(seq), self.repeat_info(seq)))
+            total += size
+        kept.reverse()
+        self.evicted_count += len(self) - len(kept)
+        self._allocate(capacity_frames, capacity_bytes)
+        self.first_seq = self.next_seq = self.next_seq - len(kept)
+        for record, (count, last_timestamp) in kept:
+            slot = self.append(*record) % capacity_frames
+            self._counts[slot] = count
+            self._last_timestamps[slot] = last_timestamp
+
+    def clear(self):
+        """清空全部记录，序号继续递增"""
+        self.first_seq = self.next_seq
+        self._write_pos = 0
+        self.byte_count = 0
+
+
+def benchmark(count=200000, frame_length=26):
+    """追加、按下标访问和取最近N条的耗时"""
+    store = FrameStore()
+    payload = bytes(range(frame_length))
+    now = time.time_ns()
+    start = time.perf_counter()
+    for i in range(count):
+        store.append(now + i, DIRECTION_RX, payload)
+    elapsed = time.perf_counter() - start
+    print(f"追加 {count} 条 {frame_length} 字节: {elapsed * 1e9 / count:.0f} ns/条，"
+          f"现存 {len(store)} 条，淘汰 {store.evicted_count} 条")
+
+    start = time.perf_counter()
+    for i in range(0, len(store), 7):
+        store[i]
+    elapsed = time.perf_counter() - start
+    print(f"按下标访问: {elapsed * 1e9 / len(range(0, len(store), 7)):.0f} ns/条")
+
+    for n in (1, 100, 10000):
+        start = time.perf_counter()
+        store.last(n)
+        print(f"最近 {n} 条: {(time.perf_counter() - start) * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    if '--bench' in sys.argv:
+        benchmark()
@@ -0,0 +1,141 @@
+"""
+接收数据的十六进制渲染
+按字节值预先生成256项的渲染表（十六进制文本和带颜色的HTML），整帧用 bytes.hex(' ') 和按表映射一次生成，
+不再逐字节格式化并与"5A"/"EB"比较。高亮规则（字节 -> 颜色）可以修改，修改时重新生成渲染表。
+"""
+
+import re
+import sys
+import time
+from datetime import datetime
+from functools import lru_cache
+
+DEFAULT_HIGHLIGHTS = {0x5A: 'green', 0xEB: 'red'}
+
+_COLOR_PATTERN = re.compile(r'^(#[0-9A-Fa-f]{3}|#[0-9A-Fa-f]{6}|[A-Za-z]+)$')
+
+
+def parse_highlight_rules(text):
+    """解析高亮规则文本，如 "5A=green, EB=red, 01=#808080"，返回{字节: 颜色}
+
+    格式错误时抛出ValueError，空文本表示不高亮。
+    """
+    highlights = {}
+    for item in text.replace('，', ',').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        byte_text, sep, color = item.partition('=')
+        byte_text, color = byte_text.strip(), color.strip()
+        if not sep or not color:
+            raise ValueError(f"高亮规则应为 字节=颜色: {item}")
+        try:
+            byte = int(byte_text, 16)
+        except ValueError:
+            raise ValueError(f"无效的字节值: {byte_text}") from None
+        if not 0 <= byte <= 0xFF:
+            raise ValueError(f"字节值超出范围: {byte_text}")
+        if not _COLOR_PATTERN.match(color):
+            raise ValueError(f"无效的颜色: {color}")
+        highlights[byte] = color
+    return highlights
+
+
+def format_highlight_rules(highlights):
+    """高亮规则转换为文本，与parse_highlight_rules互逆"""
+    return ', '.join(f"{byte:02X}={color}" for byte, color in sorted(highlights.items()))
+
+
+@lru_cache(maxsize=64)
+def _second_text(second):
+    return datetime.fromtimestamp(second).strftime("%H:%M:%S")
+
+
+def format_time_ns(timestamp_ns):
+    """纳秒时间戳格式化为 时:分:秒.毫秒，同一秒内的记录复用已格式化的时分秒"""
+    return f"{_second_text(timestamp_ns // 1000000000)}.{timestamp_ns // 1000000 % 1000:03d}"
+
+
+class ByteRenderer:
+    """按预生成的渲染表格式化整帧数据"""
+
+    def __init__(self, highlights=None):
+        self.set_highlights(DEFAULT_HIGHLIGHTS if highlights is None else highlights)
+
+    def set_highlights(self, highlights):
+        """修改高亮规则{字节: 颜色}，重新生成渲染表"""
+        self.highlights = dict(highlights)
+        self._highlight_bytes = bytes(sorted(self.highlights))
+        html_table = [f"{byte:02X}" for byte in range(256)]
+        for byte, color in self.highlights.items():
+            html_table[byte] = f'<span style="color: {color};">{byte:02X}</span>'
+        self._html_table = tuple(html_table)
+
+    def hex(self, data):
+        """十六进制文本，字节之间用空格分隔"""
+        return data.hex(' ').upper()
+
+    def has_highlight(self, data):
+        """数据中是否有需要高亮的字节"""
+        highlight_bytes = self._highlight_bytes
+        return bool(highlight_bytes) and len(data.translate(None, highlight_bytes)) != len(data)
+
+    def html(self, data):
+        """带颜色的十六进制HTML，每个字节查表一次"""
+        return ' '.join(map(self._html_table.__getitem__, data))
+
+
+def legacy_html(data, timestamp):
+    """原flush_data_buffer中逐字节生成一行HTML的方式，作为基准测试的对照"""
+    timestamp = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3]
+    hex_list = [f"{byte:02X}" for byte in data]
+    html_parts = [f"[{timestamp}] [接收] "]
+    for hex_byte in hex_list:
+        if hex_byte == "5A":
+            html_parts.append(f'<span style="color: green;">{hex_byte}</span> ')
+        elif hex_byte == "EB":
+            html_parts.append(f'<span style="color: red;">{hex_byte}</span> ')
+        else:
+            html_parts.append(f"{hex_byte} ")
+    html_parts.append("<br>")
+    return ''.join(html_parts)
+
+
+def benchmark(count=10000):
+    """格式化count帧：原逐字节方式与渲染表的耗时"""
+    import random
+    rnd = random.Random(23)
+    now = time.time()
+    for length in (26, 130):
+        frames = [bytes([0x5A]) + rnd.randbytes(length - 2) + b'\x01' for _ in range(count)]
+        renderer = ByteRenderer()
+
+        start = time.perf_counter()
+        for data in frames:
+            legacy_html(data, now)
+        legacy = time.perf_counter() - start
+
+        now_ns = int(now * 1e9)
+        start = time.perf_counter()
+        for data in frames:
+            f"[{format_time_ns(now_ns)}] [接收] {renderer.html(data)}"
+        table = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in frames:
+            renderer.html(data)
+        table_only = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for data in frames:
+            renderer.hex(data)
+        plain = time.perf_counter() - start
+
+        print(f"{count} 帧 x {length} 字节: 原逐字节HTML {legacy * 1e3:.1f} ms，"
+              f"渲染表HTML {table * 1e3:.1f} ms（不含时间戳 {table_only * 1e3:.1f} ms），"
+              f"纯十六进制 {plain * 1e3:.1f} ms，加速 {legacy / table:.1f}x")
+
+
+if __name__ == "__main__":
+    if '--bench' in sys.argv:
+        benchmark()
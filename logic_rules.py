@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逻辑规则
+在“输入位→输出位”的1:1映射之外，用规则描述组合逻辑和定时器，每行一条：
+
+    O10 = I3 & I4              # 与
+    O11 = I5 | !I6             # 或、非
+    O12 = I1 ^ I2              # 异或
+    O13 = TON(I7, 500)         # 接通延时：I7持续为1达500 ms后输出1，I7为0时立即输出0
+    O14 = TOF(I8 | I9, 200)    # 断开延时：输入为1时输出1，变为0后再保持200 ms
+    O15 = TP(I10, 100)         # 定宽脉冲：上升沿输出100 ms的脉冲，脉冲期间忽略输入
+    O16 = I11 | TP(I11, 100)   # 脉冲展宽：短于100 ms的脉冲展宽到100 ms
+
+运算符也可写作NOT/AND/XOR/OR（不区分大小写），优先级从高到低为 非、与、异或、或；
+0和1为常量，# 之后为注释。同一输出位有多条规则时最后一条生效；
+规则写入的输出位覆盖1:1映射的结果。
+
+规则集只编译一次，生成一个直线Python函数：用到的输入位各提取一次，
+表达式直接写成按位运算，定时器状态保存在列表中，每帧调用一次该函数。
+每帧的求值时间与时间预算比较，超出时计入overrun_count。编译时按表达式的运算数
+（输入位、常量、运算符各计1，定时器计TIMER_COST）估算规则集的开销，超出cost_budget的
+规则集被拒绝；是否拒绝只取决于规则文本，与机器负载无关。
+
+用法：
+    python logic_rules.py --bench
+"""
+
+import re
+import time
+
+RULE_BIT_COUNT = 192  # 默认位数：输入位I0~I191，输出位O0~O191（帧格式更长时由bit_count指定）
+DEFAULT_TIME_BUDGET = 0.001  # 每帧规则求值的时间预算（秒）
+DEFAULT_COST_BUDGET = 20000  # 规则集的运算数上限，每个运算约50 ns，约相当于每帧1 ms
+TIMER_COST = 4  # 定时器按4个运算计
+TIMER_FUNCTIONS = ('TON', 'TOF', 'TP')
+
+_TOKEN_RE = re.compile(r'\s*(?:([IO])(\d+)(?![A-Z0-9_])|(\d+)|([A-Z_][A-Z0-9_]*)|(.))')
+_OPERATOR_WORDS = {'NOT': '!', 'AND': '&', 'OR': '|', 'XOR': '^'}
+
+
+class RuleError(ValueError):
+    """规则语法错误或运算数超出上限，line为出错的行号（从1开始）"""
+
+    def __init__(self, message, line=None):
+        super().__init__(f"第{line}行: {message}" if line else message)
+        self.line = line
+
+
+def _tokenize(text, line):
+    tokens = []
+    pos = 0
+    text = text.upper()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if match is None:  # 只剩空白
+            break
+        pos = match.end()
+        kind, index, number, name, char = match.groups()
+        if kind:
+            tokens.append(('in' if kind == 'I' else 'out', int(index)))
+        elif number is not None:
+            tokens.append(('num', int(number)))
+        elif name:
+            if name in _OPERATOR_WORDS:
+                tokens.append(('op', _OPERATOR_WORDS[name]))
+            else:
+                tokens.append(('name', name))
+        elif char in '&|^!~(),=':
+            tokens.append(('op', '!' if char == '~' else char))
+        else:
+            raise RuleError(f"无法识别的字符 '{char}'", line)
+    tokens.append(('end', None))
+    return tokens
+
+
+class _Parser:
+    """递归下降解析一条规则，表达式解析为元组：
+    ('in', 位号) ('const', 0/1) ('not', a) ('and'/'xor'/'or', a, b) ('timer', 类型, a, 毫秒)
+    """
+
+    def __init__(self, tokens, line, bit_count=RULE_BIT_COUNT):
+        self.tokens = tokens
+        self.pos = 0
+        self.line = line
+        self.bit_count = bit_count
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, op):
+        token = self.take()
+        if token != ('op', op):
+            raise RuleError(f"此处应为 '{op}'", self.line)
+
+    def bit(self, token):
+        if not 0 <= token[1] < self.bit_count:
+            raise RuleError(f"位号 {token[1]} 超出0~{self.bit_count - 1}", self.line)
+        return token[1]
+
+    def rule(self):
+        token = self.take()
+        if token[0] != 'out':
+            raise RuleError("规则应以输出位开头，如 O10 = I3 & I4", self.line)
+        output = self.bit(token)
+        self.expect('=')
+        node = self.binary(0)
+        if self.peek()[0] != 'end':
+            raise RuleError("表达式后有多余内容", self.line)
+        return output, node
+
+    _LEVELS = (('|', 'or'), ('^', 'xor'), ('&', 'and'))
+
+    def binary(self, level):
+        if level == len(self._LEVELS):
+            return self.unary()
+        op, name = self._LEVELS[level]
+        node = self.binary(level + 1)
+        while self.peek() == ('op', op):
+            self.take()
+            node = (name, node, self.binary(level + 1))
+        return node
+
+    def unary(self):
+        if self.peek() == ('op', '!'):
+            self.take()
+            return ('not', self.unary())
+        return self.primary()
+
+    def primary(self):
+        token = self.take()
+        kind, value = token
+        if kind == 'in':
+            return ('in', self.bit(token))
+        if kind == 'num' and value in (0, 1):
+            return ('const', value)
+        if token == ('op', '('):
+            node = self.binary(0)
+            self.expect(')')
+            return node
+        if kind == 'name' and value in TIMER_FUNCTIONS:
+            self.expect('(')
+            argument = self.binary(0)
+            self.expect(',')
+            duration = self.take()
+            if duration[0] != 'num':
+                raise RuleError(f"{value}的第二个参数应为毫秒数", self.line)
+            self.expect(')')
+            return ('timer', value, argument, duration[1])
+        if kind == 'out':
+            raise RuleError("表达式中只能使用输入位", self.line)
+        if kind == 'name':
+            raise RuleError(f"未知的函数 '{value}'，可用 {'/'.join(TIMER_FUNCTIONS)}", self.line)
+        raise RuleError("表达式不完整", self.line)
+
+
+def rule_cost(node):
+    """表达式的运算数，用于编译时静态估算求值开销"""
+    kind = node[0]
+    if kind in ('in', 'const'):
+        return 1
+    if kind == 'not':
+        return 1 + rule_cost(node[1])
+    if kind == 'timer':
+        return TIMER_COST + rule_cost(node[2])
+    return 1 + rule_cost(node[1]) + rule_cost(node[2])
+
+
+def parse_rules(lines, bit_count=RULE_BIT_COUNT):
+    """解析规则文本（行列表），返回[(输出位, 表达式), ...]，同一输出位只保留最后一条
+
+    bit_count为输入/输出位数，位号超出时报错
+    """
+    rules = {}
+    for line_number, text in enumerate(lines, 1):
+        text = text.split('#', 1)[0].strip()
+        if not text:
+            continue
+        output, node = _Parser(_tokenize(text, line_number), line_number, bit_count).rule()
+        rules.pop(output, None)
+        rules[output] = node
+    return list(rules.items())
+
+
+class _CodeGenerator:
+    """把解析后的规则生成为一个Python函数的源代码"""
+
+    def __init__(self, bit_count=RULE_BIT_COUNT):
+        self.bit_count = bit_count
+        self.inputs = {}  # 输入位 -> 变量名
+        self.statements = []
+        self.state = []  # 定时器状态的初始值
+
+    def input(self, bit):
+        name = self.inputs.get(bit)
+        if name is None:
+            name = self.inputs[bit] = f"i{bit}"
+        return name
+
+    def expr(self, node):
+        kind = node[0]
+        if kind == 'in':
+            return self.input(node[1])
+        if kind == 'const':
+            return str(node[1])
+        if kind == 'not':
+            return f"({self.expr(node[1])} ^ 1)"
+        if kind == 'timer':
+            return self.timer(*node[1:])
+        operator = {'and': '&', 'or': '|', 'xor': '^'}[kind]
+        return f"({self.expr(node[1])} {operator} {self.expr(node[2])})"
+
+    def timer(self, function, argument, milliseconds):
+        value = self.expr(argument)
+        k = len(self.state)
+        name = f"t{k}"
+        seconds = milliseconds / 1000
+        emit = self.statements.append
+        if function == 'TON':
+            # s[k]: 输入连续为1的起始时间
+            self.state.append(None)
+            emit(f"if {value}:")
+            emit(f"    if s[{k}] is None:")
+            emit(f"        s[{k}] = now")
+            emit(f"    {name} = 1 if now - s[{k}] >= {seconds!r} else 0")
+            emit("else:")
+            emit(f"    s[{k}] = None")
+            emit(f"    {name} = 0")
+        elif function == 'TOF':
+            # s[k]: 输入变为0的时间，输入为1时为None
+            self.state.append(float('-inf'))
+            emit(f"if {value}:")
+            emit(f"    s[{k}] = None")
+            emit(f"    {name} = 1")
+            emit("else:")
+            emit(f"    if s[{k}] is None:")
+            emit(f"        s[{k}] = now")
+            emit(f"    {name} = 1 if now - s[{k}] < {seconds!r} else 0")
+        else:
+            # s[k]: 脉冲开始时间，s[k+1]: 上一次的输入
+            self.state.extend((float('-inf'), 0))
+            emit(f"x = {value}")
+            emit(f"if x and not s[{k + 1}] and now - s[{k}] >= {seconds!r}:")
+            emit(f"    s[{k}] = now")
+            emit(f"s[{k + 1}] = x")
+            emit(f"{name} = 1 if now - s[{k}] < {seconds!r} else 0")
+        return name
+
+    def source(self, rules):
+        terms = []
+        for output, node in rules:
+            terms.append(f"{self.expr(node)} << {self.bit_count - 1 - output}")
+        lines = ["def evaluate(bits, now, s):"]
+        lines += [f"    {name} = bits >> {self.bit_count - 1 - bit} & 1" for bit, name in sorted(self.inputs.items())]
+        lines += [f"    {statement}" for statement in self.statements]
+        lines.append("    return " + (" | ".join(terms) if terms else "0"))
+        return "\n".join(lines) + "\n"
+
+
+class RuleProgram:
+    """编译后的规则集
+
+    evaluate(bits, now)的bits为bit_count位输入整数（I0为最高位），返回规则写入的输出位的值
+    （O0为最高位），mask为规则写入的全部输出位。定时器状态保存在程序中，
+    同一程序不能被多个线程同时调用。
+    """
+
+    def __init__(self, lines, time_budget=DEFAULT_TIME_BUDGET, bit_count=RULE_BIT_COUNT):
+        self.lines = tuple(lines)
+        self.bit_count = bit_count
+        rules = parse_rules(self.lines, bit_count)
+        generator = _CodeGenerator(bit_count)
+        self.source = generator.source(rules)  # 生成的代码，便于排查
+        namespace = {}
+        exec(compile(self.source, '<logic_rules>', 'exec'), namespace)
+        self._function = namespace['evaluate']
+        self._initial_state = generator.state
+        self._state = list(generator.state)
+        self.rule_count = len(rules)
+        self.cost = sum(rule_cost(node) for _, node in rules)  # 运算数
+        self.mask = sum(1 << (bit_count - 1 - output) for output, _ in rules)
+        self.stateless = not generator.state  # 没有定时器时输出只取决于当前输入
+        self.time_budget = time_budget
+        self.eval_count = 0
+        self.overrun_count = 0  # 求值时间超出预算的帧数
+        self.max_eval_time = 0.0
+
+    def evaluate(self, bits, now=None):
+        if now is None:
+            now = time.monotonic()
+        start = time.perf_counter()
+        result = self._function(bits, now, self._state)
+        elapsed = time.perf_counter() - start
+        self.eval_count += 1
+        if elapsed > self.max_eval_time:
+            self.max_eval_time = elapsed
+        if elapsed > self.time_budget:
+            self.overrun_count += 1
+        return result
+
+    def measure(self, samples=200):
+        """用随机输入试算，返回平均每帧求值时间（秒），不影响定时器状态；只用于显示，不决定是否接受规则"""
+        import random
+        rnd = random.Random(0)
+        inputs = [rnd.getrandbits(self.bit_count) for _ in range(samples)]
+        state = list(self._initial_state)
+        function = self._function
+        now = time.monotonic()
+        start = time.perf_counter()
+        for n, bits in enumerate(inputs):
+            function(bits, now + n * 0.01, state)
+        return (time.perf_counter() - start) / samples
+
+    def reset(self):
+        """定时器状态恢复初始值"""
+        self._state = list(self._initial_state)
+
+    def reset_stats(self):
+        self.eval_count = 0
+        self.overrun_count = 0
+        self.max_eval_time = 0.0
+
+
+def compile_rules(lines, time_budget=DEFAULT_TIME_BUDGET, bit_count=RULE_BIT_COUNT,
+                  cost_budget=DEFAULT_COST_BUDGET):
+    """编译规则文本（行列表），没有规则时返回None
+
+    bit_count为帧格式的位数；time_budget只用于运行时统计超时帧数。
+    语法错误或运算数超出cost_budget时抛出RuleError
+    """
+    program = RuleProgram(lines, time_budget, bit_count)
+    if not program.rule_count:
+        return None
+    if program.cost > cost_budget:
+        raise RuleError(f"{program.rule_count} 条规则共 {program.cost} 个运算，超出上限 {cost_budget}")
+    return program
+
+
+def random_rules(count, seed=0, timer_ratio=0.25):
+    """生成随机规则，用于性能测试"""
+    import random
+    rnd = random.Random(seed)
+
+    def operand():
+        text = f"I{rnd.randrange(RULE_BIT_COUNT)}"
+        return '!' + text if rnd.random() < 0.3 else text
+
+    lines = []
+    for output in range(count):
+        expression = operand()
+        for _ in range(rnd.randrange(1, 4)):
+            expression = f"{expression} {rnd.choice('&|^')} {operand()}"
+        if rnd.random() < timer_ratio:
+            expression = f"{rnd.choice(TIMER_FUNCTIONS)}({expression}, {rnd.randrange(10, 1000)})"
+        lines.append(f"O{output} = {expression}")
+    return lines
+
+
+def benchmark(frames=20000):
+    """192条规则的编译时间和每帧求值时间"""
+    import random
+    rnd = random.Random(1)
+    inputs = [rnd.getrandbits(RULE_BIT_COUNT) for _ in range(256)]
+    print(f"规则求值 {frames} 帧，时间预算 {DEFAULT_TIME_BUDGET * 1e6:.0f} µs/帧")
+    print(f"{'规则数':>6}{'定时器比例':>10}{'编译(ms)':>10}{'µs/帧':>10}{'帧/s':>10}{'最大(µs)':>10}")
+    for count, timer_ratio in ((16, 0), (192, 0), (192, 0.25), (192, 1)):
+        lines = random_rules(count, seed=count, timer_ratio=timer_ratio)
+        start = time.perf_counter()
+        program = compile_rules(lines)
+        compile_time = time.perf_counter() - start
+        now = time.monotonic()
+        start = time.perf_counter()
+        for n in range(frames):
+            program.evaluate(inputs[n & 0xFF], now + n * 0.01)
+        elapsed = (time.perf_counter() - start) / frames
+        print(f"{count:>6}{timer_ratio:>10.0%}{compile_time * 1000:>10.1f}{elapsed * 1e6:>10.1f}"
+              f"{1 / elapsed:>10.0f}{program.max_eval_time * 1e6:>10.1f}")
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("用法: python logic_rules.py --bench")
@@ -9,39 +9,45 @@ import logging
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QLabel, QComboBox, QPushButton, QTextEdit, QCheckBox, QStatusBar,
                              QGroupBox, QGridLayout, QMessageBox, QAction, QMenuBar, QFileDialog,
-                             QSpinBox, QTabWidget, QListWidget, QSplitter, QScrollArea, QTableWidget, QTableWidgetItem, QHeaderView, QInputDialog)
+                             QSpinBox, QTabWidget, QListWidget, QSplitter, QScrollArea, QTableWidget, QTableWidgetItem, QHeaderView, QInputDialog,
+                             QPlainTextEdit, QLineEdit)
 from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread, QTimer
-from PyQt5.QtGui import QFont, QTextCursor, QColor
+from PyQt5.QtGui import QFont, QColor
 from led_status_window import LEDStatusWindow
-
-
-class SerialThread(QThread):
-    """串口读取线程"""
-    data_received = pyqtSignal(bytes)
-
-    def __init__(self, serial_port):
-        super().__init__()
-        self.serial_port = serial_port
-        self.running = False
-
-    def run(self):
-        self.running = True
-        while self.running and self.serial_port.is_open:
-            try:
-                if self.serial_port.in_waiting:
-                    data = self.serial_port.read(self.serial_port.in_waiting)
-                    self.data_received.emit(data)
-                time.sleep(0.005)  # 平衡响应速度和CPU占用，适合10ms数据间隔
-            except Exception as e:
-                print(f"读取数据错误: {str(e)}")
-                break
-
-    def stop(self):
-        self.running = False
-        self.wait()
+from serial_io import SerialWriter
+from serial_threads import SerialThread, SerialWriterThread, ReplayThread
+from capture import CaptureRecorder
+from crc16 import BYTEORDER_BIG, crc16_bytes, crc16_swapped
+from display_buffer import DisplayBuffer
+from frame_assembler import FrameAssembler
+from port_session import SessionManager
+from multi_port_window import MultiPortWindow
+from output_gate import OutputGate
+from logic_rules import RuleError
+from frame_layout import DEFAULT_LAYOUT, FRAME_LAYOUTS, FrameLayout, layout_name
+from mapping_engine import MappingEngine
+from frame_store import DIRECTION_RX, DIRECTION_TX, FrameStore
+from hex_render import DEFAULT_HIGHLIGHTS, format_highlight_rules, parse_highlight_rules
+from receive_log import ReceiveLogModel, ReceiveLogView
+from refresh_governor import RefreshGovernor
+
+
+def _mapping_engine_property(name):
+    """把主窗口的映射配置属性转发到mapping_engine中对应的字典"""
+    return property(lambda self: getattr(self.mapping_engine, name),
+                    lambda self, value: setattr(self.mapping_engine, name, value))
 
 
 class AdvancedSerialTool(QMainWindow):
+    # 数据映射配置（I/O位映射），以位号字符串为键
+    bit_mapping = _mapping_engine_property('mapping')
+    bit_mapping_fanout = _mapping_engine_property('fanout')  # 每个输入的附加输出位列表（扇出）
+    frame_layout = property(lambda self: self.mapping_engine.layout)  # 当前帧格式，切换用set_frame_layout()
+    bit_mapping_enabled = _mapping_engine_property('enabled')  # 每个映射是否启用
+    bit_mapping_latch = _mapping_engine_property('latch')  # 每个映射是否启用自锁模式
+    bit_mapping_prev_values = _mapping_engine_property('prev_values')  # 上一次的输入值，用于检测上升沿
+    bit_mapping_latch_states = _mapping_engine_property('latch_states')  # 自锁模式下的输出状态
+
     def __init__(self):
         super().__init__()
 
@@ -51,9 +57,15 @@ class AdvancedSerialTool(QMainWindow):
         font.setPointSize(10)
         self.setFont(font)
 
-        # 串口对象和读取线程
+        # 串口对象、读取线程和发送线程
         self.ser = None
         self.serial_thread = None
+        self.serial_writer = None
+        self.capture_recorder = None  # 原始数据录制器
+        self.replay_thread = None  # 回放时代替读取线程
+
+        # 多串口会话（主串口之外同时监控的串口）
+        self.session_manager = SessionManager()
 
         # 数据统计
         self.rx_count = 0
@@ -67,30 +79,27 @@ class AdvancedSerialTool(QMainWindow):
         self.timer = QTimer()
         self.timer.timeout.connect(self.send_data)
         
-        # 定时更新启用映射列表
+        # 定时更新启用映射列表（映射窗口可见时每1000毫秒执行一次，由刷新调度启停）
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_enabled_mappings_list)
-        self.update_timer.start(1000)  # 每1000毫秒（1秒）执行一次
         
         # 数据缓冲机制 - 优化UI更新性能
-        self.data_buffer = []
+        # 显示缓冲有界，显示跟不上时按溢出策略丢弃显示条目，只在定时器中刷新接收区
+        self.data_buffer = DisplayBuffer(capacity=500)
+        # 收发记录存储：接收区显示、保存接收数据和自动生成都从这里读取
+        self.frame_store = FrameStore()
+        self._last_rx = (None, -1)  # 折叠重复时比较用的上一条接收数据和它的记录序号
+        self._repeats_pending = False  # 有重复折叠进已显示的行，需要重新绘制该行
+        # 有数据时才启动的单次定时器，间隔随接收帧率在20~200毫秒之间调整，由刷新调度启停
         self.buffer_timer = QTimer()
         self.buffer_timer.timeout.connect(self.flush_data_buffer)
-        self.buffer_timer.start(100)  # 每100毫秒批量处理一次缓冲数据，减少UI更新频率
-        self.max_buffer_size = 50  # 最大缓冲区大小，防止数据堆积
+        # 刷新调度：窗口不可见时暂停接收区、映射列表和LED窗口的刷新
+        self.refresh_governor = RefreshGovernor(self)
 
-        # 数据映射配置（I/O位映射）
-        self.bit_mapping = {}
-        self.bit_mapping_enabled = {}  # 存储每个映射是否启用
-        self.bit_mapping_latch = {}  # 存储每个映射是否启用自锁模式
-        self.bit_mapping_prev_values = {}  # 存储上一次的输入值，用于检测上升沿
-        self.bit_mapping_latch_states = {}  # 存储自锁模式下的输出状态
-        for i in range(192):  # 24字节 * 8位，对应D0~D23
-            self.bit_mapping[str(i)] = i  # 默认一一对应，使用字符串键
-            self.bit_mapping_enabled[str(i)] = False  # 默认禁用所有映射，使用字符串键
-            self.bit_mapping_latch[str(i)] = False  # 默认禁用自锁模式
-            self.bit_mapping_prev_values[str(i)] = 0  # 初始化上一次值为0
-            self.bit_mapping_latch_states[str(i)] = 0  # 初始化自锁状态为0
+        # 数据映射配置（I/O位映射），转换逻辑与异步桥接共用；帧格式（数据区长度、位序等）也由它保存
+        self.mapping_engine = MappingEngine(DEFAULT_LAYOUT)
+        # 定时发送的变化驱动模式：输出不变时只按保活周期重发
+        self.output_gate = OutputGate(enabled=False, keepalive=1.0)
 
         # 初始化 command_list
         self.command_list = QListWidget()
@@ -100,6 +109,11 @@ class AdvancedSerialTool(QMainWindow):
         # 初始化UI
         self.initUI()
 
+        self.refresh_governor.register('receive', self, self.buffer_timer, on_resume=self.catch_up_receive,
+                                       data_driven=True, slow=self.receive_view_is_behind)
+        self.refresh_governor.register('mapping_list', lambda: getattr(self, 'mapping_window', None),
+                                       self.update_timer, 1000, on_resume=self.update_enabled_mappings_list)
+
         # 初始化串口列表
         self.update_port_list()
 
@@ -150,6 +164,7 @@ class AdvancedSerialTool(QMainWindow):
         # 串口选择
         config_layout.addWidget(QLabel("串口:"), 0, 0)
         self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)  # 允许手动输入未被枚举的端口，如模拟器的伪终端
         config_layout.addWidget(self.port_combo, 0, 1)
 
         # 刷新串口按钮
@@ -209,10 +224,11 @@ class AdvancedSerialTool(QMainWindow):
         receive_group = QGroupBox("接收区")
         receive_layout = QVBoxLayout(receive_group)
 
-        # 接收文本框
-        self.receive_text = QTextEdit()
-        self.receive_text.setReadOnly(True)
-        receive_layout.addWidget(self.receive_text)
+        # 接收区：有界日志模型，视图只绘制可见行
+        self.receive_log = ReceiveLogModel(self.frame_store, parent=self)
+        self.receive_view = ReceiveLogView()
+        self.receive_view.setModel(self.receive_log)
+        receive_layout.addWidget(self.receive_view)
 
         # 接收区工具栏
         recv_tool_layout = QHBoxLayout()
@@ -222,6 +238,14 @@ class AdvancedSerialTool(QMainWindow):
         self.hex_recv_check.stateChanged.connect(self.update_display_mode)
         recv_tool_layout.addWidget(self.hex_recv_check)
 
+        # 十六进制显示的高亮规则，如 5A=green, EB=red
+        self.highlight_edit = QLineEdit(format_highlight_rules(DEFAULT_HIGHLIGHTS))
+        self.highlight_edit.setPlaceholderText("高亮: 5A=green, EB=red")
+        self.highlight_edit.setToolTip("十六进制显示时着色的字节，格式为 字节=颜色，多条用逗号分隔，留空不着色")
+        self.highlight_edit.setMaximumWidth(160)
+        self.highlight_edit.editingFinished.connect(self.apply_highlight_rules)
+        recv_tool_layout.addWidget(self.highlight_edit)
+
         self.timestamp_check = QCheckBox("显示时间戳")
         self.timestamp_check.setChecked(True)
         recv_tool_layout.addWidget(self.timestamp_check)
@@ -230,6 +254,79 @@ class AdvancedSerialTool(QMainWindow):
         self.auto_scroll_check.setChecked(True)
         recv_tool_layout.addWidget(self.auto_scroll_check)
 
+        # 连续相同的接收数据折叠为一行，显示重复次数和首末时间
+        self.collapse_repeats_check = QCheckBox("折叠重复")
+        self.collapse_repeats_check.setToolTip("连续收到相同的数据时只保留一条记录，显示重复次数和首次/末次时间")
+        recv_tool_layout.addWidget(self.collapse_repeats_check)
+
+        self.frame_mode_check = QCheckBox("按帧解析(5A)")
+        self.frame_mode_check.setToolTip("选中后按帧头重组定长帧，下游只接收完整帧，帧外的字节被丢弃；"
+                                         "默认不选中，按原样显示全部数据")
+        self.frame_mode_check.stateChanged.connect(self.update_frame_mode)
+        recv_tool_layout.addWidget(self.frame_mode_check)
+
+        # 帧格式：数据区长度决定I/O位数，映射、信号检测和指令生成都按它处理
+        self.frame_layout_combo = QComboBox()
+        self.frame_layout_combo.addItems(list(FRAME_LAYOUTS))
+        self.frame_layout_combo.setToolTip("输入/输出帧的数据区长度（I/O位数）")
+        self.frame_layout_combo.currentTextChanged.connect(self.select_frame_layout)
+        recv_tool_layout.addWidget(self.frame_layout_combo)
+
+        # 批量传递：读取线程按时间窗口或帧数累积后一次性交给界面
+        recv_tool_layout.addWidget(QLabel("批量:"))
+        self.batch_interval_spin = QSpinBox()
+        self.batch_interval_spin.setRange(0, 100)
+        self.batch_interval_spin.setValue(10)
+        self.batch_interval_spin.setSuffix(" ms")
+        self.batch_interval_spin.setToolTip("读取线程累积数据的时间窗口，0表示每次读取后立即交付")
+        self.batch_interval_spin.valueChanged.connect(self.update_batch_settings)
+        recv_tool_layout.addWidget(self.batch_interval_spin)
+        self.batch_frames_spin = QSpinBox()
+        self.batch_frames_spin.setRange(1, 1000)
+        self.batch_frames_spin.setValue(100)
+        self.batch_frames_spin.setSuffix(" 帧")
+        self.batch_frames_spin.setToolTip("单批最多条数，达到后立即交付")
+        self.batch_frames_spin.valueChanged.connect(self.update_batch_settings)
+        recv_tool_layout.addWidget(self.batch_frames_spin)
+
+        # 显示溢出策略：只影响接收区显示，不影响映射、自锁和录制
+        recv_tool_layout.addWidget(QLabel("显示上限:"))
+        self.display_capacity_spin = QSpinBox()
+        self.display_capacity_spin.setRange(10, 10000)
+        self.display_capacity_spin.setValue(500)
+        self.display_capacity_spin.setSuffix(" 条")
+        self.display_capacity_spin.setToolTip("每次刷新接收区最多显示的条数")
+        self.display_capacity_spin.valueChanged.connect(self.update_display_policy)
+        recv_tool_layout.addWidget(self.display_capacity_spin)
+        self.display_policy_combo = QComboBox()
+        self.display_policy_combo.addItem("丢弃最旧", DisplayBuffer.POLICY_DROP_OLDEST)
+        self.display_policy_combo.addItem("丢弃最新", DisplayBuffer.POLICY_DROP_NEWEST)
+        self.display_policy_combo.addItem("均匀抽样", DisplayBuffer.POLICY_SAMPLE)
+        self.display_policy_combo.addItem("汇总省略", DisplayBuffer.POLICY_SUMMARIZE)
+        self.display_policy_combo.setToolTip("显示跟不上接收速度时的处理方式")
+        self.display_policy_combo.currentIndexChanged.connect(self.update_display_policy)
+        recv_tool_layout.addWidget(self.display_policy_combo)
+
+        # 收发记录存储容量：帧数或字节数任一达到上限时淘汰最旧的记录
+        recv_tool_layout.addWidget(QLabel("历史:"))
+        self.history_frames_spin = QSpinBox()
+        self.history_frames_spin.setRange(1000, 1000000)
+        self.history_frames_spin.setSingleStep(10000)
+        self.history_frames_spin.setValue(self.frame_store.capacity_frames)
+        self.history_frames_spin.setSuffix(" 帧")
+        self.history_frames_spin.setKeyboardTracking(False)
+        self.history_frames_spin.setToolTip("收发记录最多保存的条数，保存接收数据和自动生成从记录中读取")
+        self.history_frames_spin.valueChanged.connect(self.update_history_capacity)
+        recv_tool_layout.addWidget(self.history_frames_spin)
+        self.history_mb_spin = QSpinBox()
+        self.history_mb_spin.setRange(1, 512)
+        self.history_mb_spin.setValue(self.frame_store.capacity_bytes // (1024 * 1024))
+        self.history_mb_spin.setSuffix(" MB")
+        self.history_mb_spin.setKeyboardTracking(False)
+        self.history_mb_spin.setToolTip("收发记录数据部分的内存上限（启动时预分配）")
+        self.history_mb_spin.valueChanged.connect(self.update_history_capacity)
+        recv_tool_layout.addWidget(self.history_mb_spin)
+
         self.clear_recv_btn = QPushButton("清空接收区")
         self.clear_recv_btn.clicked.connect(self.clear_receive)
         recv_tool_layout.addWidget(self.clear_recv_btn)
@@ -239,6 +336,16 @@ class AdvancedSerialTool(QMainWindow):
         self.save_recv_btn.clicked.connect(self.save_receive_data)
         recv_tool_layout.addWidget(self.save_recv_btn)
 
+        # 原始数据录制与回放
+        self.capture_btn = QPushButton("开始录制")
+        self.capture_btn.setToolTip("把串口收发的原始字节连同时间戳录制到文件")
+        self.capture_btn.clicked.connect(self.toggle_capture)
+        recv_tool_layout.addWidget(self.capture_btn)
+        self.replay_btn = QPushButton("回放录制")
+        self.replay_btn.setToolTip("把录制文件中的接收数据送入接收处理流程（需先关闭串口）")
+        self.replay_btn.clicked.connect(self.toggle_replay)
+        recv_tool_layout.addWidget(self.replay_btn)
+
         receive_layout.addLayout(recv_tool_layout)
 
         # 接收统计
@@ -251,6 +358,9 @@ class AdvancedSerialTool(QMainWindow):
         self.tx_count_label = QLabel("0")
         stats_layout.addWidget(self.tx_count_label)
         stats_layout.addStretch()
+        self.frame_stats_label = QLabel("")
+        stats_layout.addWidget(self.frame_stats_label)
+        stats_layout.addStretch()
         self.reset_stats_btn = QPushButton("重置统计")
         self.reset_stats_btn.clicked.connect(self.reset_stats)
         stats_layout.addWidget(self.reset_stats_btn)
@@ -296,14 +406,15 @@ class AdvancedSerialTool(QMainWindow):
         mapping_grid.addWidget(QLabel("启用"), 0, 2)
 
         # 添加映射配置行
-        for i in range(192):  # 24字节 * 8位 = 192位 (D0~D23)
+        bit_count = self.frame_layout.bit_count
+        for i in range(bit_count):  # 数据区字节数 * 8位（默认24字节192位，D0~D23）
             row = i + 1
             byte_num = i // 8
             bit_num = i % 8
             input_label = QLabel(f"I{i} (D{byte_num}.{bit_num})")
             output_spin = QSpinBox()
             output_spin.setObjectName(f"output_spin_{i}")
-            output_spin.setRange(0, 191)  # 输出位范围0-191
+            output_spin.setRange(0, bit_count - 1)  # 输出位范围
             output_spin.setValue(self.bit_mapping[str(i)])
             output_spin.setEnabled(self.bit_mapping_enabled[str(i)])  # 设置初始可编辑状态
             output_spin.valueChanged.connect(lambda value, bit=i: self.update_bit_mapping(bit, value))
@@ -456,6 +567,11 @@ class AdvancedSerialTool(QMainWindow):
         led_status_action.triggered.connect(self.open_led_status_window)
         tool_menu.addAction(led_status_action)
 
+        # 多串口监控菜单项
+        multi_port_action = QAction("多串口监控", self)
+        multi_port_action.triggered.connect(self.open_multi_port_window)
+        tool_menu.addAction(multi_port_action)
+
         # 帮助菜单
         help_menu = menubar.addMenu("帮助")
 
@@ -488,18 +604,22 @@ class AdvancedSerialTool(QMainWindow):
         # 创建信号检测窗口类
         class SignalDetectionWindow(QWidget):
             data_received = pyqtSignal(bytes)
-            def __init__(self):
+            def __init__(self, frame_layout):
                 super().__init__()
+                self.frame_layout = frame_layout  # 行数、帧头和位序取自帧格式
+                self.last_payload = b''  # 上次显示的数据区，只更新变化的字节
                 self.setWindowTitle('信号检测')
                 self.setGeometry(200, 200, 890, 618)
                 self.init_ui()
                 
             def init_ui(self):
                 layout = QVBoxLayout()
+                frame_layout = self.frame_layout
+                data_length = frame_layout.data_length
                 
                 # 添加起始字节检测状态
                 status_layout = QHBoxLayout()
-                self.start_byte_label = QLabel('起始字节(5A)状态：')
+                self.start_byte_label = QLabel(f'起始字节({frame_layout.input_header:02X})状态：')
                 self.start_byte_status = QLabel('未检测到')
                 self.start_byte_status.setStyleSheet('color: red')
                 status_layout.addWidget(self.start_byte_label)
@@ -509,21 +629,21 @@ class AdvancedSerialTool(QMainWindow):
                 
                 # 创建表格
                 self.table = QTableWidget()
-                self.table.setRowCount(24)  # D0-D23
+                self.table.setRowCount(data_length)  # D0~Dn-1
                 self.table.setColumnCount(9)  # 8位数据 + 1列字节值
                 
                 # 设置表头
                 headers = ['Bit7', 'Bit6', 'Bit5', 'Bit4', 'Bit3', 'Bit2', 'Bit1', 'Bit0', '字节值(HEX)']
                 self.table.setHorizontalHeaderLabels(headers)
                 
-                # 设置垂直表头（D0-D23）和I标签说明
+                # 设置垂直表头（D0~Dn-1）和I标签说明，位序为LSB时Bit0是每个字节的第一个输入位
                 v_headers = []
-                for i in range(24):
+                for i in range(data_length):
                     v_headers.append(f'D{i} (I{i*8}-I{i*8+7})')
                 self.table.setVerticalHeaderLabels(v_headers)
                 
                 # 初始化表格内容
-                for i in range(24):
+                for i in range(data_length):
                     for j in range(9):
                         item = QTableWidgetItem('0')
                         item.setTextAlignment(Qt.AlignCenter)
@@ -531,13 +651,15 @@ class AdvancedSerialTool(QMainWindow):
                 
                 # 设置表格样式
                 self.table.setStyleSheet('QTableWidget {gridline-color: #d0d0d0}')
-                for i in range(8):
-                    self.table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeToContents)
-                self.table.horizontalHeader().setSectionResizeMode(8, QHeaderView.Stretch)
-                self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
                 
-                # 自动调整列宽
+                # 按初始内容调整一次行高列宽后固定：ResizeToContents模式下每次改动单元格
+                # 都要重新测量所有行，1024位（128行）时每帧的开销随行数增长
                 self.table.resizeColumnsToContents()
+                self.table.resizeRowsToContents()
+                for i in range(8):
+                    self.table.horizontalHeader().setSectionResizeMode(i, QHeaderView.Fixed)
+                self.table.horizontalHeader().setSectionResizeMode(8, QHeaderView.Stretch)
+                self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
                 
                 layout.addWidget(self.table)
                 self.setLayout(layout)
@@ -548,7 +670,7 @@ class AdvancedSerialTool(QMainWindow):
                     return
                     
                 # 检查起始字节
-                if data[0] == 0x5A:
+                if data[0] == self.frame_layout.input_header:
                     if self.start_byte_status.text() != '已检测到':
                         self.start_byte_status.setText('已检测到')
                         self.start_byte_status.setStyleSheet('color: green')
@@ -558,11 +680,19 @@ class AdvancedSerialTool(QMainWindow):
                         self.start_byte_status.setStyleSheet('color: red')
                     return
                 
+                payload = bytes(self.frame_layout.payload(data))
+                last_payload = self.last_payload
+                if payload == last_payload:
+                    return  # 数据未变化，不暂停/恢复更新，避免整表重绘
+                self.last_payload = payload
+                
                 # 批量更新表格数据，减少重绘次数
                 self.table.setUpdatesEnabled(False)  # 暂停更新
                 
-                for i in range(min(24, len(data)-1)):  # 跳过起始字节5A
-                    byte_data = data[i+1]  # 数据从第二个字节开始
+                for i, byte_data in enumerate(payload):  # 跳过起始字节
+                    # 只处理与上次不同的字节，每帧的开销取决于变化的字节数而不是数据区长度
+                    if i < len(last_payload) and last_payload[i] == byte_data:
+                        continue
                     
                     # 更新8个位的值
                     for j in range(8):
@@ -589,7 +719,7 @@ class AdvancedSerialTool(QMainWindow):
                 
                 self.table.setUpdatesEnabled(True)  # 恢复更新
                     
-        self.signal_detection_window = SignalDetectionWindow()
+        self.signal_detection_window = SignalDetectionWindow(self.frame_layout)
         
         # 为信号检测窗口添加布局记忆
         self.load_sub_window_layout(self.signal_detection_window, 'signal_detection_window')
@@ -600,11 +730,11 @@ class AdvancedSerialTool(QMainWindow):
             event.accept()
         self.signal_detection_window.closeEvent = closeEvent
         
+        # 接收数据由update_receive_text按批转发给信号检测窗口，窗口不可见时跳过，重新可见时显示最新一帧
+        window = self.signal_detection_window
+        self.refresh_governor.register('signal_detection', window,
+                                       on_resume=lambda: window.update_table(getattr(self, 'last_received_data', b'')))
         self.signal_detection_window.show()
-        
-        # 连接数据接收信号
-        if hasattr(self, 'serial_thread') and self.serial_thread:
-            self.serial_thread.data_received.connect(self.signal_detection_window.data_received)
 
     def open_led_status_window(self):
         """打开LED状态显示窗口"""
@@ -624,16 +754,45 @@ class AdvancedSerialTool(QMainWindow):
             event.accept()
         self.led_status_window.closeEvent = closeEvent
         
+        # LED窗口每100ms轮询一次状态，窗口不可见时暂停
+        window = self.led_status_window
+        self.refresh_governor.register('led_status', window, window.update_timer, 100,
+                                       on_resume=window.update_displays)
+
         # 加载自锁配置并显示窗口
         self.led_status_window.load_latch_configuration()
         self.led_status_window.show()
 
+    def open_multi_port_window(self):
+        """打开多串口监控窗口"""
+        if hasattr(self, 'multi_port_window') and self.multi_port_window and self.multi_port_window.isVisible():
+            self.multi_port_window.raise_()
+            self.multi_port_window.activateWindow()
+            return
+
+        self.multi_port_window = MultiPortWindow(
+            self.session_manager, busy_port=lambda: self.ser.port if self.ser and self.ser.is_open else None,
+            frame_layout=lambda: self.frame_layout)
+
+        # 为多串口监控窗口添加布局记忆
+        self.load_sub_window_layout(self.multi_port_window, 'multi_port_window')
+
+        # 添加关闭事件处理，保存布局后按窗口原有方式关闭所有会话
+        def closeEvent(event):
+            self.save_sub_window_layout(self.multi_port_window, 'multi_port_window')
+            MultiPortWindow.closeEvent(self.multi_port_window, event)
+        self.multi_port_window.closeEvent = closeEvent
+
+        self.multi_port_window.show()
+
     def toggle_serial(self):
         """打开或关闭串口"""
         if self.ser and self.ser.is_open:
             self.close_serial()
         else:
             self.open_serial()
+        # 统计栏只在刷新接收区时更新，串口状态变化时立即更新一次
+        self.update_frame_stats()
 
     def open_serial(self):
         """打开串口"""
@@ -641,6 +800,9 @@ class AdvancedSerialTool(QMainWindow):
         if not port:
             QMessageBox.warning(self, "警告", "请选择串口")
             return
+        if port in self.session_manager.sessions:
+            QMessageBox.warning(self, "警告", f"{port} 已在多串口监控中打开，请先关闭该会话")
+            return
 
         try:
             baudrate = int(self.baudrate_combo.currentText())
@@ -696,9 +858,21 @@ class AdvancedSerialTool(QMainWindow):
                 self.refresh_btn.setEnabled(False)
 
                 # 启动读取线程
-                self.serial_thread = SerialThread(self.ser)
-                self.serial_thread.data_received.connect(self.update_receive_text)
+                frame_assembler = FrameAssembler.for_layout(self.frame_layout) if self.frame_mode_check.isChecked() else None
+                self.serial_thread = SerialThread(self.ser, frame_assembler=frame_assembler,
+                                                  batch_interval=self.batch_interval_spin.value() / 1000,
+                                                  batch_max_items=self.batch_frames_spin.value())
+                self.serial_thread.batch_received.connect(self.update_receive_text)
+                self.serial_thread.recorder = self.capture_recorder
                 self.serial_thread.start()
+
+                # 启动发送线程，所有发送都经由发送队列
+                self.serial_writer = SerialWriterThread(self.ser)
+                self.serial_writer.bytes_written.connect(self.on_bytes_written)
+                self.serial_writer.write_error.connect(
+                    lambda message: self.statusBar.showMessage(f"发送数据错误: {message}"))
+                self.serial_writer.writer.recorder = self.capture_recorder
+                self.serial_writer.start()
             else:
                 self.statusBar.showMessage(f"无法打开串口 {port}")
                 QMessageBox.critical(self, "错误", f"无法打开串口 {port}")
@@ -735,6 +909,10 @@ class AdvancedSerialTool(QMainWindow):
             self.serial_thread.wait()  # 等待线程完全停止
             self.serial_thread = None
 
+        if self.serial_writer and self.serial_writer.isRunning():
+            self.serial_writer.stop()
+            self.serial_writer = None
+
         if self.ser and self.ser.is_open:
             try:
                 self.ser.close()
@@ -753,6 +931,106 @@ class AdvancedSerialTool(QMainWindow):
             except Exception as e:
                 self.statusBar.showMessage(f"关闭串口错误: {str(e)}")
 
+    def update_frame_mode(self):
+        """切换按帧解析模式，串口打开时立即生效"""
+        if self.serial_thread:
+            if self.frame_mode_check.isChecked():
+                self.serial_thread.frame_assembler = FrameAssembler.for_layout(self.frame_layout)
+            else:
+                self.serial_thread.frame_assembler = None
+        self.update_frame_stats()
+
+    def select_frame_layout(self, name):
+        """帧格式下拉框切换"""
+        layout = FRAME_LAYOUTS.get(name)
+        if layout is not None:
+            self.set_frame_layout(layout)
+
+    def set_frame_layout(self, layout):
+        """切换帧格式
+
+        映射配置中仍在新位数范围内的部分保留，自锁状态清零；逻辑规则的位号超出时清除规则。
+        映射配置、信号检测和指令生成窗口的行数取决于位数，已打开的会关闭，下次打开时按新格式创建。
+        返回帧格式是否改变。
+        """
+        if layout == self.frame_layout:
+            return False
+        config = self.mapping_engine.to_config()
+        del config['latch_states']
+        try:
+            engine = MappingEngine.from_config(config, layout)
+        except RuleError as e:
+            QMessageBox.warning(self, "逻辑规则", f"逻辑规则不适用于新的帧格式，已清除：{e}")
+            config['rules'] = []
+            engine = MappingEngine.from_config(config, layout)
+        self.mapping_engine = engine
+        self.output_gate.reset()
+
+        self.frame_mode_check.setText(f"按帧解析({layout.input_header:02X})")
+        if self.serial_thread and self.frame_mode_check.isChecked():
+            self.serial_thread.frame_assembler = FrameAssembler.for_layout(layout)
+        for name in ('mapping_window', 'signal_detection_window', 'command_generator_window'):
+            window = getattr(self, name, None)
+            if window is not None and window.isVisible():
+                window.close()
+
+        name = layout_name(layout)
+        if self.frame_layout_combo.findText(name) < 0:
+            self.frame_layout_combo.addItem(name)  # 从文件加载的非预设格式
+        self.frame_layout_combo.blockSignals(True)
+        self.frame_layout_combo.setCurrentText(name)
+        self.frame_layout_combo.blockSignals(False)
+        self.update_frame_stats()
+        self.statusBar.showMessage(f"帧格式: {layout.describe()}")
+        return True
+
+    def write_serial(self, data, priority=SerialWriter.PRIORITY_NORMAL):
+        """通过发送线程异步写串口，发送计数在写入完成后更新
+
+        Returns:
+            bool: 是否已加入发送队列
+        """
+        if not self.serial_writer:
+            return False
+        if not self.serial_writer.submit(data, priority):
+            self.statusBar.showMessage("发送队列已满，数据被丢弃")
+            return False
+        return True
+
+    def on_bytes_written(self, count):
+        """发送线程写入完成后更新发送计数"""
+        self.tx_count += count
+        self.tx_count_label.setText(str(self.tx_count))
+
+    def update_batch_settings(self):
+        """更新批量传递参数，串口打开时立即生效"""
+        if self.serial_thread:
+            self.serial_thread.batch_interval = self.batch_interval_spin.value() / 1000
+            self.serial_thread.batch_max_items = self.batch_frames_spin.value()
+
+    def update_frame_stats(self):
+        """更新帧组装和批量队列统计显示"""
+        if not self.serial_thread:
+            text = ""
+        else:
+            text = (f"待处理批次: {self.serial_thread.pending_batches}"
+                    f"(峰值 {self.serial_thread.max_pending_batches})")
+            if self.serial_writer:
+                text += f"  发送队列: {self.serial_writer.writer.queue_depth}"
+            assembler = self.serial_thread.frame_assembler
+            if assembler is not None:
+                text = (f"帧: {assembler.frame_count}  重同步: {assembler.resync_count}  "
+                        f"丢弃字节: {assembler.garbage_bytes}  ") + text
+        if self.data_buffer.dropped_count:
+            text += f"  未显示: {self.data_buffer.dropped_count}"
+        if self.mapping_engine.cache_hits + self.mapping_engine.cache_misses:
+            text += f"  输出缓存命中: {self.mapping_engine.cache_hit_rate:.0%}"
+        program = self.mapping_engine.rule_program
+        if program is not None and program.overrun_count:
+            text += f"  规则超时: {program.overrun_count}"
+        if self.frame_stats_label.text() != text:
+            self.frame_stats_label.setText(text)
+
     def create_mapping_config_window(self):
         """创建映射配置窗口"""
         self.mapping_window = QWidget()
@@ -798,6 +1076,44 @@ class AdvancedSerialTool(QMainWindow):
         self.enabled_mappings_list = QListWidget()
         right_column_layout.addWidget(self.enabled_mappings_list)
 
+        # 扇出：一个输入位驱动多个输出位；多个输入路由到同一输出位时按位或
+        fanout_layout = QHBoxLayout()
+        fanout_layout.addWidget(QLabel('附加输出:'))
+        self.fanout_input_spin = QSpinBox()
+        self.fanout_input_spin.setRange(0, self.frame_layout.bit_count - 1)
+        self.fanout_input_spin.setPrefix('I')
+        self.fanout_input_spin.valueChanged.connect(self.show_fanout)
+        fanout_layout.addWidget(self.fanout_input_spin)
+        self.fanout_edit = QLineEdit()
+        self.fanout_edit.setPlaceholderText('如 10, 11, 20-23')
+        self.fanout_edit.returnPressed.connect(self.apply_fanout)
+        fanout_layout.addWidget(self.fanout_edit)
+        fanout_btn = QPushButton('设置')
+        fanout_btn.clicked.connect(self.apply_fanout)
+        fanout_layout.addWidget(fanout_btn)
+        right_column_layout.addLayout(fanout_layout)
+        self.show_fanout(0)
+
+        # 逻辑规则：与/或/非和定时器，覆盖1:1映射写入的输出位
+        rules_header_layout = QHBoxLayout()
+        rules_header_layout.addWidget(QLabel('逻辑规则:'))
+        apply_rules_btn = QPushButton('应用规则')
+        apply_rules_btn.clicked.connect(self.apply_logic_rules)
+        rules_header_layout.addWidget(apply_rules_btn)
+        right_column_layout.addLayout(rules_header_layout)
+        self.rules_edit = QPlainTextEdit()
+        self.rules_edit.setPlaceholderText('每行一条规则，例如：\n'
+                                           'O10 = I3 & I4\n'
+                                           'O11 = I5 | !I6\n'
+                                           'O12 = TON(I7, 500)   # 接通延时500ms\n'
+                                           'O13 = TOF(I8, 200)   # 断开延时200ms\n'
+                                           'O14 = TP(I9, 100)    # 100ms定宽脉冲')
+        self.rules_edit.setPlainText('\n'.join(self.mapping_engine.rules))
+        right_column_layout.addWidget(self.rules_edit)
+        self.rules_status_label = QLabel()
+        right_column_layout.addWidget(self.rules_status_label)
+        self.update_rules_status()
+
         main_horizontal_layout.addLayout(left_column_layout, 2) # Give more space to left column
         main_horizontal_layout.addLayout(right_column_layout, 1)
 
@@ -824,7 +1140,8 @@ class AdvancedSerialTool(QMainWindow):
         layout.addWidget(scroll_area)
 
         # 初始化映射项
-        for i in range(192):
+        bit_count = self.frame_layout.bit_count
+        for i in range(bit_count):
             # 创建单个映射项的布局
             item_layout = QHBoxLayout()
             item_layout.setContentsMargins(0, 0, 0, 0)
@@ -837,7 +1154,7 @@ class AdvancedSerialTool(QMainWindow):
 
             # 输出位
             output_spin = QSpinBox()
-            output_spin.setRange(0, 191)
+            output_spin.setRange(0, bit_count - 1)
             output_spin.setValue(i)
             output_spin.valueChanged.connect(lambda v, row=i: self.update_mapping(row, v))
             output_spin.setFixedWidth(50)
@@ -875,7 +1192,7 @@ class AdvancedSerialTool(QMainWindow):
 
         # 存储对当前值标签的引用，以便后续更新
         self.mapping_value_labels = []
-        for i in range(192):
+        for i in range(bit_count):
             # 找到对应的QLabel
             label = self.mapping_grid_layout.itemAtPosition(i // 2, (i % 2) * 4 + 3).widget()
             self.mapping_value_labels.append(label)
@@ -896,9 +1213,27 @@ class AdvancedSerialTool(QMainWindow):
         self.timer_interval.setValue(1000)  # 默认1秒
         self.timer_interval.setSuffix('ms')
         
+        # 变化驱动：输出帧与上次发送的相同时不发送，保活周期到期时重发
+        self.send_on_change_check = QCheckBox('仅变化时发送')
+        self.send_on_change_check.setChecked(self.output_gate.enabled)
+        self.send_on_change_check.toggled.connect(self.update_output_gate)
+        self.keepalive_spin = QSpinBox()
+        self.keepalive_spin.setRange(0, 60000)
+        self.keepalive_spin.setSingleStep(100)
+        self.keepalive_spin.setSuffix('ms')
+        self.keepalive_spin.setSpecialValueText('不保活')
+        self.keepalive_spin.setValue(int(self.output_gate.keepalive * 1000))
+        self.keepalive_spin.valueChanged.connect(self.update_output_gate)
+        self.tx_saved_label = QLabel()
+        self.update_tx_saved_label()
+
         timer_layout.addWidget(self.timer_enable_btn)
         timer_layout.addWidget(QLabel('发送间隔：'))
         timer_layout.addWidget(self.timer_interval)
+        timer_layout.addWidget(self.send_on_change_check)
+        timer_layout.addWidget(QLabel('保活周期：'))
+        timer_layout.addWidget(self.keepalive_spin)
+        timer_layout.addWidget(self.tx_saved_label)
         timer_layout.addStretch()
         
         timer_group.setLayout(timer_layout)
@@ -921,16 +1256,19 @@ class AdvancedSerialTool(QMainWindow):
             self.save_sub_window_layout(self.mapping_window, 'mapping_window')
             event.accept()
         self.mapping_window.closeEvent = closeEvent
-        
+
+        self.refresh_governor.watch(self.mapping_window)
         self.mapping_window.show()
         
     def update_mapping(self, input_bit, output_bit):
         """更新位映射配置"""
         self.bit_mapping[str(input_bit)] = output_bit
+        self.mapping_engine.invalidate()
 
     def update_bit_mapping(self, bit, value):
         """更新位映射配置并刷新已启用列表"""
         self.bit_mapping[str(bit)] = value
+        self.mapping_engine.invalidate()
         # 如果该位已启用，更新已启用映射列表
         if self.bit_mapping_enabled.get(str(bit), False):
             self.update_enabled_mappings_list()
@@ -938,6 +1276,7 @@ class AdvancedSerialTool(QMainWindow):
     def toggle_mapping(self, bit, enabled, spin_box=None):
         """切换映射启用状态"""
         self.bit_mapping_enabled[str(bit)] = enabled
+        self.mapping_engine.invalidate()
         if spin_box:
             spin_box.setEnabled(enabled)
         # 更新已启用映射列表
@@ -946,84 +1285,67 @@ class AdvancedSerialTool(QMainWindow):
     def toggle_latch_mode(self, bit, enabled):
         """切换自锁模式状态"""
         self.bit_mapping_latch[str(bit)] = enabled
+        self.mapping_engine.invalidate()
         # 重置自锁状态和上一次值
         if enabled:
             self.bit_mapping_latch_states[str(bit)] = 0
             self.bit_mapping_prev_values[str(bit)] = 0
             
-    def process_latch_mode(self, data):
-        """处理自锁模式 - 检测上升沿并切换输出状态"""
-        if len(data) < 24:  # 确保数据长度足够（24字节对应192位）
-            return
-            
-        # 遍历所有启用自锁模式的映射
-        for bit_str, is_latch_enabled in self.bit_mapping_latch.items():
-            if not is_latch_enabled:
-                continue
-                
-            bit = int(bit_str)
-            byte_index = bit // 8
-            bit_index = bit % 8
-            
-            if byte_index >= len(data):
-                continue
-                
-            # 获取当前位的值
-            current_value = (data[byte_index] >> bit_index) & 1
-            prev_value = self.bit_mapping_prev_values[bit_str]
-            
-            # 检测上升沿（从0变为1）
-            if prev_value == 0 and current_value == 1:
-                # 切换输出状态
-                self.bit_mapping_latch_states[bit_str] = 1 - self.bit_mapping_latch_states[bit_str]
-                
-                # 如果该位的映射也启用了，需要更新输出数据
-                if self.bit_mapping_enabled.get(bit_str, False):
-                    output_bit = self.bit_mapping.get(bit_str, bit)
-                    self.update_output_bit(output_bit, self.bit_mapping_latch_states[bit_str])
-            
-            # 更新上一次的值
-            self.bit_mapping_prev_values[bit_str] = current_value
-            
-    def update_output_bit(self, output_bit, value):
-        """更新输出位的值并发送数据"""
-        try:
-            # 构造输出数据（24字节，192位）
-            output_data = bytearray(24)
-            
-            # 设置指定位的值
-            byte_index = output_bit // 8
-            bit_index = output_bit % 8
-            
-            if value:
-                output_data[byte_index] |= (1 << bit_index)
-            else:
-                output_data[byte_index] &= ~(1 << bit_index)
-                
-            # 发送输出数据
-            if self.ser and self.ser.is_open:
-                self.ser.write(output_data)
-                self.tx_count += len(output_data)
-                self.tx_count_label.setText(str(self.tx_count))
-                
-        except Exception as e:
-            print(f"更新输出位时出错: {e}")
-
     def update_enabled_mappings_list(self):
         """更新已启用映射列表"""
         if not hasattr(self, 'enabled_mappings_list'): # Ensure the list widget exists
             return
-        self.enabled_mappings_list.clear()
+        items = []
         for bit, enabled in self.bit_mapping_enabled.items():
             if enabled:
-                # Find the corresponding output bit from self.bit_mapping
-                output_bit = self.bit_mapping.get(str(bit), bit) # Default to input bit if not found
+                # 映射的输出位和附加输出位（扇出）
+                outputs = ', '.join(f'O{output_bit}' for output_bit in self.mapping_engine.outputs_of(bit))
                 
                 # 检查是否启用了自锁模式
                 latch_enabled = self.bit_mapping_latch.get(str(bit), False)
                 latch_indicator = ' 🔒' if latch_enabled else ''
                 
-                self.enabled_mappings_list.addItem(f'I{bit} -> O{output_bit}{latch_indicator}')
+                items.append(f'I{bit} -> {outputs}{latch_indicator}')
+        # 内容没有变化时不重建列表，保留选中项和滚动位置
+        if [self.enabled_mappings_list.item(i).text() for i in range(self.enabled_mappings_list.count())] == items:
+            return
+        self.enabled_mappings_list.clear()
+        self.enabled_mappings_list.addItems(items)
+
+    def show_fanout(self, bit):
+        """在编辑框中显示输入位的附加输出位"""
+        outputs = self.bit_mapping_fanout.get(str(bit), [])
+        self.fanout_edit.setText(', '.join(str(output_bit) for output_bit in outputs))
+
+    def apply_fanout(self):
+        """设置输入位的附加输出位，支持逗号分隔和a-b范围"""
+        bit = self.fanout_input_spin.value()
+        outputs = []
+        try:
+            for part in self.fanout_edit.text().replace('，', ',').split(','):
+                part = part.strip().lstrip('Oo')
+                if not part:
+                    continue
+                if '-' in part:
+                    first, last = (int(value.strip().lstrip('Oo')) for value in part.split('-', 1))
+                    outputs.extend(range(first, last + 1))
+                else:
+                    outputs.append(int(part))
+        except ValueError:
+            QMessageBox.warning(self.mapping_window, "格式错误", "附加输出位应为逗号分隔的位号或范围，如 10, 11, 20-23")
+            return
+        bit_count = self.frame_layout.bit_count
+        invalid = [output_bit for output_bit in outputs if not 0 <= output_bit < bit_count]
+        if invalid:
+            QMessageBox.warning(self.mapping_window, "格式错误", f"输出位 {invalid[0]} 超出0~{bit_count - 1}")
+            return
+        if outputs:
+            self.bit_mapping_fanout[str(bit)] = outputs
+        else:
+            self.bit_mapping_fanout.pop(str(bit), None)
+        self.mapping_engine.invalidate()
+        self.update_enabled_mappings_list()
+        self.statusBar.showMessage(f"I{bit} 附加输出位已更新")
         
     def toggle_auto_send_status(self):
         """切换定时发送按钮状态并执行相应操作"""
@@ -1050,7 +1372,8 @@ class AdvancedSerialTool(QMainWindow):
                 self.update_auto_send_button_style()
                 return
                 
-            # 启动定时器
+            # 启动定时器，第一帧总是发送
+            self.output_gate.reset()
             interval = self.timer_interval.value()
             if not hasattr(self, 'send_timer') or not self.send_timer:
                 self.send_timer = QTimer(self)
@@ -1077,7 +1400,12 @@ class AdvancedSerialTool(QMainWindow):
                 # 处理数据并发送
                 processed_data = self.convert_data(self.last_received_data)
                 if processed_data:
-                    self.ser.write(processed_data)
+                    if self.output_gate.should_send(processed_data):
+                        # 发送队列已满时不记为已发送，下次定时发送时重试
+                        if self.write_serial(processed_data, SerialWriter.PRIORITY_OUTPUT):
+                            self.output_gate.mark_sent(processed_data)
+                    else:
+                        self.update_tx_saved_label()
                     # 更新映射表格中的当前值
                     self.update_mapping_values(processed_data)
             except Exception as e:
@@ -1088,19 +1416,51 @@ class AdvancedSerialTool(QMainWindow):
                 self._is_auto_sending = False
                 self.update_auto_send_button_style()
 
+    def apply_logic_rules(self):
+        """编译规则编辑框中的逻辑规则，有误时提示并保留原规则"""
+        lines = self.rules_edit.toPlainText().splitlines()
+        try:
+            self.mapping_engine.set_rules(lines)
+        except RuleError as e:
+            QMessageBox.warning(self.mapping_window, "规则错误", str(e))
+            return
+        self.update_rules_status()
+        self.statusBar.showMessage("逻辑规则已应用")
+
+    def update_rules_status(self):
+        """显示规则数和求值时间"""
+        program = self.mapping_engine.rule_program
+        if program is None:
+            text = "未设置逻辑规则"
+        else:
+            average = program.measure()
+            text = f"{program.rule_count} 条规则，{program.cost} 个运算，试算 {average * 1e6:.1f} µs/帧"
+            if average > program.time_budget:
+                text += "（超出时间预算，可能影响转换速度）"
+        self.rules_status_label.setText(text)
+
+    def update_output_gate(self):
+        """变化驱动发送设置修改后立即生效"""
+        self.output_gate.enabled = self.send_on_change_check.isChecked()
+        self.output_gate.keepalive = self.keepalive_spin.value() / 1000
+        self.output_gate.reset()
+
+    def update_tx_saved_label(self):
+        """显示变化驱动模式少发送的帧数和字节数"""
+        if not hasattr(self, 'tx_saved_label'):
+            return
+        gate = self.output_gate
+        text = f"节省: {gate.suppressed_count} 帧 / {gate.saved_bytes} 字节"
+        if self.tx_saved_label.text() != text:
+            self.tx_saved_label.setText(text)
+
     def save_mapping_config(self):
         """保存映射配置到文件"""
         file_name, _ = QFileDialog.getSaveFileName(self, "保存映射配置", "", "JSON文件 (*.json)")
         if file_name:
             import json
             try:
-                config = {
-                    'mapping': self.bit_mapping,
-                    'enabled': self.bit_mapping_enabled,
-                    'latch': self.bit_mapping_latch,
-                    'latch_states': self.bit_mapping_latch_states,
-                    'prev_values': self.bit_mapping_prev_values
-                }
+                config = self.mapping_engine.to_config()
                 with open(file_name, 'w') as f:
                     json.dump(config, f)
                 QMessageBox.information(self, "成功", "映射配置已保存")
@@ -1115,14 +1475,23 @@ class AdvancedSerialTool(QMainWindow):
             try:
                 with open(file_name, 'r') as f:
                     config = json.load(f)
+                    # 配置文件带帧格式时先切换帧格式（旧配置文件没有该字段，保持当前格式）
+                    mapping_window = getattr(self, 'mapping_window', None)
+                    reopen_mapping_window = mapping_window is not None and mapping_window.isVisible()
+                    layout_changed = ('frame_layout' in config and
+                                      self.set_frame_layout(FrameLayout.from_config(config['frame_layout'])))
+                    # 先编译逻辑规则，规则有误时不修改当前配置
+                    self.mapping_engine.set_rules(config.get('rules', []))
                     self.bit_mapping = config.get('mapping', {})
+                    self.bit_mapping_fanout = {key: [int(output_bit) for output_bit in outputs]
+                                               for key, outputs in config.get('fanout', {}).items() if outputs}
                     self.bit_mapping_enabled = config.get('enabled', {})
                     self.bit_mapping_latch = config.get('latch', {})
                     self.bit_mapping_latch_states = config.get('latch_states', {})
                     self.bit_mapping_prev_values = config.get('prev_values', {})
                     
                     # 确保所有位都有默认值
-                    for i in range(192):
+                    for i in range(self.frame_layout.bit_count):
                         bit_str = str(i)
                         if bit_str not in self.bit_mapping_latch:
                             self.bit_mapping_latch[bit_str] = False
@@ -1130,9 +1499,10 @@ class AdvancedSerialTool(QMainWindow):
                         self.bit_mapping_latch_states[bit_str] = 0
                         if bit_str not in self.bit_mapping_prev_values:
                             self.bit_mapping_prev_values[bit_str] = 0
+                    self.mapping_engine.invalidate()
 
                 # 更新UI
-                for i in range(192):
+                for i in range(self.frame_layout.bit_count):
                     # 更新SpinBox的值
                     spin_box = self.findChild(QSpinBox, f"output_spin_{i}")
                     if spin_box:
@@ -1146,8 +1516,17 @@ class AdvancedSerialTool(QMainWindow):
                     if latch_check_box:
                         latch_check_box.setChecked(self.bit_mapping_latch.get(str(i), False))
                 
+                # 帧格式改变时映射配置窗口已关闭，按新的位数重新创建
+                if layout_changed and reopen_mapping_window:
+                    self.create_mapping_config_window()
+
                 # 更新已启用映射列表
                 self.update_enabled_mappings_list()
+                if hasattr(self, 'fanout_edit'):
+                    self.show_fanout(self.fanout_input_spin.value())
+                if hasattr(self, 'rules_edit'):
+                    self.rules_edit.setPlainText('\n'.join(self.mapping_engine.rules))
+                    self.update_rules_status()
 
                 # 检查是否有自锁位，如果有则打开LED状态显示窗口
                 has_latch_bits = any(self.bit_mapping_latch.values())
@@ -1159,116 +1538,8 @@ class AdvancedSerialTool(QMainWindow):
                 QMessageBox.critical(self, "错误", f"加载配置失败: {str(e)}")
 
     def convert_data(self, input_data):
-        """根据映射配置转换数据 - 性能优化版本"""
-        if len(input_data) == 0:
-            return bytearray()
-
-        # 创建输出数据，第一个字节为A5
-        output_data = bytearray([0xA5])
-        
-        # 创建输出字节列表（24个字节，对应D0-D23）
-        output_bytes = bytearray(24)  # 使用bytearray而不是list，减少类型转换
-        
-        # 如果没有启用的映射，直接返回默认输出
-        if not any(self.bit_mapping_enabled.values()):
-            output_data.extend(output_bytes)
-            output_data.append(0x01)  # 添加测试状态字节（B24）
-            crc = self.crc16(output_data)
-            output_data.extend([crc >> 8, crc & 0xFF])
-            return output_data
-            
-        # 处理剩余字节
-        remaining_data = input_data[1:]
-        
-        # 预先计算启用的映射，避免在循环中重复检查
-        enabled_mappings = {}
-        for input_pos, enabled in self.bit_mapping_enabled.items():
-            if enabled:
-                input_pos_int = int(input_pos) if isinstance(input_pos, str) else input_pos
-                output_pos = self.bit_mapping.get(input_pos, input_pos)
-                output_pos_int = int(output_pos) if isinstance(output_pos, str) else output_pos
-                enabled_mappings[input_pos_int] = output_pos_int
-        
-        # 如果没有启用的映射，直接返回默认输出
-        if not enabled_mappings:
-            output_data.extend(output_bytes)
-            output_data.append(0x01)  # 添加测试状态字节（B24）
-            crc = self.crc16(output_data)
-            output_data.extend([crc >> 8, crc & 0xFF])
-            return output_data
-        
-        # 优化：直接处理字节，避免位列表转换
-        for input_pos, output_pos in enabled_mappings.items():
-            input_pos_str = str(input_pos)
-            
-            # 检查是否启用了自锁模式
-            if self.bit_mapping_latch.get(input_pos_str, False):
-                # 自锁模式：处理上升沿检测
-                input_byte_index = input_pos // 8
-                input_bit_index = 7 - (input_pos % 8)  # 从左到右递增
-                
-                # 确保输入字节索引在有效范围内
-                if input_byte_index < len(remaining_data):
-                    # 获取当前输入位的值
-                    current_input_value = (remaining_data[input_byte_index] >> input_bit_index) & 1
-                    prev_value = self.bit_mapping_prev_values.get(input_pos_str, 0)
-                    
-                    # 检测上升沿（从0变为1）
-                    if prev_value == 0 and current_input_value == 1:
-                        # 切换自锁状态
-                        current_latch_state = self.bit_mapping_latch_states.get(input_pos_str, 0)
-                        self.bit_mapping_latch_states[input_pos_str] = 1 - current_latch_state
-                    
-                    # 更新上一次的值
-                    self.bit_mapping_prev_values[input_pos_str] = current_input_value
-                    
-                    # 使用自锁状态作为输出值
-                    output_bit_value = self.bit_mapping_latch_states.get(input_pos_str, 0)
-                    
-                    # 计算输出位所在的字节和位置
-                    output_byte_index = output_pos // 8
-                    output_bit_index = 7 - (output_pos % 8)  # 从左到右递增
-                    
-                    # 如果输出字节索引在有效范围内
-                    if 0 <= output_byte_index < 24:
-                        # 设置对应位的值
-                        if output_bit_value == 1:
-                            output_bytes[output_byte_index] |= (1 << output_bit_index)
-                        else:
-                            output_bytes[output_byte_index] &= ~(1 << output_bit_index)
-            else:
-                # 普通模式：直接映射输入到输出
-                input_byte_index = input_pos // 8
-                input_bit_index = 7 - (input_pos % 8)  # 从左到右递增
-                
-                # 确保输入字节索引在有效范围内
-                if input_byte_index < len(remaining_data):
-                    # 获取输入位的值
-                    input_bit_value = (remaining_data[input_byte_index] >> input_bit_index) & 1
-                    
-                    # 计算输出位所在的字节和位置
-                    output_byte_index = output_pos // 8
-                    output_bit_index = 7 - (output_pos % 8)  # 从左到右递增
-                    
-                    # 如果输出字节索引在有效范围内
-                    if 0 <= output_byte_index < 24:
-                        # 设置对应位的值
-                        if input_bit_value == 1:
-                            output_bytes[output_byte_index] |= (1 << output_bit_index)
-                        else:
-                            output_bytes[output_byte_index] &= ~(1 << output_bit_index)
-        
-        # 将输出字节添加到输出数据中
-        output_data.extend(output_bytes)
-        
-        # 添加测试状态字节（B24）
-        output_data.append(0x01)
-        
-        # 计算并添加CRC16校验（C25-C26）
-        crc = self.crc16(output_data)
-        output_data.extend([crc >> 8, crc & 0xFF])
-        
-        return output_data
+        """根据映射配置转换数据"""
+        return self.mapping_engine.convert(input_data)
 
     def update_mapping_values(self, data):
         """更新映射表格中的当前值 - 性能优化版本"""
@@ -1279,17 +1550,10 @@ class AdvancedSerialTool(QMainWindow):
         if not data or len(data) <= 1:
             return
             
-        # 批量更新优化：预先计算所有位值
-        bits = [0] * 192  # 预分配数组大小
-        data_len = len(data) - 1  # 减去起始字节
-        
-        # 直接计算位值，避免逐位追加
-        for byte_index in range(min(data_len, 24)):  # 最多处理24个字节
-            byte = data[byte_index + 1]  # 跳过起始字节
-            for bit_index in range(8):
-                bit_pos = byte_index * 8 + bit_index
-                if bit_pos < 192:  # 确保不超出范围
-                    bits[bit_pos] = (byte >> (7-bit_index)) & 1
+        # 数据区转换为按位号编号的整数（I0为最高位），只对可见行取位，与数据区长度无关
+        layout = self.frame_layout
+        bit_count = layout.bit_count
+        value = layout.bits_from_payload(layout.payload(data))
         
         # 批量更新UI元素
         # 创建颜色缓存以避免重复创建相同的QColor对象
@@ -1305,135 +1569,147 @@ class AdvancedSerialTool(QMainWindow):
         if first_row == -1:
             first_row = 0
         if last_row == -1:
-            last_row = min(50, 192)  # 默认显示前50行或全部
+            last_row = min(50, bit_count)  # 默认显示前50行或全部
         
         # 只更新可见区域的单元格
-        for i in range(first_row, min(last_row + 1, 192)):
+        for i in range(first_row, min(last_row + 1, bit_count)):
             value_item = self.mapping_table.item(i, 3)
             if value_item:
                 # 只有当值发生变化时才更新文本和背景
+                bit = (value >> (bit_count - 1 - i)) & 1
                 current_text = value_item.text()
-                new_text = str(bits[i])
+                new_text = str(bit)
                 
                 if current_text != new_text:
                     value_item.setText(new_text)
-                    value_item.setBackground(green_bg if bits[i] == 1 else white_bg)
+                    value_item.setBackground(green_bg if bit == 1 else white_bg)
     
-    def update_receive_text(self, data):
-        """更新接收文本框 - 使用缓冲机制优化性能"""
-        # 保存最后接收到的数据用于定时发送
-        self.last_received_data = data
-        
-        # 更新接收计数
-        self.rx_count += len(data)
-        self.rx_count_label.setText(str(self.rx_count))
-
-        # 添加数据到缓冲区，而不是立即更新UI
-        timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-        self.data_buffer.append((data, timestamp))
-        
-        # 如果缓冲区达到最大大小，立即处理防止数据堆积
-        if len(self.data_buffer) >= self.max_buffer_size:
-            self.flush_data_buffer()
+    def update_receive_text(self, batch):
+        """处理读取线程发来的一批数据 - 使用缓冲机制优化性能
+
+        batch为[(接收时间戳, 数据), ...]，帧模式下每条数据是一个完整帧
+        """
+        try:
+            if not batch:
+                return
+            # 保存最后接收到的数据用于定时发送
+            self.last_received_data = batch[-1][1]
+
+            # 更新接收计数
+            self.rx_count += sum(len(data) for _, data in batch)
+            self.rx_count_label.setText(str(self.rx_count))
+
+            # 信号检测窗口只显示当前状态，每批只需用最新一帧更新一次
+            if self.refresh_governor.is_active('signal_detection'):
+                self.signal_detection_window.update_table(self.last_received_data)
+
+            # 记录到收发存储，序号加入显示缓冲区，由定时器刷新接收区，不在信号处理中同步刷新
+            store = self.frame_store
+            if self.collapse_repeats_check.isChecked():
+                # 与上一条接收数据相同（且其间没有其他记录）时只累加重复次数，不新增记录和显示行
+                entries = []
+                last_data, last_seq = self._last_rx
+                for timestamp, data in batch:
+                    timestamp_ns = int(timestamp * 1e9)
+                    if data == last_data and store.repeat_last(last_seq, timestamp_ns):
+                        self._repeats_pending = True
+                        continue
+                    last_data, last_seq = data, store.append(timestamp_ns, DIRECTION_RX, data)
+                    entries.append((data, timestamp, last_seq))
+                self._last_rx = (last_data, last_seq)
+                self.data_buffer.add(entries)
+            else:
+                append = store.append
+                self.data_buffer.add((data, timestamp, append(int(timestamp * 1e9), DIRECTION_RX, data))
+                                     for timestamp, data in batch)
+            self.refresh_governor.data_arrived(len(batch))
+        finally:
+            sender = self.sender()
+            if isinstance(sender, SerialThread):
+                sender.batch_done()
     
     def flush_data_buffer(self):
         """批量处理缓冲区中的数据，优化UI更新性能"""
-        if not self.data_buffer:
+        self.update_frame_stats()
+        repeated = self._repeats_pending
+        if not self.data_buffer and not repeated:
             return
-            
-        # 每处理100次数据才检查一次文本长度，减少性能开销
-        if not hasattr(self, '_flush_count'):
-            self._flush_count = 0
-        self._flush_count += 1
-        
-        if self._flush_count % 100 == 0:
-            current_text = self.receive_text.toPlainText()
-            max_lines = 1000  # 最大行数限制
-            if current_text.count('\n') > max_lines:
-                # 保留最后500行
-                lines = current_text.split('\n')
-                self.receive_text.clear()
-                self.receive_text.insertPlainText('\n'.join(lines[-500:]) + '\n')
-        
-        # 批量更新UI，减少重绘次数
-        self.receive_text.setUpdatesEnabled(False)
-        
-        # 批量构建所有数据的显示内容，减少UI操作次数
-        if self.hex_recv_check.isChecked():
-            # 十六进制显示 - 批量处理所有数据
-            all_html_parts = []
-            for data, timestamp in self.data_buffer:
-                hex_list = [f"{byte:02X}" for byte in data]
-                html_parts = [f"[{timestamp}] [接收] "]
-                
-                # 优化颜色标记处理
-                for hex_byte in hex_list:
-                    if hex_byte == "5A":
-                        html_parts.append(f'<span style="color: green;">{hex_byte}</span> ')
-                    elif hex_byte == "EB":
-                        html_parts.append(f'<span style="color: red;">{hex_byte}</span> ')
-                    else:
-                        html_parts.append(f"{hex_byte} ")
-                html_parts.append("<br>")
-                all_html_parts.extend(html_parts)
-            
-            # 一次性插入所有HTML内容
-            if all_html_parts:
-                self.receive_text.moveCursor(QTextCursor.End)
-                self.receive_text.insertHtml(''.join(all_html_parts))
-        else:
-            # 文本显示 - 批量处理所有数据
-            all_text_parts = []
-            for data, timestamp in self.data_buffer:
-                try:
-                    text = data.decode('utf-8', errors='replace')
-                except:
-                    text = str(data)
-                all_text_parts.append(f"[{timestamp}] [接收] {text}\n")
-            
-            # 一次性插入所有文本内容
-            if all_text_parts:
-                self.receive_text.moveCursor(QTextCursor.End)
-                self.receive_text.insertPlainText(''.join(all_text_parts))
-        
-        # 恢复UI更新
-        self.receive_text.setUpdatesEnabled(True)
-        
+        if self.data_buffer:
+            entries, summary = self.data_buffer.take()
+
+            # 只追加存储记录的序号，文本和高亮在视图绘制可见行时生成；超出容量的旧行由模型丢弃
+            self.receive_log.append_records((seq for _, _, seq in entries),
+                                            self.format_display_summary(summary) if summary else None)
+        if repeated:
+            # 折叠的重复只改变最近一条接收记录所在行的次数和末次时间
+            self._repeats_pending = False
+            self.receive_log.refresh_record(self._last_rx[1])
+
         # 自动滚屏
         if self.auto_scroll_check.isChecked():
-            self.receive_text.moveCursor(QTextCursor.End)
-            
-        # 清空缓冲区
-        self.data_buffer.clear()
+            self.receive_view.scrollToBottom()
 
-    def update_display_mode(self):
-        """更新显示模式"""
-        # 清空接收区以应用新的显示模式
-        if not self.receive_text.toPlainText().strip():
+    def receive_view_is_behind(self):
+        """关闭自动滚屏且接收区已填满时，新追加的行不在可见范围内，可以降低刷新频率"""
+        return not self.auto_scroll_check.isChecked() and self.receive_view.verticalScrollBar().maximum() > 0
+
+    def catch_up_receive(self):
+        """接收区重新可见时从收发记录补齐暂停期间的数据，最多补显示上限条，其余以一行摘要代替"""
+        self.data_buffer.clear()
+        store = self.frame_store
+        start = max(self.receive_log.last_seq + 1, store.first_seq)
+        count = store.next_seq - start
+        if count > 0:
+            limit = self.display_capacity_spin.value()
+            summary = None
+            if count > limit:
+                summary = f"[省略] 不可见期间的 {count - limit} 条"
+                start = store.next_seq - limit
+            self.receive_log.append_records(range(start, store.next_seq), summary, start - 1)
+            if self.auto_scroll_check.isChecked():
+                self.receive_view.scrollToBottom()
+        self.update_frame_stats()
+
+    def format_display_summary(self, summary):
+        """格式化汇总省略策略的摘要行"""
+        count, size, first, last = summary
+        first = datetime.fromtimestamp(first).strftime("%H:%M:%S.%f")[:-3]
+        last = datetime.fromtimestamp(last).strftime("%H:%M:%S.%f")[:-3]
+        return f"[{first} ~ {last}] [省略] {count} 条，{size} 字节"
+
+    def update_display_policy(self):
+        """更新显示缓冲的上限和溢出策略"""
+        self.data_buffer.capacity = self.display_capacity_spin.value()
+        self.data_buffer.policy = self.display_policy_combo.currentData()
+
+    def update_history_capacity(self):
+        """修改收发记录存储的容量，保留新容量能容纳的最新记录"""
+        capacity_frames = self.history_frames_spin.value()
+        capacity_bytes = self.history_mb_spin.value() * 1024 * 1024
+        store = self.frame_store
+        if (capacity_frames, capacity_bytes) != (store.capacity_frames, store.capacity_bytes):
+            store.resize(capacity_frames, capacity_bytes)
+
+    def apply_highlight_rules(self):
+        """应用高亮规则，格式错误时恢复为当前规则"""
+        try:
+            highlights = parse_highlight_rules(self.highlight_edit.text())
+        except ValueError as e:
+            self.highlight_edit.setText(format_highlight_rules(self.receive_log.renderer.highlights))
+            QMessageBox.warning(self, "警告", f"高亮规则错误: {str(e)}")
             return
+        self.highlight_edit.setText(format_highlight_rules(highlights))
+        if highlights != self.receive_log.renderer.highlights:
+            self.receive_log.set_highlights(highlights)
 
-        # 询问用户是否清空接收区
-        reply = QMessageBox.question(self, '确认',
-                                     '切换显示模式将清空接收区，是否继续？',
-                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-        if reply == QMessageBox.Yes:
-            self.clear_receive()
+    def update_display_mode(self):
+        """更新显示模式，已有的接收行按新模式重新显示"""
+        self.receive_log.set_hex_mode(self.hex_recv_check.isChecked())
 
     def clear_receive(self):
-        """清空接收区"""
-        self.receive_text.clear()
-
-    def crc16(self, data):
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc >>= 1
-                    crc ^= 0xA001
-                else:
-                    crc >>= 1
-        return ((crc & 0xFF) << 8) | ((crc >> 8) & 0xFF)
+        """清空接收区和收发记录"""
+        self.frame_store.clear()
+        self.receive_log.clear()
 
     def send_data(self):
         """发送数据"""
@@ -1456,29 +1732,15 @@ class AdvancedSerialTool(QMainWindow):
 
         if current_index == 0:  # 默认发送区
             if self.auto_generate_check.isChecked():
-                # 如果选中了自动生成，使用接收到的数据进行转换
-                text = self.receive_text.toPlainText().strip()
-                if not text:
+                # 如果选中了自动生成，使用收发记录中最后一次接收到的数据进行转换
+                input_data = self.frame_store.last_payload(DIRECTION_RX)
+                if input_data is None:
                     QMessageBox.warning(self, "警告", "接收区没有数据")
                     return
-                # 获取最后一次接收到的数据
-                lines = text.split('\n')
-                for line in reversed(lines):
-                    if '[接收]' in line:
-                        # 提取十六进制数据
-                        hex_data = ''.join(c for c in line if c.isalnum())
-                        try:
-                            input_data = bytes.fromhex(hex_data)
-                            converted_data = self.convert_data(input_data)
-                            text = converted_data.hex().upper()
-                            # 更新输入框显示
-                            self.send_text.setPlainText(text)
-                            break
-                        except ValueError:
-                            continue
-                else:
-                    QMessageBox.warning(self, "警告", "没有找到有效的接收数据")
-                    return
+                converted_data = self.convert_data(input_data)
+                text = converted_data.hex().upper()
+                # 更新输入框显示
+                self.send_text.setPlainText(text)
             else:
                 # 使用用户输入的数据
                 text = self.send_text.toPlainText().strip()
@@ -1497,7 +1759,7 @@ class AdvancedSerialTool(QMainWindow):
                     data = bytes.fromhex(hex_text)
                     # 根据复选框状态计算CRC16
                     if self.crc16_check.isChecked():
-                        crc = self.crc16(data)
+                        crc = crc16_swapped(data)
                         crc_bytes = crc.to_bytes(2, byteorder='big')  
                         data += crc_bytes
                         print(data)
@@ -1513,7 +1775,7 @@ class AdvancedSerialTool(QMainWindow):
                     # 普通文本发送
                     # 根据复选框状态计算CRC16
                     if self.crc16_check.isChecked():
-                        crc = self.crc16(text.encode('utf-8'))
+                        crc = crc16_swapped(text.encode('utf-8'))
                         crc_bytes = crc.to_bytes(2, byteorder='little')  # 调换字节位置：从big改为little
                         data = text.encode('utf-8') + crc_bytes
                         self.crc16_label.setText(f"CRC16: {crc:04X}")
@@ -1527,23 +1789,14 @@ class AdvancedSerialTool(QMainWindow):
                 # 发送数据前打印要发送的数据
                 print(f"即将发送的数据: {data}")
                 # 发送数据
-                self.ser.write(data)
+                if not self.write_serial(data):
+                    return
 
                 # 更新状态栏
                 self.statusBar.showMessage(f"已发送 {len(data)} 字节")
 
-                # 更新发送计数
-                self.tx_count += len(data)
-                self.tx_count_label.setText(str(self.tx_count))
-
                 # 回显发送内容
-                timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                self.receive_text.moveCursor(QTextCursor.End)
-                self.receive_text.insertPlainText(f"[{timestamp}] [发送] {text}\r\n")
-
-                # 自动滚屏
-                if self.auto_scroll_check.isChecked():
-                    self.receive_text.moveCursor(QTextCursor.End)
+                self.echo_sent(data)
 
             except ValueError as e:
                 # 十六进制格式错误时只在状态栏显示提示，不弹出错误对话框
@@ -1645,19 +1898,14 @@ class AdvancedSerialTool(QMainWindow):
                 
                 # 添加CRC16校验
                 if self.crc16_check.isChecked():
-                    crc = self.crc16(data)
-                    data += crc.to_bytes(2, byteorder='little')
+                    data += crc16_bytes(data, BYTEORDER_BIG)
                 
                 # 添加换行符
                 if self.crlf_check.isChecked():
                     data += b'\r\n'
                 
                 # 发送数据
-                self.ser.write(data)
-                
-                # 更新发送计数
-                self.tx_count += len(data)
-                self.tx_count_label.setText(str(self.tx_count))
+                self.write_serial(data, SerialWriter.PRIORITY_BULK)
                 
                 # 更新映射表格中的当前值
                 if hasattr(self, 'mapping_window'):
@@ -1714,31 +1962,33 @@ class AdvancedSerialTool(QMainWindow):
                         data += b'\r\n'
 
                     # 发送数据
-                    self.ser.write(data)
+                    if not self.write_serial(data):
+                        return
 
                     # 更新状态栏
                     self.statusBar.showMessage(f"已发送命令: {display_text}")
 
-                    # 更新发送计数
-                    self.tx_count += len(data)
-                    self.tx_count_label.setText(str(self.tx_count))
-
                     # 回显发送内容
-                    timestamp = datetime.now().strftime("%H:%M:%S.%f")[:-3]
-                    self.receive_text.moveCursor(QTextCursor.End)
-                    self.receive_text.insertPlainText(f"[{timestamp}] [发送] {display_text}\r\n")
-
-                    # 自动滚屏
-                    if self.auto_scroll_check.isChecked():
-                        self.receive_text.moveCursor(QTextCursor.End)
+                    self.echo_sent(data)
 
                 except Exception as e:
                     self.statusBar.showMessage(f"发送命令错误: {str(e)}")
                     QMessageBox.critical(self, "错误", f"发送命令错误: {str(e)}")
 
+    def echo_sent(self, data):
+        """发送的数据记录到收发存储并回显在接收区"""
+        self.frame_store.append(time.time_ns(), DIRECTION_TX, data)
+        if not self.refresh_governor.is_active('receive'):
+            return  # 接收区重新可见时从收发记录补齐
+        # 先显示已缓冲的接收数据，保持收发顺序
+        self.flush_data_buffer()
+        self.receive_log.append_records([self.frame_store.next_seq - 1])
+        if self.auto_scroll_check.isChecked():
+            self.receive_view.scrollToBottom()
+
     def save_receive_data(self):
         """保存接收数据到文件"""
-        text = self.receive_text.toPlainText()
+        text = self.receive_log.export_text()
         if not text:
             QMessageBox.information(self, "提示", "接收区没有数据可保存")
             return
@@ -1752,6 +2002,81 @@ class AdvancedSerialTool(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"保存文件错误: {str(e)}")
 
+    def toggle_capture(self):
+        """开始或停止录制串口原始数据"""
+        if self.capture_recorder:
+            recorder = self.capture_recorder
+            self.set_capture_recorder(None)
+            recorder.close()
+            self.capture_btn.setText("开始录制")
+            self.capture_btn.setStyleSheet("")
+            self.statusBar.showMessage(
+                f"录制已保存到 {recorder.path}（{recorder.record_count} 条，{recorder.byte_count} 字节）")
+            return
+
+        filename, _ = QFileDialog.getSaveFileName(self, "录制原始数据", "", "录制文件 (*.cap);;所有文件 (*)")
+        if not filename:
+            return
+        try:
+            self.set_capture_recorder(CaptureRecorder(filename))
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"创建录制文件错误: {str(e)}")
+            return
+        self.capture_btn.setText("停止录制")
+        self.capture_btn.setStyleSheet("background-color: #f44336; color: white;")
+        self.statusBar.showMessage(f"正在录制到 {filename}")
+
+    def set_capture_recorder(self, recorder):
+        """设置录制器，串口打开时立即对读写线程生效"""
+        self.capture_recorder = recorder
+        if self.serial_thread:
+            self.serial_thread.recorder = recorder
+        if self.serial_writer:
+            self.serial_writer.writer.recorder = recorder
+
+    def toggle_replay(self):
+        """开始或停止回放录制文件"""
+        if self.replay_thread:
+            self.replay_thread.stop()
+            return
+        if self.ser and self.ser.is_open:
+            QMessageBox.warning(self, "警告", "请先关闭串口再回放")
+            return
+
+        filename, _ = QFileDialog.getOpenFileName(self, "回放录制", "", "录制文件 (*.cap);;所有文件 (*)")
+        if not filename:
+            return
+        reply = QMessageBox.question(self, "回放方式", "是否按录制时的时间间隔回放？\n选择“否”将尽快回放",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        frame_assembler = FrameAssembler.for_layout(self.frame_layout) if self.frame_mode_check.isChecked() else None
+        self.replay_thread = ReplayThread(filename, realtime=reply == QMessageBox.Yes,
+                                          frame_assembler=frame_assembler,
+                                          batch_interval=self.batch_interval_spin.value() / 1000,
+                                          batch_max_items=self.batch_frames_spin.value())
+        self.replay_thread.batch_received.connect(self.update_receive_text)
+        self.replay_thread.finished.connect(self.on_replay_finished)
+        # 回放期间由回放线程代替读取线程，帧统计等显示照常工作
+        self.serial_thread = self.replay_thread
+        self.replay_started_at = time.perf_counter()
+        self.connect_btn.setEnabled(False)
+        self.replay_btn.setText("停止回放")
+        self.replay_btn.setStyleSheet("background-color: #f44336; color: white;")
+        self.statusBar.showMessage(f"正在回放 {filename}")
+        self.replay_thread.start()
+
+    def on_replay_finished(self):
+        """回放结束后恢复界面状态"""
+        replayer = self.replay_thread.reader
+        elapsed = time.perf_counter() - self.replay_started_at
+        if self.serial_thread is self.replay_thread:
+            self.serial_thread = None
+        self.replay_thread = None
+        self.connect_btn.setEnabled(True)
+        self.replay_btn.setText("回放录制")
+        self.replay_btn.setStyleSheet("")
+        self.statusBar.showMessage(
+            f"回放结束：{replayer.record_count} 条，{replayer.byte_count} 字节，用时 {elapsed:.2f} s")
+
     def save_config(self):
         """保存配置"""
         filename, _ = QFileDialog.getSaveFileName(self, "保存配置", "", "配置文件 (*.ini);;所有文件 (*)")
@@ -1765,11 +2090,24 @@ class AdvancedSerialTool(QMainWindow):
                     f.write(f"parity={self.parity_combo.currentText()}\n")
                     f.write(f"flow={self.flow_combo.currentText()}\n")
                     f.write(f"hex_recv={1 if self.hex_recv_check.isChecked() else 0}\n")
+                    f.write(f"highlight_rules={self.highlight_edit.text()}\n")
                     f.write(f"timestamp={1 if self.timestamp_check.isChecked() else 0}\n")
                     f.write(f"auto_scroll={1 if self.auto_scroll_check.isChecked() else 0}\n")
+                    f.write(f"collapse_repeats={1 if self.collapse_repeats_check.isChecked() else 0}\n")
+                    f.write(f"frame_mode={1 if self.frame_mode_check.isChecked() else 0}\n")
                     f.write(f"hex_send={1 if self.hex_send_check.isChecked() else 0}\n")
                     f.write(f"crlf={1 if self.crlf_check.isChecked() else 0}\n")
                     f.write(f"timer_interval={self.timer_spin.value()}\n")
+                    f.write(f"batch_interval={self.batch_interval_spin.value()}\n")
+                    f.write(f"batch_frames={self.batch_frames_spin.value()}\n")
+                    f.write(f"display_capacity={self.display_capacity_spin.value()}\n")
+                    f.write(f"display_policy={self.display_policy_combo.currentData()}\n")
+                    f.write(f"history_frames={self.history_frames_spin.value()}\n")
+                    f.write(f"history_mb={self.history_mb_spin.value()}\n")
+                    f.write(f"send_on_change={1 if self.output_gate.enabled else 0}\n")
+                    f.write(f"keepalive_interval={int(self.output_gate.keepalive * 1000)}\n")
+                    import json
+                    f.write(f"frame_layout={json.dumps(self.frame_layout.to_config())}\n")
                     
                     # 保存窗口布局
                     geometry = self.geometry()
@@ -1846,12 +2184,22 @@ class AdvancedSerialTool(QMainWindow):
                 if 'hex_recv' in config:
                     self.hex_recv_check.setChecked(config['hex_recv'] == '1')
 
+                if 'highlight_rules' in config:
+                    self.highlight_edit.setText(config['highlight_rules'])
+                    self.apply_highlight_rules()
+
                 if 'timestamp' in config:
                     self.timestamp_check.setChecked(config['timestamp'] == '1')
 
                 if 'auto_scroll' in config:
                     self.auto_scroll_check.setChecked(config['auto_scroll'] == '1')
 
+                if 'collapse_repeats' in config:
+                    self.collapse_repeats_check.setChecked(config['collapse_repeats'] == '1')
+
+                if 'frame_mode' in config:
+                    self.frame_mode_check.setChecked(config['frame_mode'] == '1')
+
                 if 'hex_send' in config:
                     self.hex_send_check.setChecked(config['hex_send'] == '1')
 
@@ -1864,6 +2212,62 @@ class AdvancedSerialTool(QMainWindow):
                     except:
                         pass
 
+                if 'batch_interval' in config:
+                    try:
+                        self.batch_interval_spin.setValue(int(config['batch_interval']))
+                    except ValueError:
+                        pass
+
+                if 'batch_frames' in config:
+                    try:
+                        self.batch_frames_spin.setValue(int(config['batch_frames']))
+                    except ValueError:
+                        pass
+
+                if 'display_capacity' in config:
+                    try:
+                        self.display_capacity_spin.setValue(int(config['display_capacity']))
+                    except ValueError:
+                        pass
+
+                if 'display_policy' in config:
+                    index = self.display_policy_combo.findData(config['display_policy'])
+                    if index >= 0:
+                        self.display_policy_combo.setCurrentIndex(index)
+
+                for key, spin in (('history_frames', self.history_frames_spin),
+                                  ('history_mb', self.history_mb_spin)):
+                    if key in config:
+                        try:
+                            spin.setValue(int(config[key]))
+                        except ValueError:
+                            pass
+
+                if 'send_on_change' in config:
+                    self.output_gate.enabled = config['send_on_change'] == '1'
+
+                if 'keepalive_interval' in config:
+                    try:
+                        self.output_gate.keepalive = int(config['keepalive_interval']) / 1000
+                    except ValueError:
+                        pass
+
+                if hasattr(self, 'send_on_change_check'):
+                    # 只同步控件显示，不触发update_output_gate，否则会用另一个控件的旧值覆盖刚加载的配置
+                    for widget in (self.send_on_change_check, self.keepalive_spin):
+                        widget.blockSignals(True)
+                    self.send_on_change_check.setChecked(self.output_gate.enabled)
+                    self.keepalive_spin.setValue(int(self.output_gate.keepalive * 1000))
+                    for widget in (self.send_on_change_check, self.keepalive_spin):
+                        widget.blockSignals(False)
+
+                if 'frame_layout' in config:
+                    import json
+                    try:
+                        self.set_frame_layout(FrameLayout.from_config(json.loads(config['frame_layout'])))
+                    except ValueError as e:
+                        print(f"帧格式配置无效: {e}")
+
                 # 加载窗口布局
                 if all(key in config for key in ['window_x', 'window_y', 'window_width', 'window_height']):
                     try:
@@ -1891,6 +2295,15 @@ class AdvancedSerialTool(QMainWindow):
         """重置统计数据"""
         self.rx_count = 0
         self.tx_count = 0
+        if self.serial_thread and self.serial_thread.frame_assembler:
+            self.serial_thread.frame_assembler.reset_stats()
+        self.data_buffer.reset_stats()
+        self.mapping_engine.reset_cache_stats()
+        if self.mapping_engine.rule_program is not None:
+            self.mapping_engine.rule_program.reset_stats()
+        self.output_gate.reset_stats()
+        self.update_tx_saved_label()
+        self.update_frame_stats()
         self.rx_count_label.setText("0")
         self.tx_count_label.setText("0")
         self.statusBar.showMessage("统计数据已重置")
@@ -2126,37 +2539,21 @@ class AdvancedSerialTool(QMainWindow):
             
             # 添加CRC16校验
             if self.multi_crc_check.isChecked():
-                crc = self.calculate_crc16(data)
-                data += crc.to_bytes(2, byteorder='little')  # 调换字节位置：从big改为little
+                data += crc16_bytes(data)  # Modbus顺序，低字节在前
             
             # 添加换行符
             if self.multi_crlf_check.isChecked():
                 data += b'\r\n'
             
             # 发送数据
-            self.ser.write(data)
-            
-            # 更新发送计数
-            self.tx_count += len(data)
-            self.tx_count_label.setText(str(self.tx_count))
+            if not self.write_serial(data, SerialWriter.PRIORITY_BULK):
+                return
             
             self.statusBar.showMessage(f"已发送命令: {command_text}")
             
         except Exception as e:
             self.statusBar.showMessage(f"发送命令错误: {str(e)}")
     
-    def calculate_crc16(self, data):
-        """计算CRC16校验码"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc >>= 1
-        return crc
-    
     def save_multi_commands(self):
         """保存多命令到文件"""
         if self.command_table.rowCount() == 0:
@@ -2270,29 +2667,34 @@ class AdvancedSerialTool(QMainWindow):
         """打开指令生成窗口"""
         # 创建指令生成窗口类
         class CommandGeneratorWindow(QWidget):
-            def __init__(self):
+            def __init__(self, frame_layout):
                 super().__init__()
+                self.frame_layout = frame_layout  # 行数、帧头和帧尾取自帧格式
                 self.setWindowTitle('指令生成器')
                 self.setGeometry(200, 200, 900, 700)
                 self.init_ui()
                 
             def init_ui(self):
                 layout = QVBoxLayout()
+                frame_layout = self.frame_layout
+                data_length = frame_layout.data_length
+                header = f'{frame_layout.output_header:02X}'
                 
                 # 添加说明标签
-                info_label = QLabel('PC应用程序到设备数据格式：A5 D0 D1 D2 D3 D4 D5 D6 D7 D8 D9 D10 D11 D12 D13 D14 D15 D16 D17 D18 D19 D20 D21 D22 D23 B24')
+                info_label = QLabel(f'PC应用程序到设备数据格式：{frame_layout.describe()}')
                 info_label.setWordWrap(True)
                 info_label.setStyleSheet('font-weight: bold; color: blue; padding: 10px;')
                 layout.addWidget(info_label)
                 
                 # 添加说明
-                desc_label = QLabel('A5：起始字节\nD0~D23：对应O0~O191，D0=O0~O7，D1=O8~15，以此类推\n请在下表中设置各位的值（0或1）：')
+                desc_label = QLabel(f'{header}：起始字节\nD0~D{data_length - 1}：对应O0~O{frame_layout.bit_count - 1}，'
+                                    f'D0=O0~O7，D1=O8~15，以此类推\n请在下表中设置各位的值（0或1）：')
                 desc_label.setStyleSheet('padding: 5px;')
                 layout.addWidget(desc_label)
                 
                 # 创建表格
                 self.table = QTableWidget()
-                self.table.setRowCount(24)  # D0-D23
+                self.table.setRowCount(data_length)  # D0~Dn-1
                 self.table.setColumnCount(9)  # 8位数据 + 1列字节值
                 
                 # 设置表头
@@ -2300,11 +2702,11 @@ class AdvancedSerialTool(QMainWindow):
                 self.table.setHorizontalHeaderLabels(headers)
                 
                 # 设置行标签
-                row_labels = [f'D{i} (O{i*8}-O{i*8+7})' for i in range(24)]
+                row_labels = [f'D{i} (O{i*8}-O{i*8+7})' for i in range(data_length)]
                 self.table.setVerticalHeaderLabels(row_labels)
                 
                 # 初始化表格数据
-                for i in range(24):
+                for i in range(data_length):
                     for j in range(8):
                         item = QTableWidgetItem('0')
                         item.setTextAlignment(Qt.AlignCenter)
@@ -2389,7 +2791,7 @@ class AdvancedSerialTool(QMainWindow):
             
             def clear_all(self):
                 """全部置0"""
-                for i in range(24):
+                for i in range(self.table.rowCount()):
                     for j in range(8):
                         item = self.table.item(i, j)
                         if item:
@@ -2398,7 +2800,7 @@ class AdvancedSerialTool(QMainWindow):
             
             def set_all(self):
                 """全部置1"""
-                for i in range(24):
+                for i in range(self.table.rowCount()):
                     for j in range(8):
                         item = self.table.item(i, j)
                         if item:
@@ -2407,16 +2809,17 @@ class AdvancedSerialTool(QMainWindow):
             
             def generate_command(self):
                 """生成指令"""
-                command_bytes = ['A5']  # 起始字节
+                frame_layout = self.frame_layout
+                command_bytes = [f'{frame_layout.output_header:02X}']  # 起始字节
                 
-                # 添加D0-D23字节
-                for i in range(24):
+                # 添加D0~Dn-1字节
+                for i in range(self.table.rowCount()):
                     hex_item = self.table.item(i, 8)
                     if hex_item:
                         command_bytes.append(hex_item.text())
                 
-                # 添加B24（设为01）
-                command_bytes.extend(['01'])
+                # 添加帧尾字节（默认格式为B24=01），CRC在发送时追加
+                command_bytes.extend(f'{byte:02X}' for byte in frame_layout.output_trailer)
                 
                 # 生成最终指令
                 command = ' '.join(command_bytes)
@@ -2433,7 +2836,7 @@ class AdvancedSerialTool(QMainWindow):
                     QMessageBox.warning(self, '警告', '请先生成指令！')
         
         # 创建并显示窗口
-        self.command_generator_window = CommandGeneratorWindow()
+        self.command_generator_window = CommandGeneratorWindow(self.frame_layout)
         
         # 为指令生成窗口添加布局记忆
         self.load_sub_window_layout(self.command_generator_window, 'command_generator_window')
@@ -2576,6 +2979,7 @@ class AdvancedSerialTool(QMainWindow):
             
         if self.buffer_timer.isActive():
             self.buffer_timer.stop()
+        self.refresh_governor.stop()
             
         # 停止多命令定时器（如果存在）
         if hasattr(self, 'multi_command_window') and hasattr(self.multi_command_window, 'timer') and self.multi_command_window.timer.isActive():
@@ -2590,6 +2994,11 @@ class AdvancedSerialTool(QMainWindow):
         
         # 关闭串口
         self.close_serial()
+        self.session_manager.close_all()
+        if self.replay_thread:
+            self.replay_thread.stop()
+        if self.capture_recorder:
+            self.capture_recorder.close()
         
         # 保存窗口布局
         self.save_window_layout()
@@ -2599,22 +3008,12 @@ class AdvancedSerialTool(QMainWindow):
 
 
 class BitMapper:
-    def __init__(self):
-        # 初始化CRC16查找表 - 性能优化
-        self.crc16_table = [0] * 256
-        for i in range(256):
-            crc = i
-            for _ in range(8):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 0xA001
-                else:
-                    crc = crc >> 1
-            self.crc16_table[i] = crc
-            
+    def __init__(self, frame_layout=DEFAULT_LAYOUT):
         # 初始化映射配置
+        self.frame_layout = frame_layout
         self.bit_mapping = {}
         self.bit_mapping_enabled = {}
-        for i in range(192):  # 24字节 * 8位 = 192位
+        for i in range(frame_layout.bit_count):  # 数据区字节数 * 8位（默认24字节192位）
             self.bit_mapping[i] = i  # 默认一一对应
             self.bit_mapping_enabled[i] = False  # 默认禁用所有映射
 
@@ -2623,22 +3022,19 @@ class BitMapper:
         if len(input_data) == 0:
             return bytearray()
 
-        # 创建输出数据，第一个字节为A5
-        output_data = bytearray([0xA5])
+        layout = self.frame_layout
 
         # 处理剩余字节
-        remaining_data = input_data[1:]
+        remaining_data = input_data[layout.data_offset:]
 
-        # 将输入数据转换为位列表
+        # 将输入数据转换为位列表（按帧格式的位序）
         input_bits = []
-        for byte_index, byte in enumerate(remaining_data):
-            for bit_index in range(8):
-                # 计算全局位索引（从左到右递增）
-                global_bit_index = byte_index * 8 + (7 - bit_index)
-                input_bits.append((byte >> (7 - bit_index)) & 1)
+        for pos in range(len(remaining_data) * 8):
+            byte_index, mask = layout.bit_mask(pos)
+            input_bits.append(1 if remaining_data[byte_index] & mask else 0)
 
-        # 创建输出字节列表（24个字节，对应D0-D23）
-        output_bytes = [0] * 24
+        # 创建输出字节列表（对应D0~Dn-1）
+        output_bytes = bytearray(layout.data_length)
 
         # 根据映射关系设置输出字节的位值
         for input_pos, output_pos in self.bit_mapping.items():
@@ -2650,37 +3046,21 @@ class BitMapper:
             # 确保输入位在有效范围内
             if (input_pos < len(input_bits) and
                 self.bit_mapping_enabled.get(str(input_pos), True)):
-                # 计算对应的字节索引和位索引
-                byte_index = output_pos // 8
-                bit_index = output_pos % 8
-                
-                # 如果字节索引在有效范围内
-                if 0 <= byte_index < 24:
-                    # 设置对应位的值
-                    if input_pos < len(input_bits):
-                        if input_bits[input_pos] == 1:
-                            output_bytes[byte_index] |= (1 << (7 - bit_index))
-                        else:
-                            output_bytes[byte_index] &= ~(1 << (7 - bit_index))
-
-        # 将输出字节添加到输出数据中
-        output_data.extend(output_bytes)
-
-        # 添加测试状态字节（B24）
-        output_data.append(0x01)
-
-        # 计算并添加CRC16校验（C25-C26）
-        crc = self.crc16(output_data)
-        output_data.extend([crc >> 8, crc & 0xFF])
+                # 如果输出位在有效范围内
+                if 0 <= output_pos < layout.bit_count:
+                    # 计算对应的字节索引和位掩码，设置对应位的值
+                    byte_index, mask = layout.bit_mask(output_pos)
+                    if input_bits[input_pos] == 1:
+                        output_bytes[byte_index] |= mask
+                    else:
+                        output_bytes[byte_index] &= ~mask & 0xFF
 
-        return output_data
+        # 帧头、输出字节、测试状态字节（B24）和CRC16校验（C25-C26）
+        return layout.build_output_frame(output_bytes)
         
     def crc16(self, data):
-        """使用查找表计算CRC16 - 性能优化版本"""
-        crc = 0xFFFF
-        for byte in data:
-            crc = (crc >> 8) ^ self.crc16_table[(crc ^ byte) & 0xFF]
-        return ((crc & 0xFF) << 8) | ((crc >> 8) & 0xFF)
+        """CRC16，返回高低字节交换后的值"""
+        return crc16_swapped(data)
 
 def test_specific_input():
     """测试特定输入数据的转换结果"""
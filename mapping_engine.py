@@ -0,0 +1,585 @@
+"""
+I/O位映射引擎
+把5A输入帧按映射配置转换为A5输出帧，不依赖Qt，
+供主界面、异步串口桥接和测试脚本共用同一套映射与CRC逻辑。
+帧头、数据长度、帧尾、CRC和位序由frame_layout.FrameLayout定义，默认为原有的24字节格式。
+"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+from crc16 import crc16_swapped
+from frame_layout import DEFAULT_LAYOUT, FRAME_LAYOUTS, FrameLayout
+from logic_rules import compile_rules
+
+# 原有24字节格式的常量（A5 + D0~D23 + B24 + CRC16），其他帧格式使用FrameLayout的属性
+OUTPUT_FRAME_HEADER = DEFAULT_LAYOUT.output_header
+OUTPUT_DATA_LENGTH = DEFAULT_LAYOUT.data_length
+OUTPUT_STATUS_BYTE = DEFAULT_LAYOUT.output_trailer[0]
+BIT_COUNT = DEFAULT_LAYOUT.bit_count  # 24字节 * 8位 = 192位
+OUTPUT_FRAME_LENGTH = DEFAULT_LAYOUT.output_frame_length  # 28字节
+OUTPUT_CACHE_SIZE = 256  # 输出帧缓存的条目数
+
+
+crc16 = crc16_swapped  # 返回高低字节交换后的值，高字节即输出帧中的第一个CRC字节
+
+
+def build_output_frame(output_bytes, layout=DEFAULT_LAYOUT):
+    """由数据字节组装完整输出帧（帧头、测试状态字节和CRC16）"""
+    return layout.build_output_frame(output_bytes)
+
+
+DEFAULT_OUTPUT_FRAME = DEFAULT_LAYOUT.default_output_frame  # 未启用任何映射时的输出帧
+
+
+def bits_from_states(states, bit_count=BIT_COUNT):
+    """把以位号字符串为键的0/1字典转换为bit_count位整数（I0为最高位）"""
+    bits = 0
+    for key, value in states.items():
+        pos = int(key)
+        if value and 0 <= pos < bit_count:
+            bits |= 1 << (bit_count - 1 - pos)
+    return bits
+
+
+class BitStateView(MutableMapping):
+    """把引擎中的位状态整数表现为以位号字符串为键的字典
+
+    供映射配置文件的保存/加载和LED状态窗口按原有方式读写自锁状态，
+    读写直接作用于引擎中的整数，不保存副本。
+    """
+
+    def __init__(self, engine, name):
+        self._engine = engine
+        self._name = name
+
+    def _bit(self, key):
+        try:
+            pos = int(key)
+        except (TypeError, ValueError):
+            raise KeyError(key)
+        bit_count = self._engine.layout.bit_count
+        if not 0 <= pos < bit_count:
+            raise KeyError(key)
+        return 1 << (bit_count - 1 - pos)
+
+    def __getitem__(self, key):
+        return 1 if getattr(self._engine, self._name) & self._bit(key) else 0
+
+    def __setitem__(self, key, value):
+        bit = self._bit(key)
+        bits = getattr(self._engine, self._name)
+        setattr(self._engine, self._name, bits | bit if value else bits & ~bit)
+
+    def __delitem__(self, key):
+        self[key] = 0
+
+    def __iter__(self):
+        return (str(i) for i in range(self._engine.layout.bit_count))
+
+    def __len__(self):
+        return self._engine.layout.bit_count
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class MappingEngine:
+    """位映射配置和转换逻辑
+
+    layout为帧格式（frame_layout.FrameLayout，默认24字节192位），创建后不能更换，
+    更换帧格式时用from_config(to_config(), layout)创建新引擎。位数记为N（layout.bit_count）。
+    配置由以位号字符串为键的字典组成：mapping(输入位->输出位)、fanout(输入位->附加输出位列表)、
+    enabled(是否启用)、latch(是否自锁)，只处理I0~IN-1。mapping和fanout一起构成稀疏的
+    NxN路由矩阵：一个输入可以驱动多个输出（扇出），多个输入路由到同一输出时按位或（扇入）。
+    自锁的运行状态保存为N位整数（I0为最高位，MSB位序时与输入帧数据区按大端组成的整数一致）：
+    prev_bits(上一次输入值，用于检测上升沿)、latch_bits(自锁输出状态)，
+    上升沿为 当前 & ~上一次，翻转为 latch_bits ^= 上升沿 & 自锁掩码。
+    prev_values/latch_states以字典视图（BitStateView）提供，与映射配置文件的格式相同。
+    convert()会更新自锁状态，同一个引擎不能被多个线程同时调用。
+
+    convert()执行由配置编译出的映射计划，不再逐帧遍历全部配置。完整长度的帧
+    使用按字节查表：每个输入字节预先算出256项输出位掩码表，一帧只对用到的输入字节查表
+    按位或得到输出；自锁位用整数运算一次更新全部状态，再对自锁状态字节查表。
+    位序只影响编译时的位掩码，LSB位序的自锁和逻辑规则每帧多做一次字节内位序反转。
+    输入帧过短时按计划逐步执行。
+    不含自锁位时输出只取决于输入数据，完整帧的结果按输入数据缓存（LRU，OUTPUT_CACHE_SIZE条），
+    输入长时间不变时直接返回缓存的输出帧，不再查表和计算CRC；未启用任何映射时返回DEFAULT_OUTPUT_FRAME。
+    扇出和扇入都并入同一组按字节查找表，每帧的开销与1:1映射相同。
+    直接修改mapping/fanout/enabled/latch字典后必须调用invalidate()，下一帧自动重新编译；
+    整体替换这些字典（赋值属性）时自动失效。
+
+    rules为逻辑规则文本（每行一条，见logic_rules），规则写入的输出位覆盖1:1映射的结果。
+    规则文本不变时重新编译映射计划会保留已编译的规则和定时器状态；
+    含定时器的规则使输出依赖时间，与自锁位一样不使用输出帧缓存。
+    """
+
+    def __init__(self, layout=None):
+        self.layout = layout or DEFAULT_LAYOUT
+        self._plan = None
+        self._tables = ()
+        self._latch_tables = ()
+        self._latch_mask = 0
+        self._rule_mask = 0  # 规则写入的输出位，按数据区的位序
+        self._full_length = 0
+        self._rule_program = None
+        self._cacheable = False
+        self._cache = OrderedDict()  # 输入数据 -> 输出帧
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.prev_bits = 0
+        self.latch_bits = 0
+        self.mapping = {}
+        self.fanout = {}
+        self.enabled = {}
+        self.latch = {}
+        self.rules = []
+        for i in range(self.layout.bit_count):
+            self.mapping[str(i)] = i  # 默认一一对应
+            self.enabled[str(i)] = False  # 默认禁用所有映射
+            self.latch[str(i)] = False  # 默认禁用自锁模式
+
+    def __setattr__(self, name, value):
+        if name in ('mapping', 'fanout', 'enabled', 'latch', 'rules'):
+            object.__setattr__(self, '_plan', None)
+        object.__setattr__(self, name, value)
+
+    @property
+    def prev_values(self):
+        return BitStateView(self, 'prev_bits')
+
+    @prev_values.setter
+    def prev_values(self, states):
+        self.prev_bits = bits_from_states(states, self.layout.bit_count)
+
+    @property
+    def latch_states(self):
+        return BitStateView(self, 'latch_bits')
+
+    @latch_states.setter
+    def latch_states(self, states):
+        self.latch_bits = bits_from_states(states, self.layout.bit_count)
+
+    def invalidate(self):
+        """映射配置已修改，下一帧重新编译映射计划并清空输出帧缓存"""
+        self._plan = None
+
+    def set_rules(self, lines):
+        """设置逻辑规则并立即编译，规则有误时抛出logic_rules.RuleError且保留原规则"""
+        program = compile_rules(lines, bit_count=self.layout.bit_count)
+        self.rules = list(lines)
+        self._rule_program = program
+
+    @property
+    def rule_program(self):
+        """编译后的逻辑规则（logic_rules.RuleProgram），没有规则时为None"""
+        if self._plan is None:
+            self.compile()
+        return self._rule_program
+
+    @property
+    def stateless(self):
+        """输出是否只取决于当前输入帧（没有自锁位和含定时器的规则）"""
+        if self._plan is None:
+            self.compile()
+        return self._cacheable
+
+    @property
+    def cache_hit_rate(self):
+        """输出帧缓存命中率（0~1），没有查询过时为0"""
+        total = self.cache_hits + self.cache_misses
+        return self.cache_hits / total if total else 0.0
+
+    def reset_cache_stats(self):
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def outputs_of(self, input_pos):
+        """输入位路由到的全部输出位：mapping中的输出位在前，随后是fanout中的附加输出位（去重）"""
+        key = str(input_pos)
+        outputs = [int(self.mapping.get(key, int(key)))]
+        for output_pos in self.fanout.get(key, ()):
+            output_pos = int(output_pos)
+            if output_pos not in outputs:
+                outputs.append(output_pos)
+        return outputs
+
+    def routes(self):
+        """启用的路由（稀疏路由矩阵），{输入位: [输出位, ...]}"""
+        return {int(key): self.outputs_of(key) for key, enabled in self.enabled.items() if enabled}
+
+    def update_latches(self, current, mask):
+        """对mask中的位做上升沿检测并翻转自锁状态，返回上升沿位
+
+        current为当前输入的位状态整数（I0为最高位），只有mask中的位会更新上一次值
+        """
+        prev = self.prev_bits
+        edges = current & ~prev & mask
+        self.latch_bits ^= edges
+        self.prev_bits = (prev & ~mask) | (current & mask)
+        return edges
+
+    def compile(self):
+        """把映射配置编译为映射计划
+
+        计划是按配置顺序排列的步骤元组，每个启用的输入位一步：
+        (输入字节下标, 输入位掩码, ((输出字节下标, 输出位掩码), ...), 自锁位)。
+        输入字节下标已计入帧头偏移，位掩码按帧格式的位序；超出数据区的输出位不列入
+        （自锁状态仍然更新）；自锁位是该输入位在prev_bits/latch_bits中的位，非自锁步骤为None。
+        """
+        layout = self.layout
+        bit_count = layout.bit_count
+        plan = []
+        for input_pos, enabled in self.enabled.items():
+            if not enabled:
+                continue
+            input_pos_int = int(input_pos)
+            if not 0 <= input_pos_int < bit_count:
+                continue
+            is_latch = bool(self.latch.get(str(input_pos_int), False))
+            outputs = tuple(layout.bit_mask(output_pos)
+                            for output_pos in self.outputs_of(input_pos)
+                            if 0 <= output_pos < bit_count)
+            if not outputs and not is_latch:
+                continue  # 输出位无效且没有自锁状态需要维护
+            input_index, input_mask = layout.bit_mask(input_pos_int)
+            plan.append((input_index + layout.data_offset, input_mask, outputs,
+                         1 << (bit_count - 1 - input_pos_int) if is_latch else None))
+        self._plan = tuple(plan)
+        program = self._rule_program
+        if program is None or program.lines != tuple(self.rules):
+            self._rule_program = compile_rules(self.rules, bit_count=bit_count)
+        self._cache.clear()
+        self._compile_tables(self._plan)
+        return self._plan
+
+    def _compile_tables(self, plan):
+        """由映射计划生成按字节查找表
+
+        输出位是所有路由到它的输入的按位或，因此每条路由(输入位, 输出位)直接并入表中：
+        非自锁输入并入所在输入字节的256项表（数据区按大端组成的整数，D0为最高字节），
+        自锁输入并入自锁状态字节的256项表（自锁状态按位号编号，与位序无关）；所有自锁位组成自锁掩码。
+        扇出和扇入只改变表项的内容，不增加查表次数。
+        """
+        layout = self.layout
+        data_length = layout.data_length
+        sources = {}  # 输入字节下标 -> [(输入位掩码, 输出位)]
+        latch_sources = {}  # 自锁状态字节下标 -> [(位掩码, 输出位)]
+        latch_mask = 0
+        for input_index, input_mask, outputs, latch_bit in plan:
+            if latch_bit is not None:
+                latch_mask |= latch_bit
+                input_pos = layout.bit_count - latch_bit.bit_length()
+                pairs = latch_sources.setdefault(input_pos // 8, [])
+                input_mask = 1 << (7 - input_pos % 8)
+            else:
+                pairs = sources.setdefault(input_index, [])
+            for output_index, output_mask in outputs:
+                pairs.append((input_mask, output_mask << ((data_length - 1 - output_index) * 8)))
+
+        self._tables = self._build_tables(sources)
+        self._latch_tables = self._build_tables(latch_sources)
+        self._latch_mask = latch_mask
+        program = self._rule_program
+        self._rule_mask = layout.reorder(program.mask) if program is not None else 0
+        self._cacheable = not latch_mask and (program is None or program.stateless)
+        # 查表要求帧覆盖计划中的所有输入字节，有自锁位或逻辑规则时需要完整的数据区
+        self._full_length = max((step[0] for step in plan), default=0) + 1
+        if latch_mask or program is not None:
+            self._full_length = max(self._full_length, layout.data_offset + data_length)
+
+    @staticmethod
+    def _build_tables(sources):
+        tables = []
+        for byte_index, pairs in sorted(sources.items()):
+            table = [0] * 256
+            for mask, output_bit in pairs:
+                for value in range(256):
+                    if value & mask:
+                        table[value] |= output_bit
+            tables.append((byte_index, tuple(table)))
+        return tuple(tables)
+
+    @classmethod
+    def from_config(cls, config, layout=None):
+        """从映射配置文件的内容创建引擎，恢复保存的自锁状态和上一次输入值
+
+        layout为None时使用配置中的帧格式（没有时为默认格式）；超出帧格式位数的配置项被忽略，
+        规则中的位号超出时抛出logic_rules.RuleError
+        """
+        if layout is None:
+            layout = FrameLayout.from_config(config['frame_layout']) if 'frame_layout' in config else DEFAULT_LAYOUT
+        engine = cls(layout)
+
+        def in_range(items):
+            return {key: value for key, value in items.items() if 0 <= int(key) < layout.bit_count}
+
+        engine.mapping.update(in_range(config.get('mapping', {})))
+        engine.fanout = {key: [int(output) for output in outputs]
+                         for key, outputs in in_range(config.get('fanout', {})).items() if outputs}
+        engine.enabled.update(in_range(config.get('enabled', {})))
+        engine.latch.update(in_range(config.get('latch', {})))
+        engine.latch_states = in_range(config.get('latch_states', {}))
+        engine.prev_values = in_range(config.get('prev_values', {}))
+        engine.set_rules(config.get('rules', []))
+        return engine
+
+    def to_config(self):
+        """导出为映射配置文件的内容"""
+        return {
+            'frame_layout': self.layout.to_config(),
+            'mapping': self.mapping,
+            'fanout': {key: list(outputs) for key, outputs in self.fanout.items() if outputs},
+            'enabled': self.enabled,
+            'latch': self.latch,
+            'rules': list(self.rules),
+            'latch_states': dict(self.latch_states),
+            'prev_values': dict(self.prev_values)
+        }
+
+    def convert(self, input_data, now=None):
+        """根据映射配置把输入帧转换为输出帧，now为定时器规则使用的单调时钟时间（默认当前时间）"""
+        length = len(input_data)
+        if length == 0:
+            return bytearray()
+        plan = self._plan
+        if plan is None:
+            plan = self.compile()
+        program = self._rule_program
+        layout = self.layout
+        if not plan and program is None:
+            return bytearray(layout.default_output_frame)
+        if length < self._full_length:
+            return self._execute_plan(plan, input_data, length, now)
+
+        cacheable = self._cacheable
+        if cacheable:
+            # 输出只取决于输入数据；以整帧为键，省去切片（帧尾的B24一般不变）
+            key = input_data if type(input_data) is bytes else bytes(input_data)
+            cache = self._cache
+            frame = cache.get(key)
+            if frame is not None:
+                cache.move_to_end(key)
+                self.cache_hits += 1
+                return bytearray(frame)  # 返回副本，调用方修改结果不影响缓存
+            self.cache_misses += 1
+
+        output = 0
+        for input_index, table in self._tables:
+            output |= table[input_data[input_index]]
+        latch_mask = self._latch_mask
+        data_length = layout.data_length
+        if latch_mask or program is not None:
+            offset = layout.data_offset
+            current = layout.reorder(int.from_bytes(input_data[offset:offset + data_length], 'big'))
+            if latch_mask:
+                # 自锁模式：上升沿（0变为1）时切换自锁状态，输出自锁状态
+                self.update_latches(current, latch_mask)
+                if self._latch_tables:
+                    states = self.latch_bits.to_bytes(data_length, 'big')
+                    for state_index, table in self._latch_tables:
+                        output |= table[states[state_index]]
+            if program is not None:
+                output = (output & ~self._rule_mask) | layout.reorder(program.evaluate(current, now))
+
+        frame = layout.build_output_frame(output.to_bytes(data_length, 'big'))
+        if not cacheable:
+            return frame
+        cache[key] = bytes(frame)
+        if len(cache) > OUTPUT_CACHE_SIZE:
+            cache.popitem(last=False)
+        return frame
+
+    def _execute_plan(self, plan, input_data, length, now=None):
+        """按映射计划逐步执行，用于不完整的短帧（逻辑规则按缺少的字节为0求值）"""
+        layout = self.layout
+        output_bytes = bytearray(layout.data_length)
+        prev_bits = self.prev_bits
+        latch_bits = self.latch_bits
+        for input_index, input_mask, outputs, latch_bit in plan:
+            if input_index >= length:
+                continue
+            value = input_data[input_index] & input_mask
+            if latch_bit is not None:
+                # 自锁模式：上升沿（0变为1）时切换自锁状态，输出自锁状态
+                if value:
+                    if not prev_bits & latch_bit:
+                        latch_bits ^= latch_bit
+                    prev_bits |= latch_bit
+                else:
+                    prev_bits &= ~latch_bit
+                value = latch_bits & latch_bit
+            if value:
+                for output_index, output_mask in outputs:
+                    output_bytes[output_index] |= output_mask
+        self.prev_bits = prev_bits
+        self.latch_bits = latch_bits
+
+        program = self._rule_program
+        if program is not None:
+            current = layout.bits_from_payload(layout.payload(input_data))
+            output = int.from_bytes(output_bytes, 'big') & ~self._rule_mask
+            output |= layout.reorder(program.evaluate(current, now))
+            output_bytes = output.to_bytes(layout.data_length, 'big')
+        return layout.build_output_frame(output_bytes)
+
+    def convert_reference(self, input_data):
+        """逐帧解析配置的逐位参考实现（含扇出/扇入，不含逻辑规则），用于校验convert()和性能对比
+
+        路由到同一输出位的多个输入按位或。这与原算法（convert_baseline）不同：原算法中
+        多个输入映射到同一输出位时最后处理的映射生效；没有扇入的配置两者结果相同。
+        """
+        if len(input_data) == 0:
+            return bytearray()
+        layout = self.layout
+
+        # 创建输出字节列表（对应D0~Dn-1）
+        output_bytes = bytearray(layout.data_length)
+
+        # 预先计算启用的映射，避免在循环中重复检查
+        enabled_mappings = {}
+        for input_pos, enabled in self.enabled.items():
+            if enabled:
+                enabled_mappings[int(input_pos)] = self.outputs_of(input_pos)
+
+        # 如果没有启用的映射，直接返回默认输出
+        if not enabled_mappings:
+            return layout.build_output_frame(output_bytes)
+
+        remaining_data = input_data[layout.data_offset:]
+        latch = self.latch
+        prev_values = self.prev_values
+        latch_states = self.latch_states
+
+        for input_pos, output_positions in enabled_mappings.items():
+            if input_pos >= layout.bit_count:
+                continue
+            input_byte_index, input_mask = layout.bit_mask(input_pos)  # 按帧格式的位序
+
+            # 确保输入字节索引在有效范围内
+            if input_byte_index >= len(remaining_data):
+                continue
+            input_bit_value = 1 if remaining_data[input_byte_index] & input_mask else 0
+
+            input_pos_str = str(input_pos)
+            if latch.get(input_pos_str, False):
+                # 自锁模式：上升沿（0变为1）时切换自锁状态，输出自锁状态
+                if prev_values.get(input_pos_str, 0) == 0 and input_bit_value == 1:
+                    latch_states[input_pos_str] = 1 - latch_states.get(input_pos_str, 0)
+                prev_values[input_pos_str] = input_bit_value
+                input_bit_value = latch_states.get(input_pos_str, 0)
+
+            if input_bit_value != 1:
+                continue
+            for output_pos in output_positions:
+                if 0 <= output_pos < layout.bit_count:
+                    output_byte_index, output_mask = layout.bit_mask(output_pos)
+                    output_bytes[output_byte_index] |= output_mask
+
+        return layout.build_output_frame(output_bytes)
+
+    def convert_baseline(self, input_data):
+        """原主窗口convert_data的逐位算法（行为与原实现相同，只处理mapping，不含扇出和逻辑规则），用于确认行为变化
+
+        每个启用的映射按enabled中的顺序对输出位置位或清零，多个输入映射到同一输出位时
+        最后处理的映射生效。按原算法固定MSB位序，只用于MSB位序的帧格式。
+        """
+        if len(input_data) == 0:
+            return bytearray()
+        layout = self.layout
+
+        # 创建输出字节列表（对应D0~Dn-1）
+        output_bytes = bytearray(layout.data_length)
+
+        # 预先计算启用的映射，避免在循环中重复检查
+        enabled_mappings = {}
+        for input_pos, enabled in self.enabled.items():
+            if enabled:
+                input_pos_int = int(input_pos) if isinstance(input_pos, str) else input_pos
+                output_pos = self.mapping.get(input_pos, input_pos)
+                output_pos_int = int(output_pos) if isinstance(output_pos, str) else output_pos
+                enabled_mappings[input_pos_int] = output_pos_int
+
+        # 如果没有启用的映射，直接返回默认输出
+        if not enabled_mappings:
+            return layout.build_output_frame(output_bytes)
+
+        remaining_data = input_data[layout.data_offset:]
+        latch = self.latch
+        prev_values = self.prev_values
+        latch_states = self.latch_states
+
+        for input_pos, output_pos in enabled_mappings.items():
+            input_pos_str = str(input_pos)
+            input_byte_index = input_pos // 8
+            input_bit_index = 7 - (input_pos % 8)  # 从左到右递增
+
+            # 确保输入字节索引在有效范围内
+            if input_byte_index >= len(remaining_data):
+                continue
+            output_bit_value = (remaining_data[input_byte_index] >> input_bit_index) & 1
+
+            # 检查是否启用了自锁模式
+            if latch.get(input_pos_str, False):
+                # 自锁模式：检测上升沿（从0变为1）时切换自锁状态，使用自锁状态作为输出值
+                if prev_values.get(input_pos_str, 0) == 0 and output_bit_value == 1:
+                    latch_states[input_pos_str] = 1 - latch_states.get(input_pos_str, 0)
+                prev_values[input_pos_str] = output_bit_value
+                output_bit_value = latch_states.get(input_pos_str, 0)
+
+            # 计算输出位所在的字节和位置
+            output_byte_index = output_pos // 8
+            output_bit_index = 7 - (output_pos % 8)  # 从左到右递增
+
+            # 如果输出字节索引在有效范围内，设置对应位的值
+            if 0 <= output_byte_index < layout.data_length:
+                if output_bit_value == 1:
+                    output_bytes[output_byte_index] |= (1 << output_bit_index)
+                else:
+                    output_bytes[output_byte_index] &= ~(1 << output_bit_index)
+
+        return layout.build_output_frame(output_bytes)
+
+
+def benchmark(frames=20000):
+    """对比参考实现、映射计划和按字节查表在不同帧格式和启用映射数下的转换速度"""
+    import random
+    import time
+
+    rnd = random.Random(0)
+    print(f"每种配置转换 {frames} 帧（帧/s），按字节查表使用互不相同的输入帧，输入不变时命中缓存")
+    print(f"{'位数':>6}{'启用映射':>8}{'自锁':>6}{'参考实现':>12}{'映射计划':>12}{'按字节查表':>12}{'输入不变':>12}")
+    for layout in FRAME_LAYOUTS.values():
+        bit_count = layout.bit_count
+        inputs = [layout.build_input_frame(rnd.randbytes(layout.data_length)) for _ in range(frames)]
+        repeated = [inputs[0]] * frames  # 输入不变，不含自锁位时全部命中输出帧缓存
+        configs = [(0, 0), (16, 0), (192, 0), (192, 0.25)]
+        if bit_count > 192:
+            configs.append((bit_count, 0))  # 全部位启用
+        for count, latch_ratio in configs:
+            engine = MappingEngine(layout)
+            for i in rnd.sample(range(bit_count), count):
+                engine.enabled[str(i)] = True
+                engine.mapping[str(i)] = rnd.randrange(bit_count)
+                engine.latch[str(i)] = rnd.random() < latch_ratio
+            plan = engine.compile()
+            variants = ((engine.convert_reference, inputs),
+                        (lambda data: engine._execute_plan(plan, data, len(data)), inputs),
+                        (engine.convert, inputs),
+                        (engine.convert, repeated))
+            rates = []
+            for convert, data in variants:
+                start = time.perf_counter()
+                for frame in data:
+                    convert(frame)
+                rates.append(frames / (time.perf_counter() - start))
+            latch_count = sum(1 for step in plan if step[3] is not None)
+            print(f"{bit_count:>6}{count:>8}{latch_count:>6}" + ''.join(f"{rate:>12.0f}" for rate in rates))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench':
+        benchmark()
+    else:
+        print("用法: python mapping_engine.py --bench")
@@ -0,0 +1,179 @@
+from datetime import datetime
+
+import serial.tools.list_ports
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGridLayout, QGroupBox, QLabel, QComboBox,
+                             QPushButton, QPlainTextEdit, QLineEdit, QScrollArea, QMessageBox)
+
+
+class PortView(QGroupBox):
+    """单个串口会话的显示区域"""
+    def __init__(self, session, on_close, parent=None):
+        super().__init__(session.port, parent)
+        self.session = session
+
+        layout = QVBoxLayout(self)
+
+        self.stats_label = QLabel('')
+        layout.addWidget(self.stats_label)
+
+        # 只保留最近500行，内存不随运行时间增长
+        self.log = QPlainTextEdit()
+        self.log.setReadOnly(True)
+        self.log.setMaximumBlockCount(500)
+        self.log.setStyleSheet('font-family: Consolas, monospace;')
+        layout.addWidget(self.log)
+
+        send_layout = QHBoxLayout()
+        self.send_edit = QLineEdit()
+        self.send_edit.setPlaceholderText('十六进制数据，如 A5 00 01')
+        self.send_edit.returnPressed.connect(self.send)
+        send_layout.addWidget(self.send_edit)
+        send_btn = QPushButton('发送')
+        send_btn.clicked.connect(self.send)
+        send_layout.addWidget(send_btn)
+        close_btn = QPushButton('关闭')
+        close_btn.clicked.connect(lambda: on_close(session.port))
+        send_layout.addWidget(close_btn)
+        layout.addLayout(send_layout)
+
+    def send(self):
+        """发送输入框中的十六进制数据"""
+        try:
+            data = bytes.fromhex(self.send_edit.text().replace(' ', ''))
+        except ValueError:
+            QMessageBox.warning(self, '警告', '请输入有效的十六进制字符串')
+            return
+        if data and not self.session.write(data):
+            QMessageBox.warning(self, '警告', '发送队列已满或串口未打开')
+
+    def refresh(self):
+        """由共享定时器调用，把新数据追加到显示区"""
+        items = self.session.take_pending()
+        if items:
+            lines = [f"[{datetime.fromtimestamp(timestamp).strftime('%H:%M:%S.%f')[:-3]}] {data.hex(' ').upper()}"
+                     for timestamp, data in items]
+            self.log.appendPlainText('\n'.join(lines))
+
+        session = self.session
+        text = f'接收: {session.rx_count}  发送: {session.tx_count}'
+        assembler = session.frame_assembler
+        if assembler is not None:
+            text += f'  帧: {assembler.frame_count}  重同步: {assembler.resync_count}  丢弃字节: {assembler.garbage_bytes}'
+        if session.reader is not None:
+            text += f'  待处理批次: {session.reader.pending_batches}'
+        if self.stats_label.text() != text:
+            self.stats_label.setText(text)
+
+
+class MultiPortWindow(QWidget):
+    """多串口监控窗口
+
+    busy_port返回主窗口当前打开的串口（没有时为None），同一串口不能在会话中再次打开。
+    frame_layout返回主窗口当前的帧格式，新打开的会话按该格式组帧。
+    """
+    def __init__(self, session_manager, busy_port=None, frame_layout=None, parent=None):
+        super().__init__(parent)
+        self.session_manager = session_manager
+        self.busy_port = busy_port
+        self.frame_layout = frame_layout
+        self.views = {}
+
+        self.setWindowTitle('多串口监控')
+        self.setGeometry(200, 200, 1100, 700)
+
+        main_layout = QVBoxLayout(self)
+
+        # 添加串口
+        add_layout = QHBoxLayout()
+        add_layout.addWidget(QLabel('串口:'))
+        self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)
+        add_layout.addWidget(self.port_combo)
+        refresh_btn = QPushButton('刷新')
+        refresh_btn.clicked.connect(self.update_port_list)
+        add_layout.addWidget(refresh_btn)
+        add_layout.addWidget(QLabel('波特率:'))
+        self.baudrate_combo = QComboBox()
+        self.baudrate_combo.addItems(["9600", "115200", "57600", "38400", "19200", "4800",
+                                      "2400", "460800", "921600"])
+        self.baudrate_combo.setCurrentText("115200")
+        add_layout.addWidget(self.baudrate_combo)
+        open_btn = QPushButton('打开')
+        open_btn.setStyleSheet("background-color: #4CAF50; color: white;")
+        open_btn.clicked.connect(self.open_port)
+        add_layout.addWidget(open_btn)
+        add_layout.addStretch()
+        main_layout.addLayout(add_layout)
+
+        # 各串口视图
+        views_widget = QWidget()
+        self.views_layout = QGridLayout(views_widget)
+        scroll_area = QScrollArea()
+        scroll_area.setWidgetResizable(True)
+        scroll_area.setWidget(views_widget)
+        main_layout.addWidget(scroll_area)
+
+        self.session_manager.tick.connect(self.refresh_views)
+        self.session_manager.session_closed.connect(self.remove_view)
+        self.update_port_list()
+
+    def update_port_list(self):
+        """更新串口列表"""
+        current_port = self.port_combo.currentText()
+        self.port_combo.clear()
+        self.port_combo.addItems([port.device for port in serial.tools.list_ports.comports()])
+        if current_port:
+            self.port_combo.setCurrentText(current_port)
+
+    def open_port(self):
+        """打开串口会话并添加视图"""
+        port = self.port_combo.currentText().strip()
+        if not port:
+            QMessageBox.warning(self, '警告', '请选择串口')
+            return
+        if port in self.views:
+            return
+        if self.busy_port is not None and port == self.busy_port():
+            QMessageBox.warning(self, '警告', f'{port} 已在主窗口中打开，请先在主窗口关闭')
+            return
+        kwargs = {}
+        if self.frame_layout is not None:
+            kwargs['layout'] = self.frame_layout()
+        try:
+            session = self.session_manager.open_port(port, int(self.baudrate_combo.currentText()), **kwargs)
+        except Exception as e:
+            QMessageBox.critical(self, '错误', f'打开串口错误: {str(e)}')
+            return
+        view = PortView(session, self.session_manager.close_port)
+        self.views[port] = view
+        self.relayout_views()
+
+    def remove_view(self, port):
+        """会话关闭后移除对应视图"""
+        view = self.views.pop(port, None)
+        if view is not None:
+            view.setParent(None)
+            view.deleteLater()
+            self.relayout_views()
+
+    def relayout_views(self):
+        """按两列重新排列所有视图"""
+        for index, view in enumerate(self.views.values()):
+            self.views_layout.addWidget(view, index // 2, index % 2)
+
+    def refresh_views(self):
+        """共享刷新节拍：依次刷新所有可见的串口视图"""
+        if not self.isVisible():
+            return
+        for view in self.views.values():
+            view.refresh()
+
+    def closeEvent(self, event):
+        """关闭窗口时关闭所有串口会话，并断开与会话管理器的连接（管理器比窗口存在得久）"""
+        self.session_manager.close_all()
+        try:
+            self.session_manager.tick.disconnect(self.refresh_views)
+            self.session_manager.session_closed.disconnect(self.remove_view)
+        except TypeError:
+            pass  # 窗口已经关闭过一次，连接已断开
+        event.accept()
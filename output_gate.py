@@ -0,0 +1,78 @@
+"""
+变化驱动的输出发送
+映射输出帧与上次发出的帧相同时不再重复发送，只在内容变化或保活周期到期时发送，
+节省链路带宽和下位机的解析时间，保活帧让设备的看门狗保持正常
+"""
+
+import time
+
+
+class OutputGate:
+    """判断一个输出帧是否需要发送
+
+    enabled为False时每帧都发送（原有的定时发送行为）；
+    keepalive为保活周期（秒），输出不变时超过该时间重发一次上次的帧，0表示不发送保活帧。
+    """
+
+    def __init__(self, enabled=True, keepalive=1.0):
+        self.enabled = enabled
+        self.keepalive = keepalive
+        self.last_frame = None
+        self.last_sent = 0.0
+        self.sent_count = 0
+        self.keepalive_count = 0  # 内容未变、因保活周期到期而发送的帧数
+        self.suppressed_count = 0
+        self.saved_bytes = 0  # 未发送帧的总字节数
+
+    def should_send(self, frame, now=None):
+        """frame是否需要发送，不需要时计入节省的字节数
+
+        只做判断，帧确实交给串口后调用mark_sent()；发送被拒绝（如发送队列已满）时不调用，
+        下一个相同的帧仍会发送。
+        """
+        if now is None:
+            now = time.monotonic()
+        if self.enabled and frame == self.last_frame:
+            if not self.keepalive or now - self.last_sent < self.keepalive:
+                self.suppressed_count += 1
+                self.saved_bytes += len(frame)
+                return False
+        return True
+
+    def mark_sent(self, frame, now=None):
+        """记录frame已发送，之后相同的帧在保活周期内不再发送"""
+        if now is None:
+            now = time.monotonic()
+        if self.enabled and frame == self.last_frame:
+            self.keepalive_count += 1
+        self.last_frame = bytes(frame)
+        self.last_sent = now
+        self.sent_count += 1
+
+    def keepalive_remaining(self, now=None):
+        """距下一次保活发送的秒数，不需要保活时返回None"""
+        if not self.enabled or not self.keepalive or self.last_frame is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        return max(0.0, self.last_sent + self.keepalive - now)
+
+    def keepalive_due(self, now=None):
+        """距上次发送已超过保活周期时返回应重发的帧，否则返回None；发送后同样调用mark_sent()"""
+        if not self.enabled or not self.keepalive or self.last_frame is None:
+            return None
+        if now is None:
+            now = time.monotonic()
+        if now - self.last_sent < self.keepalive:
+            return None
+        return self.last_frame
+
+    def reset(self):
+        """忘记上次发送的帧，下一帧一定发送（重新开始发送或重新打开串口时调用）"""
+        self.last_frame = None
+
+    def reset_stats(self):
+        self.sent_count = 0
+        self.keepalive_count = 0
+        self.suppressed_count = 0
+        self.saved_bytes = 0
@@ -0,0 +1,138 @@
+"""
+多串口会话管理
+每个会话拥有独立的串口、读取线程、帧组装器、发送线程和收发统计；
+所有会话的界面刷新共用SessionManager的同一个定时器
+"""
+
+from collections import deque
+
+import serial
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from frame_assembler import FrameAssembler
+from frame_layout import DEFAULT_LAYOUT
+from serial_io import SerialWriter
+from serial_threads import SerialThread, SerialWriterThread
+
+
+class PortSession(QObject):
+    """单个串口的收发会话
+
+    帧模式下按layout（frame_layout.FrameLayout）的输入帧格式组帧，打开后不随主窗口切换帧格式。
+    """
+
+    def __init__(self, port, baudrate=115200, frame_mode=True, layout=DEFAULT_LAYOUT, display_limit=500, parent=None,
+                 **serial_kwargs):
+        super().__init__(parent)
+        self.port = port
+        self.baudrate = baudrate
+        self.frame_mode = frame_mode
+        self.layout = layout
+        self.serial_kwargs = serial_kwargs
+        self.ser = None
+        self.reader = None
+        self.writer = None
+        self.rx_count = 0
+        self.tx_count = 0
+        self.last_received_data = None
+        # 等待界面取走的接收数据[(时间戳, 数据)]，超出上限时丢弃最旧的
+        self.pending = deque(maxlen=display_limit)
+
+    @property
+    def is_open(self):
+        return bool(self.ser and self.ser.is_open)
+
+    @property
+    def frame_assembler(self):
+        return self.reader.frame_assembler if self.reader else None
+
+    def open(self):
+        """打开串口并启动读写线程，失败时抛出异常"""
+        self.ser = serial.Serial(port=self.port, baudrate=self.baudrate, timeout=1, **self.serial_kwargs)
+        assembler = FrameAssembler.for_layout(self.layout) if self.frame_mode else None
+        self.reader = SerialThread(self.ser, frame_assembler=assembler)
+        self.reader.batch_received.connect(self._on_batch)
+        self.reader.start()
+        self.writer = SerialWriterThread(self.ser)
+        self.writer.bytes_written.connect(self._on_bytes_written)
+        self.writer.start()
+
+    def close(self):
+        """停止读写线程并关闭串口"""
+        if self.reader and self.reader.isRunning():
+            self.reader.stop()
+        if self.writer and self.writer.isRunning():
+            self.writer.stop()
+        self.reader = None
+        self.writer = None
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+
+    def write(self, data, priority=SerialWriter.PRIORITY_NORMAL):
+        """异步发送数据，队列已满或串口未打开时返回False"""
+        if not self.writer:
+            return False
+        return self.writer.submit(data, priority)
+
+    def take_pending(self):
+        """取走所有等待显示的接收数据"""
+        items = list(self.pending)
+        self.pending.clear()
+        return items
+
+    def _on_batch(self, batch):
+        try:
+            self.last_received_data = batch[-1][1]
+            self.rx_count += sum(len(data) for _, data in batch)
+            self.pending.extend(batch)
+        finally:
+            if self.reader:
+                self.reader.batch_done()
+
+    def _on_bytes_written(self, count):
+        self.tx_count += count
+
+
+class SessionManager(QObject):
+    """管理多个PortSession，并用一个共享定时器驱动所有视图刷新"""
+    session_opened = pyqtSignal(str)
+    session_closed = pyqtSignal(str)
+    tick = pyqtSignal()  # 所有会话视图在此信号中统一刷新
+
+    def __init__(self, interval=100, parent=None):
+        super().__init__(parent)
+        self.sessions = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.tick.emit)
+        self.interval = interval
+
+    def open_port(self, port, baudrate=115200, **kwargs):
+        """打开一个串口会话，已打开时直接返回已有会话
+
+        kwargs传给PortSession，如frame_mode、layout（帧格式）及串口参数。
+        """
+        if port in self.sessions:
+            return self.sessions[port]
+        session = PortSession(port, baudrate, parent=self, **kwargs)
+        session.open()
+        self.sessions[port] = session
+        if not self.timer.isActive():
+            self.timer.start(self.interval)
+        self.session_opened.emit(port)
+        return session
+
+    def close_port(self, port):
+        """关闭指定串口会话"""
+        session = self.sessions.pop(port, None)
+        if session is None:
+            return
+        session.close()
+        session.deleteLater()
+        if not self.sessions:
+            self.timer.stop()
+        self.session_closed.emit(port)
+
+    def close_all(self):
+        """关闭所有会话"""
+        for port in list(self.sessions):
+            self.close_port(port)
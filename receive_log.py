@@ -0,0 +1,271 @@
+"""
+接收区日志
+接收区由QTextEdit改为单列表格视图 + 列表模型：数据保存在收发记录存储（FrameStore）中，
+模型每行只保存记录序号，显示文本和高亮只在视图绘制可见行时生成。行数超过容量或记录被存储淘汰时
+从头部丢弃最旧的行，追加一批数据的开销与已有行数无关，内存不随运行时间增长。
+"""
+
+from collections import deque
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QAbstractTextDocumentLayout, QColor, QKeySequence, QPalette, QTextDocument
+from PyQt5.QtWidgets import (QAbstractItemView, QApplication, QHeaderView, QStyle, QStyledItemDelegate,
+                             QStyleOptionViewItem, QTableView)
+
+from frame_store import DIRECTION_RX, DIRECTION_TX
+from hex_render import ByteRenderer, format_time_ns
+
+DEFAULT_LOG_CAPACITY = 10000  # 接收区保留的最大行数
+
+HtmlRole = Qt.UserRole + 1  # 带高亮的HTML，不需要高亮的行为None
+
+DIRECTION_LABELS = {DIRECTION_RX: '[接收]', DIRECTION_TX: '[发送]'}
+
+
+def format_prefix(timestamp_ns, direction, repeat=None):
+    """行首的时间和方向；折叠了重复时为 [首次 ~ 末次] [接收] ×次数"""
+    if repeat is None or repeat[0] == 1:
+        return f"[{format_time_ns(timestamp_ns)}] {DIRECTION_LABELS[direction]}"
+    count, last_timestamp_ns = repeat
+    first, last = format_time_ns(timestamp_ns), format_time_ns(last_timestamp_ns)
+    return f"[{first} ~ {last}] {DIRECTION_LABELS[direction]} ×{count}"
+
+
+def format_record(record, hex_mode=True, repeat=None):
+    """一条记录的纯文本，与原接收区的显示格式相同；repeat为存储的 (重复次数, 末次时间戳ns)"""
+    timestamp_ns, direction, data = record
+    if hex_mode:
+        text = data.hex(' ').upper()
+    else:
+        # 多行文本合并为一行显示
+        text = data.decode('utf-8', errors='replace').replace('\r', '').replace('\n', ' ')
+    return f"{format_prefix(timestamp_ns, direction, repeat)} {text}"
+
+
+class ReceiveLogModel(QAbstractListModel):
+    """接收区显示的行，每行为 (记录序号, 说明文本)
+
+    说明文本为None时显示存储中的记录，否则是省略摘要等说明行（序号为当时最新记录的序号）。
+    """
+
+    def __init__(self, store, capacity=DEFAULT_LOG_CAPACITY, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self._rows = deque()
+        self.capacity = capacity
+        self.hex_mode = True
+        self.renderer = ByteRenderer()  # 十六进制显示时按高亮规则着色
+        self.max_columns = 0  # 已追加行的最大字符数，视图按它设置列宽
+        self.last_seq = -1  # 已追加到接收区的最新记录序号
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.row_text(index.row())
+        if role == HtmlRole:
+            return self.row_html(index.row())
+        if role == Qt.ForegroundRole and self._rows[index.row()][1] is not None:
+            return QColor('gray')
+        return None
+
+    def row_text(self, row):
+        seq, note = self._rows[row]
+        if note is not None:
+            return note
+        record = self.store.get(seq)
+        if record is None:  # 已被存储淘汰，下次追加时移除
+            return ''
+        return format_record(record, self.hex_mode, self.store.repeat_info(seq))
+
+    def row_html(self, row):
+        """十六进制显示的接收行中含有高亮字节时返回HTML，否则返回None"""
+        seq, note = self._rows[row]
+        if note is not None or not self.hex_mode:
+            return None
+        record = self.store.get(seq)
+        if record is None or record[1] != DIRECTION_RX:
+            return None
+        timestamp_ns, direction, data = record
+        renderer = self.renderer
+        if not renderer.has_highlight(data):
+            return None
+        return f"{format_prefix(timestamp_ns, direction, self.store.repeat_info(seq))} {renderer.html(data)}"
+
+    def append_records(self, seqs, summary_text=None, summary_seq=None):
+        """追加一批存储记录的序号和可选的省略摘要行
+
+        summary_seq为None时摘要行在这批记录之后，否则在之前，说明的是序号不大于summary_seq的记录。
+        超出容量的行和已被存储淘汰的记录从头部移除。
+        """
+        store = self.store
+        first_seq = store.first_seq
+        rows = [(seq, None) for seq in seqs if seq >= first_seq]
+        if summary_text:
+            if summary_seq is None:
+                rows.append((store.next_seq - 1, summary_text))
+            else:
+                rows.insert(0, (summary_seq, summary_text))
+        if not rows:
+            return
+        self.last_seq = max(self.last_seq, rows[-1][0])
+        if len(rows) > self.capacity:
+            rows = rows[-self.capacity:]
+
+        overflow = max(0, len(self._rows) + len(rows) - self.capacity)
+        # 行按序号递增，已淘汰的记录都在头部
+        while overflow < len(self._rows) and self._rows[overflow][0] < first_seq:
+            overflow += 1
+        if overflow:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            for _ in range(overflow):
+                self._rows.popleft()
+            self.endRemoveRows()
+
+        # 行文本的大致字符数，只按数据长度估算，不生成文本
+        columns = max(22 + (store.size(seq) * 3 if note is None else len(note)) for seq, note in rows)
+        if columns > self.max_columns:
+            self.max_columns = columns
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self.endInsertRows()
+
+    def refresh_record(self, seq):
+        """折叠重复后记录的次数和末次时间会变化，只重新绘制显示这条记录的行（总在末尾附近）"""
+        rows = self._rows
+        row = len(rows) - 1
+        while row >= 0 and rows[row][0] > seq:
+            row -= 1
+        while row >= 0 and rows[row][0] == seq and rows[row][1] is not None:  # 跳过同序号的摘要行
+            row -= 1
+        if row < 0 or rows[row] != (seq, None):
+            return  # 还没有显示
+        columns = len(self.row_text(row))
+        if columns > self.max_columns:
+            self.max_columns = columns
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def set_hex_mode(self, hex_mode):
+        """切换显示方式，已有的行按新方式重新显示，不需要清空"""
+        if hex_mode == self.hex_mode:
+            return
+        self.hex_mode = hex_mode
+        if self._rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1))
+
+    def set_highlights(self, highlights):
+        """修改高亮规则{字节: 颜色}，已有的行按新规则重新绘制"""
+        self.renderer.set_highlights(highlights)
+        if self._rows:
+            self.dataChanged.emit(self.index(0), self.index(len(self._rows) - 1))
+
+    def export_text(self):
+        """存储中全部记录的纯文本（包括显示时省略的），用于保存到文件"""
+        store = self.store
+        hex_mode = self.hex_mode
+        return ''.join(format_record(store.get(seq), hex_mode, store.repeat_info(seq)) + '\n'
+                       for seq in range(store.first_seq, store.next_seq))
+
+    def clear(self):
+        """清空显示的行，不影响存储"""
+        self.beginResetModel()
+        self._rows.clear()
+        self.max_columns = 0
+        self.endResetModel()
+
+
+class HexHighlightDelegate(QStyledItemDelegate):
+    """有HtmlRole的行用QTextDocument绘制着色的字节，其余行按默认方式绘制
+
+    视图只为可见行调用paint，高亮的开销与日志长度无关。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._document = QTextDocument(self)  # 各行复用同一个文档
+        self._document.setDocumentMargin(0)
+
+    def paint(self, painter, option, index):
+        html = index.data(HtmlRole)
+        if html is None:
+            super().paint(painter, option, index)
+            return
+        option = QStyleOptionViewItem(option)
+        self.initStyleOption(option, index)
+        option.text = ''
+        widget = option.widget
+        style = widget.style() if widget else QApplication.style()
+        # 先按默认方式绘制背景和选中状态，再绘制文本
+        style.drawControl(QStyle.CE_ItemViewItem, option, painter, widget)
+        text_rect = style.subElementRect(QStyle.SE_ItemViewItemText, option, widget)
+
+        document = self._document
+        document.setDefaultFont(option.font)
+        document.setHtml(html)
+        context = QAbstractTextDocumentLayout.PaintContext()
+        if option.state & QStyle.State_Selected:
+            context.palette.setColor(QPalette.Text, option.palette.color(QPalette.HighlightedText))
+        painter.save()
+        top = text_rect.top() + (text_rect.height() - document.size().height()) / 2
+        painter.translate(text_rect.left(), top)
+        painter.setClipRect(0, 0, text_rect.width(), text_rect.height())
+        document.documentLayout().draw(painter, context)
+        painter.restore()
+
+
+class ReceiveLogView(QTableView):
+    """接收区视图：单列表格，行高固定，只绘制可见行，Ctrl+C复制选中的行
+
+    使用QTableView而不是QListView：QListView每次插入行后重新布局全部行（1万行时每批约25 ms），
+    表格的行高固定时追加和滚动到底部的开销与行数无关。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.horizontalHeader().hide()
+        self.verticalHeader().hide()
+        self.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 4)
+        self.horizontalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setHorizontalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setItemDelegate(HexHighlightDelegate(self))
+        self._columns = -1
+
+    def setModel(self, model):
+        super().setModel(model)
+        model.rowsInserted.connect(self.update_column_width)
+        model.dataChanged.connect(self.update_column_width)
+        model.modelReset.connect(self.update_column_width)
+        self.update_column_width()
+
+    def update_column_width(self):
+        """列宽取最长行，长帧可以水平滚动查看；只在最长行变化时调整"""
+        columns = self.model().max_columns
+        if columns == self._columns:
+            return
+        self._columns = columns
+        width = self.fontMetrics().horizontalAdvance('0') * columns + 16
+        self.setColumnWidth(0, max(width, self.viewport().width()))
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            self.copy_selection()
+            return
+        super().keyPressEvent(event)
+
+    def copy_selection(self):
+        """复制选中行的纯文本"""
+        model = self.model()
+        rows = sorted(index.row() for index in self.selectionModel().selectedRows())
+        if model is not None and rows:
+            QApplication.clipboard().setText('\n'.join(model.row_text(row) for row in rows))
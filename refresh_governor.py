@@ -0,0 +1,166 @@
+"""
+界面刷新调度
+接收区刷新、映射列表和LED窗口的定时器统一由RefreshGovernor管理：
+
+- 所在窗口隐藏、最小化或窗口系统报告不可见时停止定时器，重新可见时立即刷新一次补齐
+- 接收区刷新是有数据才启动的单次定时器，间隔随接收帧率调整：低速时尽快显示，高速时合并成更大的批次
+
+没有数据或窗口不可见时不再有周期性唤醒，最小化后空闲CPU接近0。
+窗口的显示、隐藏、最小化通过事件过滤器得知，不需要轮询。
+"""
+
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+
+# (接收帧率上限 帧/秒, 刷新间隔 ms)，帧率越高间隔越长，每次刷新合并更多帧
+FLUSH_INTERVALS = ((20, 20), (200, 50), (2000, 100), (None, 200))
+SLOW_INTERVAL = 1000  # 新数据不在可见范围内（如关闭自动滚屏后已填满）时的刷新间隔
+RATE_WINDOW = 0.5  # 帧率统计窗口（秒）
+
+_VISIBILITY_EVENTS = (QEvent.Show, QEvent.Hide, QEvent.WindowStateChange, QEvent.Expose)
+
+
+def interval_for_rate(rate):
+    """接收帧率对应的刷新间隔（ms）"""
+    for limit, interval in FLUSH_INTERVALS:
+        if limit is None or rate < limit:
+            return interval
+
+
+def is_widget_visible(widget):
+    """控件所在窗口已显示、没有最小化且窗口系统报告为可见"""
+    if widget is None or not widget.isVisible():
+        return False
+    window = widget.window()
+    if window.isMinimized():
+        return False
+    handle = window.windowHandle()
+    return handle is None or handle.isExposed()
+
+
+class RefreshJob:
+    """一项受调度的刷新
+
+    widget为控件或返回控件的函数（控件可能稍后才创建）；
+    timer为None时只在重新可见时调用on_resume；data_driven为True时timer是单次定时器，由data_arrived启动。
+    """
+
+    def __init__(self, name, widget, timer=None, interval=None, on_resume=None, data_driven=False, slow=None):
+        self.name = name
+        self._widget = widget
+        self.timer = timer
+        self.interval = interval
+        self.on_resume = on_resume
+        self.data_driven = data_driven
+        self.slow = slow  # 返回True时按SLOW_INTERVAL刷新
+        self.active = False
+
+    def widget(self):
+        return self._widget() if callable(self._widget) else self._widget
+
+
+class RefreshGovernor(QObject):
+    """按可见性暂停/恢复刷新定时器，按接收帧率调整接收区刷新间隔"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = {}
+        self._update_pending = False
+        self.stopped = False
+        self.rate = 0.0  # 最近统计的接收帧率（帧/秒）
+        self._rate_count = 0
+        self._rate_start = time.monotonic()
+        self.resume_count = 0  # 由不可见恢复为可见的次数
+
+    def register(self, name, widget, timer=None, interval=None, on_resume=None, data_driven=False, slow=None):
+        """登记一项刷新，同名的旧登记被替换；定时器改由调度器启停"""
+        old = self._jobs.get(name)
+        if old is not None and old.timer is not None and old.timer is not timer:
+            old.timer.stop()
+        job = RefreshJob(name, widget, timer, interval, on_resume, data_driven, slow)
+        if timer is not None:
+            timer.stop()
+            timer.setSingleShot(data_driven)
+        self._jobs[name] = job
+        target = job.widget()
+        if target is not None:
+            self.watch(target)
+        self._update_job(job)
+        return job
+
+    def watch(self, widget):
+        """监视窗口的显示、隐藏和最小化（重复安装的事件过滤器只生效一次）"""
+        window = widget.window()
+        window.installEventFilter(self)
+        handle = window.windowHandle()
+        if handle is not None:
+            handle.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() in _VISIBILITY_EVENTS:
+            if event.type() == QEvent.Show:
+                # 窗口第一次显示时才有windowHandle，接收它的Expose事件
+                handle = obj.windowHandle() if hasattr(obj, 'windowHandle') else None
+                if handle is not None:
+                    handle.installEventFilter(self)
+            self.schedule_update()
+        return False
+
+    def schedule_update(self):
+        """在事件循环中合并多次可见性变化，只重新判断一次"""
+        if not self._update_pending:
+            self._update_pending = True
+            QTimer.singleShot(0, self.update)
+
+    def update(self):
+        """重新判断各项刷新的可见性，暂停或恢复定时器"""
+        self._update_pending = False
+        for job in list(self._jobs.values()):
+            self._update_job(job)
+
+    def _update_job(self, job):
+        visible = not self.stopped and is_widget_visible(job.widget())
+        if visible == job.active:
+            return
+        job.active = visible
+        if visible:
+            self.resume_count += 1
+            if job.timer is not None and not job.data_driven:
+                job.timer.start(job.interval)
+            if job.on_resume is not None:
+                job.on_resume()
+        elif job.timer is not None:
+            job.timer.stop()
+
+    def is_active(self, name):
+        """该项刷新当前是否可见（未登记时为False）"""
+        job = self._jobs.get(name)
+        return job is not None and job.active
+
+    def flush_interval(self, job):
+        if job.slow is not None and job.slow():
+            return SLOW_INTERVAL
+        return interval_for_rate(self.rate)
+
+    def data_arrived(self, count, now=None):
+        """收到count帧：更新接收帧率，启动可见的数据驱动刷新"""
+        if now is None:
+            now = time.monotonic()
+        self._rate_count += count
+        elapsed = now - self._rate_start
+        if elapsed >= RATE_WINDOW:
+            self.rate = self._rate_count / elapsed
+            self._rate_count = 0
+            self._rate_start = now
+        for job in self._jobs.values():
+            if job.data_driven and job.active and not job.timer.isActive():
+                job.timer.start(self.flush_interval(job))
+
+    def stop(self):
+        """停止全部定时器，之后不再恢复（主窗口关闭时调用）"""
+        self.stopped = True
+        for job in self._jobs.values():
+            job.active = False
+            if job.timer is not None:
+                job.timer.stop()
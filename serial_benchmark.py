@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口读取性能测试
+通过Linux伪终端(pty)回环对比不同读取方式，无需真实硬件
+
+用法：
+    python serial_benchmark.py latency [--frames 500] [--period 10]
+    python serial_benchmark.py throughput [--frames 50000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import queue
+import threading
+import time
+import tracemalloc
+
+import serial
+
+from frame_assembler import FrameAssembler
+from serial_io import SerialReader
+
+
+# 测试帧：5A + D0~D23 + B24
+TEST_FRAME = bytes([0x5A]) + bytes(24) + bytes([0x01])
+
+
+def open_pty_pair():
+    """创建伪终端对，返回(主端fd, 从端fd, 从端串口对象)"""
+    master_fd, slave_fd = os.openpty()
+    port = serial.Serial(os.ttyname(slave_fd), baudrate=115200, timeout=1)
+    return master_fd, slave_fd, port
+
+
+def measure_latency(mode, frames, period_ms, idle_seconds):
+    """测量指定读取模式下的帧交付延迟和空闲CPU占用"""
+    master_fd, slave_fd, port = open_pty_pair()
+    received = threading.Event()
+    state = {'count': 0, 'recv_ns': 0}
+
+    def on_data(data):
+        state['count'] += len(data)
+        if state['count'] >= len(TEST_FRAME):
+            state['count'] -= len(TEST_FRAME)
+            state['recv_ns'] = time.perf_counter_ns()
+            received.set()
+
+    reader = SerialReader(port, on_data, mode=mode)
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+
+    # 空闲阶段：只有读取线程在运行，统计进程CPU时间
+    cpu_start = time.process_time()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_start) / idle_seconds * 100
+
+    latencies = []
+    next_send = time.perf_counter()
+    for _ in range(frames):
+        received.clear()
+        send_ns = time.perf_counter_ns()
+        os.write(master_fd, TEST_FRAME)
+        if received.wait(1.0):
+            latencies.append((state['recv_ns'] - send_ns) / 1e6)
+        next_send += period_ms / 1000
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    stop_start = time.perf_counter()
+    reader.stop()
+    thread.join(2)
+    stop_ms = (time.perf_counter() - stop_start) * 1000
+
+    port.close()
+    os.close(master_fd)
+    os.close(slave_fd)
+    return latencies, idle_cpu, stop_ms
+
+
+def run_latency(args):
+    print(f"pty回环延迟测试：{args.frames} 帧，帧间隔 {args.period} ms")
+    print(f"{'模式':<8}{'平均(ms)':>10}{'P50(ms)':>10}{'P99(ms)':>10}{'最大(ms)':>10}"
+          f"{'丢失':>6}{'空闲CPU%':>10}{'停止(ms)':>10}")
+    for mode in (SerialReader.MODE_POLL, SerialReader.MODE_EVENT):
+        latencies, idle_cpu, stop_ms = measure_latency(mode, args.frames, args.period, args.idle)
+        if not latencies:
+            print(f"{mode:<8}未收到数据")
+            continue
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{mode:<8}{statistics.mean(latencies):>10.3f}{statistics.median(latencies):>10.3f}"
+              f"{p99:>10.3f}{latencies[-1]:>10.3f}{args.frames - len(latencies):>6}"
+              f"{idle_cpu:>10.2f}{stop_ms:>10.1f}")
+
+
+def measure_throughput(ring_size, consumer, frames, trace_memory):
+    """以最快速度发送frames帧，统计读取端吞吐量、回调次数和内存峰值"""
+    master_fd, slave_fd, port = open_pty_pair()
+    total = frames * len(TEST_FRAME)
+    done = threading.Event()
+    state = {'bytes': 0, 'callbacks': 0}
+    gui_queue = queue.SimpleQueue()  # 模拟Qt排队连接
+    assembler = FrameAssembler()
+
+    def on_data(data):
+        state['callbacks'] += 1
+        state['bytes'] += len(data)
+        if consumer == 'frames':
+            for frame in assembler.feed(data):
+                gui_queue.put(frame)
+        elif consumer == 'emit':
+            gui_queue.put(data if isinstance(data, bytes) else bytes(data))
+        if state['bytes'] >= total:
+            done.set()
+
+    reader = SerialReader(port, on_data, ring_size=ring_size)
+    thread = threading.Thread(target=reader.run, daemon=True)
+    thread.start()
+    time.sleep(0.1)
+
+    payload = TEST_FRAME * 256
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    sent = 0
+    while sent < total:
+        chunk = payload[:min(len(payload), total - sent)]
+        sent += os.write(master_fd, chunk)
+        while not gui_queue.empty():
+            gui_queue.get_nowait()
+    done.wait(10)
+    elapsed = time.perf_counter() - start
+    peak = 0
+    if trace_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    reader.stop()
+    thread.join(2)
+    port.close()
+    os.close(master_fd)
+    os.close(slave_fd)
+    return state['bytes'] / elapsed / 1e6, state['callbacks'], peak / 1024
+
+
+def run_throughput(args):
+    print(f"pty回环吞吐测试：{args.frames} 帧 x {len(TEST_FRAME)} 字节")
+    print("消费者：count=只计数（读取路径本身） emit=复制后排队发往GUI frames=组帧后排队")
+    print(f"{'读取方式':<10}{'消费者':<8}{'吞吐(MB/s)':>12}{'回调次数':>10}{'内存峰值(KB)':>14}")
+    variants = (('bytes', 0), ('ring', 65536))
+    for consumer in ('count', 'emit', 'frames'):
+        for name, ring_size in variants:
+            rate, callbacks, _ = measure_throughput(ring_size, consumer, args.frames, False)
+            _, _, peak = measure_throughput(ring_size, consumer, args.frames // 10, True)
+            print(f"{name:<10}{consumer:<8}{rate:>12.2f}{callbacks:>10}{peak:>14.1f}")
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        print("该测试依赖Linux伪终端，请在Linux下运行")
+        return
+
+    parser = argparse.ArgumentParser(description='串口读取性能测试')
+    sub = parser.add_subparsers(dest='command')
+
+    latency = sub.add_parser('latency', help='对比poll与event模式的交付延迟')
+    latency.add_argument('--frames', type=int, default=500, help='发送帧数')
+    latency.add_argument('--period', type=float, default=10, help='帧间隔(ms)')
+    latency.add_argument('--idle', type=float, default=2, help='空闲CPU统计时长(s)')
+    latency.set_defaults(func=run_latency)
+
+    throughput = sub.add_parser('throughput', help='对比每次read新建bytes与环形缓冲区的吞吐和内存')
+    throughput.add_argument('--frames', type=int, default=50000, help='发送帧数')
+    throughput.set_defaults(func=run_throughput)
+
+    args = parser.parse_args()
+    if not hasattr(args, 'func'):
+        parser.print_help()
+        return
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
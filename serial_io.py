@@ -0,0 +1,271 @@
+"""
+串口收发核心
+不依赖Qt，供SerialThread、SerialWriterThread及基准测试脚本复用
+"""
+
+import itertools
+import os
+import queue
+import select
+import threading
+import time
+
+from capture import DIRECTION_TX
+
+
+class SerialReader:
+    """串口读取循环
+
+    读取模式：
+    - poll:  轮询in_waiting后休眠（原有方式）
+    - event: 在端口文件描述符上select等待，数据到达立即读取；
+             没有文件描述符的平台（Windows）退化为带超时的阻塞read
+
+    event模式默认把数据直接读入预分配的环形缓冲区，一次突发中连续到达的
+    数据合并为一段，以memoryview交给on_data。该视图只在回调期间有效，
+    需要保留数据的消费者必须自行复制。ring_size为0时退回每次read新建bytes。
+    """
+    MODE_POLL = 'poll'
+    MODE_EVENT = 'event'
+
+    def __init__(self, serial_port, on_data, mode=MODE_EVENT, poll_interval=0.005, wait_timeout=0.2,
+                 ring_size=65536, on_idle=None):
+        self.serial_port = serial_port
+        self.on_data = on_data  # 在读取线程中回调，参数为bytes或memoryview
+        self.on_idle = on_idle  # 线路空闲（等待超时或即将阻塞等待）时回调
+        self.mode = mode
+        self.poll_interval = poll_interval  # poll模式的休眠间隔（秒）
+        self.wait_timeout = wait_timeout  # event模式单次等待的超时（秒）
+        self.ring = bytearray(ring_size)
+        self._ring_view = memoryview(self.ring)
+        self._write_pos = 0
+        self.running = False
+        self._wake_lock = threading.Lock()
+        self._wake_fds = None  # 用于唤醒select的管道
+
+    def run(self):
+        """读取循环，直到stop()被调用或端口关闭"""
+        self.running = True
+        try:
+            if self.mode == self.MODE_POLL:
+                self._run_poll()
+            else:
+                fd = self._port_fileno()
+                if fd is not None and hasattr(os, 'pipe'):
+                    self._run_select(fd)
+                else:
+                    self._run_blocking()
+        except Exception as e:
+            print(f"读取数据错误: {str(e)}")
+        finally:
+            self.running = False
+
+    def stop(self):
+        """请求退出读取循环，阻塞在select/read中的线程会被立即唤醒"""
+        self.running = False
+        with self._wake_lock:
+            if self._wake_fds is not None:
+                try:
+                    os.write(self._wake_fds[1], b'\x00')
+                except OSError:
+                    pass
+        cancel_read = getattr(self.serial_port, 'cancel_read', None)
+        if cancel_read is not None:
+            try:
+                cancel_read()
+            except Exception:
+                pass
+
+    def _port_fileno(self):
+        """获取端口的文件描述符，不支持时返回None"""
+        try:
+            return self.serial_port.fileno()
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    def _run_poll(self):
+        while self.running and self.serial_port.is_open:
+            if self.serial_port.in_waiting:
+                data = self.serial_port.read(self.serial_port.in_waiting)
+                self.on_data(data)
+            elif self.on_idle is not None:
+                self.on_idle()
+            time.sleep(self.poll_interval)  # 平衡响应速度和CPU占用，适合10ms数据间隔
+
+    def _run_select(self, fd):
+        wake_r, wake_w = os.pipe()
+        with self._wake_lock:
+            self._wake_fds = (wake_r, wake_w)
+        try:
+            while self.running and self.serial_port.is_open:
+                readable, _, _ = select.select([fd, wake_r], [], [], self.wait_timeout)
+                if wake_r in readable:
+                    break
+                if not readable and self.on_idle is not None:
+                    self.on_idle()
+                if fd in readable:
+                    if self.ring:
+                        data = self._read_burst(fd)
+                    else:
+                        # 至少读取1个字节，端口挂断时由pyserial抛出异常结束循环
+                        data = self.serial_port.read(self.serial_port.in_waiting or 1)
+                    if data:
+                        self.on_data(data)
+        finally:
+            with self._wake_lock:
+                self._wake_fds = None
+                os.close(wake_r)
+                os.close(wake_w)
+
+    def _reserve(self, count):
+        """在环形缓冲区中为count字节预留连续空间，返回起始偏移"""
+        count = min(count, len(self.ring))
+        if self._write_pos + count > len(self.ring):
+            self._write_pos = 0
+        return self._write_pos
+
+    def _read_burst(self, fd):
+        """把当前可读的数据连续读入环形缓冲区，返回这段数据的视图"""
+        ring = self._ring_view
+        size = len(ring)
+        start = end = self._reserve(self.serial_port.in_waiting or 1)
+        waiting = max(1, self.serial_port.in_waiting)
+        while end < size:
+            try:
+                count = os.readv(fd, [ring[end:min(size, end + waiting)]])
+            except BlockingIOError:
+                break
+            if count == 0:
+                raise OSError("设备报告可读但没有返回数据（设备断开或端口被占用）")
+            end += count
+            waiting = self.serial_port.in_waiting
+            if not waiting:
+                break
+        self._write_pos = end
+        return ring[start:end]
+
+    def _run_blocking(self):
+        use_ring = bool(self.ring)
+        while self.running and self.serial_port.is_open:
+            if self.on_idle is not None and not self.serial_port.in_waiting:
+                self.on_idle()
+            # 阻塞直到收到首字节或端口超时，stop()通过cancel_read()唤醒
+            if use_ring:
+                ring = self._ring_view
+                start = self._reserve(1)
+                if not self.serial_port.readinto(ring[start:start + 1]):
+                    continue
+                waiting = min(self.serial_port.in_waiting, len(ring) - start - 1)
+                end = start + 1
+                if waiting:
+                    end += self.serial_port.readinto(ring[end:end + waiting])
+                self._write_pos = end
+                data = ring[start:end]
+            else:
+                data = self.serial_port.read(1)
+                if not data:
+                    continue
+                waiting = self.serial_port.in_waiting
+                if waiting:
+                    data += self.serial_port.read(waiting)
+            if self.running:
+                self.on_data(data)
+
+
+class _RequestQueue(queue.PriorityQueue):
+    """发送请求队列：合并写入时只在队首请求可以合并时才将其取出，不需要取出后再放回"""
+
+    def get_if(self, accept):
+        """队首请求满足accept时取出并返回，否则（包括队列为空）返回None，不阻塞"""
+        with self.not_empty:
+            if not self._qsize() or not accept(self.queue[0]):
+                return None
+            item = self._get()
+            self.not_full.notify()
+            return item
+
+
+class SerialWriter:
+    """串口发送循环
+
+    所有发送请求先进入有界优先级队列，由独立线程写入串口，调用方不会被
+    流控或低波特率阻塞。优先级数值越小越先发送；同一优先级中连续排队的
+    小数据包合并为一次write。发送完成的字节数通过on_written异步回报。
+    """
+    PRIORITY_OUTPUT = 0  # 自锁/映射输出更新
+    PRIORITY_NORMAL = 1  # 手动发送
+    PRIORITY_BULK = 2  # 定时发送、多命令等批量发送
+
+    def __init__(self, serial_port, on_written=None, on_error=None, max_queue=256, coalesce_bytes=256):
+        self.serial_port = serial_port
+        self.on_written = on_written  # 在发送线程中回调，参数为实际写入的字节数
+        self.on_error = on_error  # 在发送线程中回调，参数为异常对象
+        self.max_queue = max_queue  # 队列中最多等待的发送请求数
+        self.coalesce_bytes = coalesce_bytes  # 合并写入的上限，超过此长度的数据单独发送
+        self._queue = _RequestQueue(maxsize=max_queue)
+        self._seq = itertools.count()
+        self.dropped_count = 0  # 因队列已满被丢弃的请求数
+        self.recorder = None  # 设置后每次写入的原始数据同时交给录制器（capture.CaptureRecorder）
+        self.running = False
+
+    def submit(self, data, priority=PRIORITY_NORMAL):
+        """提交发送请求，队列已满时返回False"""
+        try:
+            self._queue.put_nowait((priority, next(self._seq), bytes(data)))
+        except queue.Full:
+            self.dropped_count += 1
+            return False
+        return True
+
+    @property
+    def queue_depth(self):
+        """等待发送的请求数"""
+        return self._queue.qsize()
+
+    def run(self):
+        """发送循环，直到stop()被调用"""
+        self.running = True
+        while self.running:
+            priority, _, data = self._queue.get()
+            if data is None:
+                break
+            parts = [data]
+            total = len(data)
+            # 合并同优先级中紧随其后的小数据包
+            while total < self.coalesce_bytes:
+                item = self._queue.get_if(lambda item: item[2] is not None and item[0] == priority
+                                          and total + len(item[2]) <= self.coalesce_bytes)
+                if item is None:
+                    break
+                parts.append(item[2])
+                total += len(item[2])
+            payload = parts[0] if len(parts) == 1 else b''.join(parts)
+            try:
+                written = self.serial_port.write(payload)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(e)
+                if not self.serial_port.is_open:
+                    break
+                continue
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.record(DIRECTION_TX, payload)
+            if self.on_written is not None:
+                self.on_written(total if written is None else written)
+        self.running = False
+
+    def stop(self):
+        """请求退出发送循环，尚未发送的请求被丢弃"""
+        self.running = False
+        stop_item = (-1, next(self._seq), None)
+        while True:
+            try:
+                self._queue.put_nowait(stop_item)
+                return
+            except queue.Full:
+                # 队列已满时先丢弃一个请求为停止标记腾出位置（这些请求本来也不会再发送）
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
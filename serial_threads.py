@@ -0,0 +1,132 @@
+"""
+串口读写线程
+把serial_io中的读取/发送循环包装为QThread，结果通过Qt信号交给界面
+"""
+
+import threading
+import time
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from capture import DIRECTION_RX, CaptureReplayer
+from serial_io import SerialReader, SerialWriter
+
+
+class SerialThread(QThread):
+    """串口读取线程
+
+    读取到的数据（帧模式下为完整帧）在读取线程中按时间窗口或条数累积，
+    整批通过batch_received发送，列表元素为(接收时间戳, 数据)。
+    GUI处理完一批后调用batch_done()，pending_batches即为尚未处理的批次数。
+    """
+    batch_received = pyqtSignal(list)
+
+    def __init__(self, serial_port, read_mode=SerialReader.MODE_EVENT, frame_assembler=None,
+                 batch_interval=0.01, batch_max_items=100):
+        super().__init__()
+        self.serial_port = serial_port
+        # 设置帧组装器后只向下游发送完整帧，否则发送原始数据块
+        self.frame_assembler = frame_assembler
+        self.batch_interval = batch_interval  # 批量窗口（秒），0表示每次读取后立即发送
+        self.batch_max_items = batch_max_items  # 单批最多条数，达到后立即发送
+        self._batch = []
+        self._batch_deadline = None
+        self._pending_lock = threading.Lock()
+        self.pending_batches = 0
+        self.max_pending_batches = 0
+        self.recorder = None  # 设置后读到的原始数据同时交给录制器（capture.CaptureRecorder）
+        # 默认事件驱动读取：数据到达即交付，空闲时不轮询
+        self.reader = SerialReader(serial_port, self.handle_data, mode=read_mode, on_idle=self.flush_batch)
+        self._idle_timeout = self.reader.wait_timeout
+
+    @property
+    def running(self):
+        return self.reader.running
+
+    def run(self):
+        self.reader.run()
+        self.flush_batch()
+
+    def stop(self):
+        self.reader.stop()
+        self.wait()
+
+    def handle_data(self, data):
+        """在读取线程中处理原始数据块（data可能是环形缓冲区的视图，只在本次调用内有效）"""
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record(DIRECTION_RX, data)
+        assembler = self.frame_assembler
+        items = [bytes(data)] if assembler is None else assembler.feed(data)
+        if not items:
+            return
+        timestamp = time.time()
+        self._batch.extend((timestamp, item) for item in items)
+
+        if self.batch_interval <= 0 or len(self._batch) >= self.batch_max_items:
+            self.flush_batch()
+            return
+        now = time.monotonic()
+        if self._batch_deadline is None:
+            self._batch_deadline = now + self.batch_interval
+        remaining = self._batch_deadline - now
+        if remaining <= 0:
+            self.flush_batch()
+        else:
+            # 有待发送的批次时缩短等待时间，保证窗口到期即发送
+            self.reader.wait_timeout = remaining
+
+    def flush_batch(self):
+        """发送当前累积的批次"""
+        if not self._batch:
+            return
+        batch = self._batch
+        self._batch = []
+        self._batch_deadline = None
+        self.reader.wait_timeout = self._idle_timeout
+        with self._pending_lock:
+            self.pending_batches += 1
+            if self.pending_batches > self.max_pending_batches:
+                self.max_pending_batches = self.pending_batches
+        self.batch_received.emit(batch)
+
+    def batch_done(self):
+        """GUI处理完一批数据后调用"""
+        with self._pending_lock:
+            if self.pending_batches > 0:
+                self.pending_batches -= 1
+
+
+class ReplayThread(SerialThread):
+    """回放线程：把录制文件中的接收数据送入与SerialThread相同的组帧和批量流程"""
+
+    def __init__(self, path, realtime=True, speed=1.0, frame_assembler=None,
+                 batch_interval=0.01, batch_max_items=100):
+        super().__init__(None, frame_assembler=frame_assembler,
+                         batch_interval=batch_interval, batch_max_items=batch_max_items)
+        self.reader = CaptureReplayer(path, self.handle_data, realtime=realtime, speed=speed,
+                                      on_idle=self.flush_batch)
+        self._idle_timeout = self.reader.wait_timeout
+
+
+class SerialWriterThread(QThread):
+    """串口发送线程，发送结果通过信号异步回报给界面"""
+    bytes_written = pyqtSignal(int)
+    write_error = pyqtSignal(str)
+
+    def __init__(self, serial_port):
+        super().__init__()
+        self.serial_port = serial_port
+        self.writer = SerialWriter(serial_port, on_written=self.bytes_written.emit,
+                                   on_error=lambda e: self.write_error.emit(str(e)))
+
+    def submit(self, data, priority=SerialWriter.PRIORITY_NORMAL):
+        """提交发送请求，队列已满时返回False"""
+        return self.writer.submit(data, priority)
+
+    def run(self):
+        self.writer.run()
+
+    def stop(self):
+        self.writer.stop()
+        self.wait()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio串口传输测试（需要pty，仅Linux/macOS）
+桥接在pty上转换并写回输入帧；关闭串口时等待可写的write()结束；打开失败时已打开的串口被关闭；
+一个串口的OSError只结束该串口的桥接
+"""
+
+import asyncio
+import os
+import select
+import tty
+
+import pytest
+import serial
+
+if not hasattr(os, 'openpty'):
+    pytest.skip("需要pty", allow_module_level=True)
+
+from async_serial import AsyncSerialPort, bridge_port, run_bridge
+from frame_assembler import FrameAssembler
+from mapping_engine import DEFAULT_OUTPUT_FRAME, MappingEngine
+
+
+def open_pty():
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    tty.setraw(master_fd)
+    return master_fd, slave_fd, os.ttyname(slave_fd)
+
+
+def read_exactly(fd, size, timeout=2.0):
+    """从pty主端读取size字节"""
+    data = b''
+    while len(data) < size:
+        readable, _, _ = select.select([fd], [], [], timeout)
+        assert readable, f"只收到 {len(data)}/{size} 字节"
+        data += os.read(fd, size - len(data))
+    return data
+
+
+def test_bridge_round_trip():
+    """输入帧经映射转换后写回同一串口"""
+    master_fd, slave_fd, name = open_pty()
+
+    async def scenario():
+        engine = MappingEngine()
+        port = AsyncSerialPort(name, frame_assembler=FrameAssembler.for_layout(engine.layout))
+        await port.open()
+        task = asyncio.ensure_future(bridge_port(port, engine))
+        frame = bytes([0x5A]) + bytes(24) + b'\x01'
+        os.write(master_fd, b'\x00' + frame[:10])
+        await asyncio.sleep(0.02)
+        os.write(master_fd, frame[10:] + frame)
+        loop = asyncio.get_running_loop()
+        output = await loop.run_in_executor(None, read_exactly, master_fd, 2 * len(DEFAULT_OUTPUT_FRAME))
+        assert output == DEFAULT_OUTPUT_FRAME * 2
+        port.close()
+        await asyncio.wait_for(task, 1)
+        assert port.rx_count == 1 + 2 * len(frame) and port.tx_count == len(output)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+def test_close_wakes_pending_write():
+    """对端不读取、write()等待可写时关闭串口，write()以ConnectionError结束并注销可写监听"""
+    master_fd, slave_fd, name = open_pty()
+
+    async def scenario():
+        port = AsyncSerialPort(name)
+        await port.open()
+        fd = port._fd
+        write = asyncio.ensure_future(port.write(bytes(4 << 20)))  # 远大于pty缓冲区
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if port._writer_future is not None:
+                break
+        assert port._writer_future is not None, "写入应在等待可写"
+        port.close()
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(write, 1)
+        assert not asyncio.get_running_loop().remove_writer(fd)  # 已经注销
+        assert port._writer_future is None
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+def test_open_failure_closes_opened_ports(monkeypatch):
+    """第二个串口打开失败时，已打开的串口被关闭"""
+    master_fd, slave_fd, name = open_pty()
+    opened = []
+    original_open = AsyncSerialPort.open
+
+    async def tracking_open(self):
+        await original_open(self)
+        opened.append(self)
+
+    monkeypatch.setattr(AsyncSerialPort, 'open', tracking_open)
+    try:
+        with pytest.raises(serial.SerialException):
+            asyncio.run(run_bridge([name, '/dev/nonexistent-port'], 115200, None))
+        assert len(opened) == 1 and not opened[0].is_open and not opened[0].ser.is_open
+    finally:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+def test_os_error_ends_one_bridge(monkeypatch):
+    """一个串口写入时出现OSError（如拔出设备时的EIO）只结束该串口的桥接"""
+    ports = [open_pty() for _ in range(2)]
+    failing = ports[0][2]
+    original_write = AsyncSerialPort.write
+
+    async def write(self, data):
+        if self.port == failing:
+            raise OSError(5, "Input/output error")
+        await original_write(self, data)
+
+    monkeypatch.setattr(AsyncSerialPort, 'write', write)
+    frame = bytes([0x5A]) + bytes(24) + b'\x01'
+
+    async def scenario():
+        bridge = asyncio.ensure_future(run_bridge([name for _, _, name in ports], 115200, None))
+        await asyncio.sleep(0.1)
+        for master_fd, _, _ in ports:
+            os.write(master_fd, frame)
+        loop = asyncio.get_running_loop()
+        output = await loop.run_in_executor(None, read_exactly, ports[1][0], len(DEFAULT_OUTPUT_FRAME))
+        assert output == DEFAULT_OUTPUT_FRAME
+        os.write(ports[1][0], frame)  # 另一个串口的桥接仍在运行
+        output = await loop.run_in_executor(None, read_exactly, ports[1][0], len(DEFAULT_OUTPUT_FRAME))
+        assert output == DEFAULT_OUTPUT_FRAME
+        assert not bridge.done()
+        bridge.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await bridge
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        for master_fd, slave_fd, _ in ports:
+            os.close(master_fd)
+            os.close(slave_fd)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
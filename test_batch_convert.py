@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转换等价性测试
+convert_batch()的每一行必须与逐帧MappingEngine.convert()的输出相同，整批处理后的自锁状态也相同；
+覆盖自锁、扇出/扇入、MSB/LSB位序和CRC帧尾
+"""
+
+import copy
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import batch_convert
+from batch_convert import convert_batch
+from crc16 import BYTEORDER_BIG
+from frame_layout import BIT_ORDER_LSB, CRC_NONE, DEFAULT_LAYOUT, FrameLayout
+from mapping_engine import MappingEngine
+
+LAYOUTS = (DEFAULT_LAYOUT,
+           FrameLayout(24, bit_order=BIT_ORDER_LSB),
+           FrameLayout(7, crc_byteorder=BYTEORDER_BIG),
+           FrameLayout(16, input_header=0x3C, output_header=0xC3, input_trailer=b'',
+                       output_trailer=b'\x01\x02', crc=CRC_NONE, bit_order=BIT_ORDER_LSB))
+
+
+def random_engine(rnd, layout, enable_ratio, latch_ratio, fanout_ratio):
+    """随机映射配置：输出位可能重复（扇入），部分输入带附加输出位（扇出）"""
+    bit_count = layout.bit_count
+    engine = MappingEngine(layout)
+    for i in range(bit_count):
+        key = str(i)
+        engine.enabled[key] = rnd.random() < enable_ratio
+        engine.mapping[key] = rnd.randrange(bit_count)
+        engine.latch[key] = rnd.random() < latch_ratio
+        if rnd.random() < fanout_ratio:
+            engine.fanout[key] = [rnd.randrange(bit_count) for _ in range(rnd.randrange(1, 4))]
+    engine.invalidate()
+    engine.prev_bits = rnd.getrandbits(bit_count)
+    engine.latch_bits = rnd.getrandbits(bit_count)
+    return engine
+
+
+def random_frames(rnd, layout, count):
+    """随机输入帧，部分帧重复上一帧以产生没有上升沿的输入"""
+    frames = []
+    for _ in range(count):
+        if frames and rnd.random() < 0.3:
+            frames.append(frames[-1])
+        else:
+            frames.append(layout.build_input_frame(rnd.randbytes(layout.data_length)))
+    return frames
+
+
+def assert_equivalent(engine, frames):
+    reference = copy.deepcopy(engine)
+    expected = [bytes(reference.convert(frame)) for frame in frames]
+    result = convert_batch(engine, np.frombuffer(b''.join(frames), dtype=np.uint8).reshape(len(frames), -1))
+    assert [bytes(row) for row in result] == expected
+    assert engine.latch_bits == reference.latch_bits
+    assert engine.prev_bits == reference.prev_bits
+
+
+def test_random_configs():
+    """随机映射、自锁和扇出配置在各种帧格式下与逐帧转换相同"""
+    rnd = random.Random(13)
+    for layout in LAYOUTS:
+        for enable_ratio, latch_ratio, fanout_ratio in ((0, 0, 0), (0.3, 0, 0), (0.3, 0.3, 0.2), (1, 0.5, 0.3)):
+            for _ in range(5):
+                engine = random_engine(rnd, layout, enable_ratio, latch_ratio, fanout_ratio)
+                assert_equivalent(engine, random_frames(rnd, layout, 60))
+
+
+def test_chunks(monkeypatch):
+    """分块处理时自锁状态跨块延续"""
+    monkeypatch.setattr(batch_convert, 'CHUNK_FRAMES', 7)
+    rnd = random.Random(31)
+    for layout in LAYOUTS[:2]:
+        engine = random_engine(rnd, layout, 0.5, 0.5, 0.2)
+        assert_equivalent(engine, random_frames(rnd, layout, 50))
+
+
+def test_consecutive_batches():
+    """连续多批转换与逐帧转换整个序列相同"""
+    rnd = random.Random(47)
+    engine = random_engine(rnd, DEFAULT_LAYOUT, 0.5, 0.5, 0.1)
+    for _ in range(4):
+        assert_equivalent(engine, random_frames(rnd, DEFAULT_LAYOUT, rnd.randrange(1, 30)))
+
+
+def test_rules_rejected():
+    engine = MappingEngine()
+    engine.set_rules(['O0 = I1 & I2'])
+    with pytest.raises(ValueError):
+        convert_batch(engine, np.zeros((1, DEFAULT_LAYOUT.input_frame_length), dtype=np.uint8))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制与回放测试
+录制文件写入后读回的时间戳、方向和数据不变，录制中断留下的不完整记录被忽略，回放只交付接收记录
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from capture import (CAPTURE_MAGIC, DIRECTION_RX, DIRECTION_TX, RECORD_HEADER, CaptureRecorder, CaptureReplayer,
+                     read_capture, run_bench)
+from frame_layout import FrameLayout
+from mapping_engine import MappingEngine
+
+
+def write_records(path, records):
+    recorder = CaptureRecorder(path)
+    for direction, data in records:
+        recorder.record(direction, data)
+    recorder.close()
+    recorder.record(DIRECTION_RX, b'ignored')  # 关闭后不再写入
+    return recorder
+
+
+def random_records(rnd, count):
+    return [(rnd.choice((DIRECTION_RX, DIRECTION_TX)), rnd.randbytes(rnd.randrange(0, 60))) for _ in range(count)]
+
+
+def test_round_trip():
+    rnd = random.Random(9)
+    records = random_records(rnd, 200)
+    records.append((DIRECTION_RX, memoryview(b'\x5A\x01\x02')))  # 读取线程交付的是memoryview
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.cap')
+        before = time.monotonic_ns()
+        recorder = write_records(path, records)
+        after = time.monotonic_ns()
+        assert recorder.record_count == len(records)
+        assert recorder.byte_count == sum(len(data) for _, data in records)
+
+        result = list(read_capture(path))
+        assert [(direction, data) for _, direction, data in result] == [(d, bytes(data)) for d, data in records]
+        timestamps = [timestamp for timestamp, _, _ in result]
+        assert timestamps == sorted(timestamps) and before <= timestamps[0] and timestamps[-1] <= after
+
+
+def test_truncated_file():
+    """文件在记录头或数据中间截断时，读到最后一条完整记录为止"""
+    records = [(DIRECTION_RX, b'abc'), (DIRECTION_TX, b'0123456789'), (DIRECTION_RX, b'xyz')]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.cap')
+        write_records(path, records)
+        with open(path, 'rb') as f:
+            content = f.read()
+        third = len(CAPTURE_MAGIC) + 2 * RECORD_HEADER.size + 3 + 10  # 第三条记录的起始位置
+        for size, expected in ((len(content) - 1, 2), (third + RECORD_HEADER.size - 2, 2),
+                               (third, 2), (third - 4, 1), (len(CAPTURE_MAGIC), 0)):
+            with open(path, 'wb') as f:
+                f.write(content[:size])
+            assert [(d, data) for _, d, data in read_capture(path)] == records[:expected], size
+
+        with open(path, 'wb') as f:
+            f.write(b'not a capture file')
+        try:
+            list(read_capture(path))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("非录制文件应报错")
+
+
+def test_replay():
+    """尽快回放时按顺序交付全部接收记录，跳过发送记录"""
+    records = random_records(random.Random(10), 100)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.cap')
+        write_records(path, records)
+        received = []
+        replayer = CaptureReplayer(path, received.append, realtime=False)
+        replayer.run()
+        expected = [data for direction, data in records if direction == DIRECTION_RX]
+        assert received == expected
+        assert replayer.record_count == len(expected) and not replayer.running
+
+
+def test_bench_layout():
+    """bench按映射配置中的帧格式组帧，64字节帧不会被当作默认24字节帧"""
+    layout = FrameLayout(64)
+    frame = layout.build_input_frame(bytes(range(64)))
+    data = frame * 5
+    records = [(DIRECTION_RX, data[i:i + 37]) for i in range(0, len(data), 37)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'test.cap')
+        write_records(path, records)
+        config_path = os.path.join(directory, 'mapping.json')
+        with open(config_path, 'w') as f:
+            json.dump(MappingEngine(layout=layout).to_config(), f)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            run_bench(argparse.Namespace(file=path, config=config_path, repeat=2))
+    assert f"共 {len(data) * 2} 字节，10 帧" in output.getvalue()
+    assert "重同步: 0  丢弃字节: 0" in output.getvalue()
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_truncated_file()
+    test_replay()
+    test_bench_layout()
+    print("录制与回放测试通过")
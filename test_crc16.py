@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CRC16/Modbus交叉校验测试
+各种实现与逐位参考实现结果相同，两种字节顺序与原有发送路径追加的字节一致
+"""
+
+import random
+
+from crc16 import (BYTEORDER_BIG, BYTEORDER_LITTLE, Crc16, crc16_bitwise, crc16_bytes, crc16_bytewise,
+                   crc16_modbus, crc16_sliced, crc16_swapped)
+from mapping_engine import build_output_frame
+
+
+def legacy_swapped_crc16(data):
+    """原AdvancedSerialTool.crc16：逐位计算，返回交换字节序后的值"""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return ((crc & 0xFF) << 8) | ((crc >> 8) & 0xFF)
+
+
+def test_check_value():
+    """CRC-16/MODBUS标准校验值"""
+    assert crc16_modbus(b'123456789') == 0x4B37
+    assert crc16_bytes(b'123456789') == bytes([0x37, 0x4B])
+    assert crc16_modbus(b'') == 0xFFFF
+
+
+def test_variants_match_bitwise():
+    """按字节查表、16位字查表与逐位计算结果相同，包括奇数长度和续算"""
+    rnd = random.Random(15)
+    for length in list(range(40)) + [255, 256, 257, 4096, 4097]:
+        data = rnd.randbytes(length)
+        initial = rnd.randrange(0x10000)
+        expected = crc16_bitwise(data)
+        assert crc16_bytewise(data) == expected
+        assert crc16_sliced(data) == expected
+        assert crc16_modbus(data) == expected
+        assert crc16_sliced(data, initial) == crc16_bitwise(data, initial)
+        assert crc16_modbus(bytearray(data)) == expected
+        assert crc16_modbus(memoryview(data)) == expected
+
+
+def test_incremental():
+    """任意分段update()与一次计算相同"""
+    rnd = random.Random(16)
+    for _ in range(200):
+        data = rnd.randbytes(rnd.randrange(300))
+        crc = Crc16()
+        pos = 0
+        while pos < len(data):
+            step = rnd.randrange(1, 40)
+            crc.update(data[pos:pos + step])
+            pos += step
+        assert crc.value == crc16_modbus(data)
+        assert crc.digest() == crc16_bytes(data)
+        assert crc.copy().update(b'x').value == crc16_modbus(data + b'x')
+    assert Crc16(b'123456789').digest(BYTEORDER_BIG) == bytes([0x4B, 0x37])
+
+
+def test_byte_orders_match_send_paths():
+    """原有发送路径按交换后的值追加字节，与两种字节顺序对应"""
+    rnd = random.Random(17)
+    for _ in range(200):
+        data = rnd.randbytes(rnd.randrange(1, 64))
+        legacy = legacy_swapped_crc16(data)
+        assert crc16_swapped(data) == legacy
+        assert crc16_bytes(data, BYTEORDER_LITTLE) == legacy.to_bytes(2, byteorder='big')
+        assert crc16_bytes(data, BYTEORDER_BIG) == legacy.to_bytes(2, byteorder='little')
+
+
+def test_output_frame_crc():
+    """A5输出帧末尾为低字节在前的CRC"""
+    rnd = random.Random(18)
+    for _ in range(50):
+        frame = build_output_frame(rnd.randbytes(24))
+        legacy = legacy_swapped_crc16(frame[:-2])
+        assert frame[-2:] == bytes([legacy >> 8, legacy & 0xFF])
+
+
+if __name__ == "__main__":
+    test_check_value()
+    test_variants_match_bitwise()
+    test_incremental()
+    test_byte_orders_match_send_paths()
+    test_output_frame_crc()
+    print("CRC16测试通过")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+显示缓冲测试
+各溢出策略下缓冲区不超过上限，未显示的条目全部计入dropped_count，take()/clear()之后重新开始
+"""
+
+from display_buffer import DisplayBuffer
+
+
+def make_entries(count, start=0):
+    """(数据, 时间戳, 记录序号)，与主窗口加入的条目相同"""
+    return [(bytes([i & 0xFF]) * 3, 100.0 + i, i) for i in range(start, start + count)]
+
+
+def seqs(entries):
+    return [entry[2] for entry in entries]
+
+
+def test_within_capacity():
+    for policy in DisplayBuffer.POLICIES:
+        buffer = DisplayBuffer(capacity=10, policy=policy)
+        buffer.add(make_entries(10))
+        entries, summary = buffer.take()
+        assert entries == make_entries(10) and summary is None and buffer.dropped_count == 0
+        assert len(buffer) == 0
+
+
+def test_drop_oldest():
+    buffer = DisplayBuffer(capacity=10)
+    buffer.add(make_entries(25))
+    assert len(buffer) == 10 and buffer.dropped_count == 15
+    entries, summary = buffer.take()
+    assert seqs(entries) == list(range(15, 25)) and summary is None
+
+
+def test_drop_newest():
+    buffer = DisplayBuffer(capacity=10, policy=DisplayBuffer.POLICY_DROP_NEWEST)
+    buffer.add(make_entries(6))
+    buffer.add(make_entries(19, 6))
+    assert len(buffer) == 10 and buffer.dropped_count == 15
+    entries, summary = buffer.take()
+    assert seqs(entries) == list(range(10)) and summary is None
+    buffer.add(make_entries(3, 25))  # take()之后重新接收
+    assert seqs(buffer.take()[0]) == [25, 26, 27]
+
+
+def test_sample():
+    """缓冲满时隔一条丢一条，之后按加倍的间隔抽取，保留的条目均匀分布"""
+    buffer = DisplayBuffer(capacity=4, policy=DisplayBuffer.POLICY_SAMPLE)
+    buffer.add(make_entries(9))
+    assert len(buffer) == 3 and buffer.dropped_count == 6
+    assert seqs(buffer.take()[0]) == [0, 4, 8]
+
+    buffer = DisplayBuffer(capacity=100, policy=DisplayBuffer.POLICY_SAMPLE)
+    buffer.add(make_entries(10000))
+    entries, summary = buffer.take()
+    assert len(entries) <= 100 and len(entries) + buffer.dropped_count == 10000 and summary is None
+    steps = {b - a for a, b in zip(seqs(entries), seqs(entries)[1:])}
+    assert len(steps) == 1 and seqs(entries)[0] == 0
+
+    # take()后抽样间隔恢复为1
+    buffer.add(make_entries(5, 10000))
+    assert seqs(buffer.take()[0]) == list(range(10000, 10005))
+
+
+def test_summarize():
+    """缓冲满后的条目只累计条数、字节数和首末时间戳"""
+    buffer = DisplayBuffer(capacity=10, policy=DisplayBuffer.POLICY_SUMMARIZE)
+    buffer.add(make_entries(25))
+    assert len(buffer) == 10 and buffer.dropped_count == 15
+    entries, summary = buffer.take()
+    assert seqs(entries) == list(range(10))
+    assert summary == (15, 45, 110.0, 124.0)
+    buffer.add(make_entries(2, 25))
+    assert buffer.take() == (make_entries(2, 25), None)
+
+
+def test_clear_and_stats():
+    """clear()丢弃待显示的条目和摘要，不清零统计；reset_stats()只清零统计"""
+    buffer = DisplayBuffer(capacity=5, policy=DisplayBuffer.POLICY_SUMMARIZE)
+    buffer.add(make_entries(8))
+    buffer.clear()
+    assert len(buffer) == 0 and buffer.take() == ([], None)
+    assert buffer.dropped_count == 3
+    buffer.reset_stats()
+    assert buffer.dropped_count == 0
+
+    buffer.policy = DisplayBuffer.POLICY_DROP_OLDEST
+    buffer.capacity = 1  # 上限至少为2
+    buffer.add(make_entries(3))
+    assert seqs(buffer.take()[0]) == [1, 2] and buffer.dropped_count == 1
+
+
+if __name__ == "__main__":
+    test_within_capacity()
+    test_drop_oldest()
+    test_drop_newest()
+    test_sample()
+    test_summarize()
+    test_clear_and_stats()
+    print("显示缓冲测试通过")
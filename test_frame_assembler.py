@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+帧组装测试
+任意切分的数据块重组为以0x5A开头的定长帧，帧头前的杂散字节被丢弃并计入统计
+"""
+
+import random
+
+from frame_assembler import INPUT_FRAME_HEADER, INPUT_FRAME_LENGTH, FrameAssembler
+from frame_layout import FrameLayout
+
+
+def make_frame(i):
+    return bytes([INPUT_FRAME_HEADER, i & 0xFF]) + bytes(INPUT_FRAME_LENGTH - 3) + b'\x01'
+
+
+def test_resync_after_garbage():
+    """帧头之前的杂散字节被跳过，同一次失步只计一次"""
+    assembler = FrameAssembler()
+    assert assembler.feed(b'\x00\x11\x22' + make_frame(1)) == [make_frame(1)]
+    assert (assembler.resync_count, assembler.garbage_bytes) == (1, 3)
+    assert assembler.feed(b'\xFF' * 10) == []
+    assert assembler.pending_bytes == 0  # 没有帧头的数据不保留
+    assert assembler.feed(b'\xEE' + make_frame(2)) == [make_frame(2)]
+    assert (assembler.resync_count, assembler.garbage_bytes) == (2, 14)
+    assert assembler.frame_count == 2
+
+
+def test_split_frames():
+    """一帧分多次到达，包括逐字节到达"""
+    assembler = FrameAssembler()
+    frame = make_frame(3)
+    assert assembler.feed(frame[:5]) == []
+    assert assembler.pending_bytes == 5
+    assert assembler.feed(frame[5:]) == [frame]
+    frames = []
+    for byte in make_frame(4) + make_frame(5):
+        frames += assembler.feed(bytes([byte]))
+    assert frames == [make_frame(4), make_frame(5)]
+    assert assembler.resync_count == 0 and assembler.pending_bytes == 0
+
+
+def test_several_frames_in_one_read():
+    """一次读取包含多帧和下一帧的开头"""
+    assembler = FrameAssembler()
+    data = b''.join(make_frame(i) for i in range(5))
+    assert assembler.feed(data + make_frame(5)[:3]) == [make_frame(i) for i in range(5)]
+    assert assembler.pending_bytes == 3
+    assert assembler.feed(make_frame(5)[3:]) == [make_frame(5)]
+    assert assembler.frame_count == 6
+
+
+def test_truncated_trailing_frame():
+    """末尾不完整的帧保留到下次，reset()丢弃它"""
+    assembler = FrameAssembler()
+    assert assembler.feed(make_frame(6) + make_frame(7)[:10]) == [make_frame(6)]
+    assert assembler.pending_bytes == 10
+    assembler.reset()
+    assert assembler.pending_bytes == 0 and assembler.frame_count == 0
+    assert assembler.feed(make_frame(7)[10:]) == []  # 剩余部分没有帧头，作为杂散字节丢弃
+    assert assembler.feed(make_frame(8)) == [make_frame(8)]
+
+
+def test_random_chunks():
+    """随机切分并夹杂杂散字节的数据流，帧的内容和顺序不变"""
+    rnd = random.Random(2)
+    frames = [make_frame(i) for i in range(300)]
+    stream = bytearray()
+    for frame in frames:
+        if rnd.random() < 0.1:
+            stream += bytes(rnd.randrange(1, 8))  # 不含0x5A的杂散字节
+        stream += frame
+    assembler = FrameAssembler()
+    result = []
+    pos = 0
+    while pos < len(stream):
+        size = rnd.randrange(1, 80)
+        result += assembler.feed(stream[pos:pos + size])
+        pos += size
+    assert result == frames
+
+
+def test_layout():
+    layout = FrameLayout(4, input_header=0x3C, input_trailer=b'')
+    assembler = FrameAssembler.for_layout(layout)
+    frame = layout.build_input_frame(b'\x01\x02\x03\x04')
+    assert assembler.feed(b'\x5A' + frame + frame[:2]) == [frame]
+    assert assembler.garbage_bytes == 1
+
+
+if __name__ == "__main__":
+    test_resync_after_garbage()
+    test_split_frames()
+    test_several_frames_in_one_read()
+    test_truncated_trailing_frame()
+    test_random_chunks()
+    test_layout()
+    print("帧组装测试通过")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+收发记录存储测试
+存储的内容总是全部追加记录的一个后缀，帧数和字节数不超过上限，序号访问与下标访问一致
+"""
+
+import random
+
+from frame_store import DIRECTION_RX, DIRECTION_TX, FrameStore
+
+
+def check_suffix(store, records):
+    """存储内容等于最近len(store)条记录，且不超过容量"""
+    count = len(store)
+    assert count <= store.capacity_frames
+    assert store.byte_count == sum(len(r[2]) for r in records[len(records) - count:]) <= store.capacity_bytes
+    assert list(store) == records[len(records) - count:]
+    assert store.first_seq == len(records) - count and store.next_seq == len(records)
+
+
+def test_matches_reference():
+    """随机长度的记录在各种容量下与参考列表的后缀相同"""
+    rnd = random.Random(22)
+    for capacity_frames, capacity_bytes in ((1, 100), (7, 10000), (50, 64), (100, 1000), (1000, 333)):
+        store = FrameStore(capacity_frames, capacity_bytes)
+        records = []
+        for i in range(3000):
+            record = (i * 1000, rnd.choice((DIRECTION_RX, DIRECTION_TX)), rnd.randbytes(rnd.randrange(1, 40)))
+            seq = store.append(*record)
+            assert seq == i
+            records.append(record)
+            assert store[-1] == record and store.get(seq) == record
+            if i % 97 == 0:
+                check_suffix(store, records)
+        check_suffix(store, records)
+        assert len(store) >= max(1, min(capacity_frames, (capacity_bytes - 80) // 40))  # 淘汰不多于需要
+        assert store.get(store.first_seq - 1) is None and store.get(store.next_seq) is None
+
+
+def test_frame_capacity_exact():
+    """字节容量足够时正好保留最近capacity_frames条"""
+    store = FrameStore(100, 1 << 20)
+    for i in range(250):
+        store.append(i, DIRECTION_RX, bytes([i & 0xFF]) * 26)
+    assert len(store) == 100 and store.evicted_count == 150
+    assert store[0][0] == 150 and store[99][0] == 249
+    try:
+        store[100]
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("下标越界应报错")
+
+
+def test_last_and_resize():
+    store = FrameStore(1000, 1 << 16)
+    for i in range(300):
+        store.append(i, DIRECTION_TX if i % 3 == 0 else DIRECTION_RX, i.to_bytes(2, 'big'))
+    assert [r[0] for r in store.last(3)] == [297, 298, 299]
+    assert [r[0] for r in store.last(2, DIRECTION_TX)] == [294, 297]
+    assert store.last_payload(DIRECTION_RX) == (299).to_bytes(2, 'big')
+    assert store.last_payload(DIRECTION_TX) == (297).to_bytes(2, 'big')
+
+    store.resize(50, 1 << 16)
+    assert len(store) == 50 and store.first_seq == 250 and store.get(250)[0] == 250
+    store.resize(1000, 21)  # 字节上限 10 条
+    assert len(store) == 10 and store[0][0] == 290
+    assert store.append(300, DIRECTION_RX, b'xy') == 300
+
+    store.clear()
+    assert len(store) == 0 and store.last_payload() is None and store.get(300) is None
+    assert store.append(301, DIRECTION_RX, b'z') == 301
+    assert list(store) == [(301, DIRECTION_RX, b'z')]
+
+
+def test_repeat_last():
+    """连续重复折叠进最新记录，中间有其他记录或已淘汰时不能折叠"""
+    store = FrameStore(3, 1000)
+    seq = store.append(10, DIRECTION_RX, b'abc')
+    for timestamp in (20, 30, 40):
+        assert store.repeat_last(seq, timestamp)
+    assert len(store) == 1 and store.repeat_info(seq) == (4, 40) and store.get(seq) == (10, DIRECTION_RX, b'abc')
+    tx = store.append(50, DIRECTION_TX, b'x')
+    assert not store.repeat_last(seq, 60)
+    assert store.repeat_info(tx) == (1, 50)
+    store.resize(2, 1000)
+    assert store.repeat_info(seq) == (4, 40)
+    store.append(70, DIRECTION_RX, b'y')
+    assert store.repeat_info(seq) is None and not store.repeat_last(seq, 80)
+    store.clear()
+    assert not store.repeat_last(store.next_seq - 1, 90)
+
+
+def test_oversized_payload():
+    store = FrameStore(10, 8)
+    store.append(0, DIRECTION_RX, b'abc')
+    store.append(1, DIRECTION_RX, b'0123456789')
+    assert list(store) == [(1, DIRECTION_RX, b'23456789')]
+
+
+if __name__ == "__main__":
+    test_matches_reference()
+    test_frame_capacity_exact()
+    test_last_and_resize()
+    test_repeat_last()
+    test_oversized_payload()
+    print("收发记录存储测试通过")
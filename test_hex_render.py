@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+十六进制渲染测试
+渲染表生成的HTML与原逐字节方式相同，自定义高亮规则与逐字节参考实现相同
+"""
+
+import random
+from datetime import datetime
+
+from hex_render import (ByteRenderer, format_highlight_rules, format_time_ns, legacy_html,
+                        parse_highlight_rules)
+
+
+def reference_html(data, highlights):
+    return ' '.join(f'<span style="color: {highlights[b]};">{b:02X}</span>' if b in highlights else f"{b:02X}"
+                    for b in data)
+
+
+def test_matches_legacy():
+    """默认规则下与原flush_data_buffer生成的字节部分相同（原实现每个字节后多一个空格）"""
+    rnd = random.Random(23)
+    renderer = ByteRenderer()
+    for _ in range(500):
+        data = bytes(rnd.choice((0x5A, 0xEB, rnd.randrange(256))) for _ in range(rnd.randrange(1, 60)))
+        legacy = legacy_html(data, 1000.0)
+        legacy = legacy[legacy.index('[接收] ') + 5:-len(' <br>')]
+        assert renderer.html(data) == legacy
+        assert renderer.hex(data) == ' '.join(f"{b:02X}" for b in data)
+        assert renderer.has_highlight(data) == (0x5A in data or 0xEB in data)
+
+
+def test_custom_rules():
+    rnd = random.Random(24)
+    for _ in range(50):
+        highlights = {rnd.randrange(256): rnd.choice(('blue', '#FF8000', 'red')) for _ in range(rnd.randrange(6))}
+        renderer = ByteRenderer(highlights)
+        for _ in range(20):
+            data = rnd.randbytes(rnd.randrange(40))
+            assert renderer.html(data) == reference_html(data, highlights)
+            assert renderer.has_highlight(data) == any(b in highlights for b in data)
+    assert not ByteRenderer({}).has_highlight(bytes(range(256)))
+
+
+def test_rule_text():
+    assert parse_highlight_rules("5a=green， EB = red,01=#808080,") == {0x5A: 'green', 0xEB: 'red', 0x01: '#808080'}
+    assert parse_highlight_rules("  ") == {}
+    rules = {0x5A: 'green', 0xEB: 'red', 0x00: '#abc'}
+    assert parse_highlight_rules(format_highlight_rules(rules)) == rules
+    for text in ("5A", "5A=", "XY=red", "100=red", "5A=red;<b>", "5A=#12"):
+        try:
+            parse_highlight_rules(text)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{text!r} 应报错")
+
+
+def test_format_time_ns():
+    rnd = random.Random(25)
+    for _ in range(200):
+        timestamp_ns = rnd.randrange(10**18, 2 * 10**18)
+        expected = datetime.fromtimestamp(timestamp_ns // 1000 / 1e6).strftime("%H:%M:%S.%f")[:-3]
+        assert format_time_ns(timestamp_ns) == expected
+
+
+if __name__ == "__main__":
+    test_matches_legacy()
+    test_custom_rules()
+    test_rule_text()
+    test_format_time_ns()
+    print("十六进制渲染测试通过")
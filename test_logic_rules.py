@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+逻辑规则测试
+编译生成的函数与逐节点解释执行的结果相同，定时器语义和与映射引擎的集成
+"""
+
+import random
+
+from logic_rules import RULE_BIT_COUNT, TIMER_COST, RuleError, compile_rules, parse_rules, random_rules
+from mapping_engine import MappingEngine
+
+
+class Interpreter:
+    """逐节点解释执行解析结果，作为编译结果的参考"""
+
+    def __init__(self, lines):
+        self.rules = parse_rules(lines)
+        self.timers = {}  # 节点id -> 状态
+
+    def value(self, node, bits, now):
+        kind = node[0]
+        if kind == 'in':
+            return (bits >> (RULE_BIT_COUNT - 1 - node[1])) & 1
+        if kind == 'const':
+            return node[1]
+        if kind == 'not':
+            return 1 - self.value(node[1], bits, now)
+        if kind == 'timer':
+            return self.timer(node, self.value(node[2], bits, now), now)
+        a = self.value(node[1], bits, now)
+        b = self.value(node[2], bits, now)
+        return {'and': a & b, 'or': a | b, 'xor': a ^ b}[kind]
+
+    def timer(self, node, x, now):
+        function, duration = node[1], node[3] / 1000
+        state = self.timers.setdefault(id(node), {'start': None, 'fall': None, 'pulse': None, 'prev': 0})
+        if function == 'TON':
+            if not x:
+                state['start'] = None
+                return 0
+            if state['start'] is None:
+                state['start'] = now
+            return int(now - state['start'] >= duration)
+        if function == 'TOF':
+            if x:
+                state['high'] = True
+                return 1
+            if state.pop('high', False):  # 下降沿
+                state['fall'] = now
+            return int(state['fall'] is not None and now - state['fall'] < duration)
+        pulsing = state['pulse'] is not None and now - state['pulse'] < duration
+        if x and not state['prev'] and not pulsing:
+            state['pulse'] = now
+        state['prev'] = x
+        return int(state['pulse'] is not None and now - state['pulse'] < duration)
+
+    def evaluate(self, bits, now):
+        result = 0
+        for output, node in self.rules:
+            result |= self.value(node, bits, now) << (RULE_BIT_COUNT - 1 - output)
+        return result
+
+
+def bits_of(*inputs):
+    return sum(1 << (RULE_BIT_COUNT - 1 - i) for i in inputs)
+
+
+def output_bit(value, output):
+    return (value >> (RULE_BIT_COUNT - 1 - output)) & 1
+
+
+def test_compiled_matches_interpreter():
+    """随机规则（含定时器）在随机输入和时间序列上与解释执行相同"""
+    rnd = random.Random(18)
+    for seed in range(20):
+        lines = random_rules(40, seed=seed, timer_ratio=0.4)
+        program = compile_rules(lines)
+        interpreter = Interpreter(lines)
+        now = 100.0
+        # 输入只在少数位上变化，定时器才有机会到期
+        bits = rnd.getrandbits(RULE_BIT_COUNT)
+        for _ in range(300):
+            if rnd.random() < 0.2:
+                bits ^= 1 << rnd.randrange(RULE_BIT_COUNT)
+            now += rnd.choice((0.005, 0.01, 0.05, 0.3))
+            assert program.evaluate(bits, now) == interpreter.evaluate(bits, now)
+
+
+def test_operators_and_precedence():
+    program = compile_rules([
+        'O0 = I0 & I1',
+        'O1 = I0 | I1 & I2',       # 与优先于或
+        'o2 = not i0 and (i1 or i2)',
+        'O3 = I0 ^ 1',
+        'O4 = !!I2  # 注释',
+    ])
+    assert program.mask == bits_of(0, 1, 2, 3, 4)
+    value = program.evaluate(bits_of(1, 2))
+    assert [output_bit(value, o) for o in range(5)] == [0, 1, 1, 1, 1]
+    value = program.evaluate(bits_of(0))
+    assert [output_bit(value, o) for o in range(5)] == [0, 1, 0, 0, 0]
+
+
+def test_timers():
+    program = compile_rules(['O0 = TON(I0, 100)', 'O1 = TOF(I0, 100)', 'O2 = TP(I0, 100)',
+                             'O3 = I0 | TP(I0, 100)'])
+    on, off = bits_of(0), 0
+    samples = [(0.00, off), (0.01, on), (0.05, off), (0.08, on), (0.15, on),
+               (0.19, on), (0.20, off), (0.25, off), (0.31, off)]
+    expected = [
+        # TON TOF TP 展宽
+        (0, 0, 0, 0),
+        (0, 1, 1, 1),
+        (0, 1, 1, 1),  # TP脉冲期间忽略输入
+        (0, 1, 1, 1),
+        (0, 1, 0, 1),  # TP 100ms到期
+        (1, 1, 0, 1),  # TON 从0.08起持续100ms以上
+        (0, 1, 0, 0),  # TOF 断开后保持
+        (0, 1, 0, 0),
+        (0, 0, 0, 0),  # TOF 100ms到期
+    ]
+    for (now, bits), outputs in zip(samples, expected):
+        value = program.evaluate(bits, now)
+        assert tuple(output_bit(value, o) for o in range(4)) == outputs, now
+
+
+def test_syntax_errors():
+    for lines, line in ((['O1 = I1 &'], 1), (['# 注释', '', 'I1 = O2'], 3), (['O1 = I192'], 1),
+                        (['O1 = I1', 'O2 = FOO(I1, 10)'], 2), (['O1 = (I1 | I2'], 1),
+                        (['O1 = TON(I1)'], 1), (['O1 = I1 $ I2'], 1)):
+        try:
+            compile_rules(lines)
+        except RuleError as e:
+            assert e.line == line, (lines, e)
+        else:
+            raise AssertionError(f"{lines} 应报错")
+    assert compile_rules(['', '# 只有注释']) is None
+
+
+def test_cost_budget():
+    """按运算数拒绝规则集，结果与求值耗时无关"""
+    program = compile_rules(['O0 = I0 & !I1', 'O1 = TON(I2 | 1, 10)'], time_budget=1e-12)
+    assert program.cost == 4 + (TIMER_COST + 3)
+    assert compile_rules(['O0 = I0 & !I1'], cost_budget=4).cost == 4
+    lines = random_rules(192)
+    cost = compile_rules(lines).cost
+    assert compile_rules(lines, cost_budget=cost) is not None
+    try:
+        compile_rules(lines, cost_budget=cost - 1)
+    except RuleError:
+        pass
+    else:
+        raise AssertionError("运算数超出上限的规则集应被拒绝")
+
+
+def test_engine_integration():
+    """规则覆盖1:1映射的输出位；规则文本不变时重新编译保留定时器状态；配置往返"""
+    engine = MappingEngine()
+    for key in ('0', '1'):
+        engine.enabled[key] = True
+    engine.invalidate()
+    engine.set_rules(['O1 = I0 & I2', 'O5 = TON(I3, 50)'])
+    frame = bytes([0x5A, 0b10110000]) + bytes(24)
+    output = engine.convert(frame, now=1.0)
+    assert output[1] == 0b11000000  # O0来自映射I0，O1的映射I1=0被规则I0&I2=1覆盖，O5未到延时
+    assert not engine.stateless
+
+    engine.mapping['0'] = 2
+    engine.invalidate()
+    output = engine.convert(frame, now=1.06)
+    assert output[1] == 0b01100100  # I0改映射到O2；O5：I3已持续60ms，重新编译未清除定时器状态
+    assert engine.cache_hits == 0
+
+    restored = MappingEngine.from_config(engine.to_config())
+    assert restored.rules == engine.rules
+    assert restored.convert(frame, now=5.0)[1] == 0b01100000
+
+    try:
+        engine.set_rules(['O1 = '])
+    except RuleError:
+        pass
+    assert engine.rules == ['O1 = I0 & I2', 'O5 = TON(I3, 50)']
+
+
+def test_stateless_rules_use_cache():
+    engine = MappingEngine()
+    engine.set_rules(['O0 = I0 ^ I1'])
+    assert engine.stateless
+    frame = bytes([0x5A, 0x80]) + bytes(24)
+    assert engine.convert(frame)[1] == 0x80
+    assert engine.convert(frame)[1] == 0x80
+    assert engine.cache_hits == 1
+    # 短帧按缺少的字节为0求值
+    assert engine.convert(bytes([0x5A, 0x40]))[1] == 0x80
+
+
+if __name__ == "__main__":
+    test_compiled_matches_interpreter()
+    test_operators_and_precedence()
+    test_timers()
+    test_syntax_errors()
+    test_cost_budget()
+    test_engine_integration()
+    test_stateless_rules_use_cache()
+    print("逻辑规则测试通过")
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+映射引擎等价性测试
+按字节查表/映射计划的convert()必须与逐位参考实现convert_reference()输出相同，
+并产生相同的自锁状态；没有扇入/扇出的配置与原算法convert_baseline()输出相同
+"""
+
+import copy
+import random
+
+from frame_layout import BIT_ORDER_LSB, CRC_NONE, FrameLayout
+from mapping_engine import BIT_COUNT, DEFAULT_OUTPUT_FRAME, BitStateView, MappingEngine
+
+
+def random_engine(rnd, enable_ratio, latch_ratio, output_range=(0, BIT_COUNT), fanout_ratio=0.1, layout=None):
+    """生成随机映射配置，输出位可能重复（扇入），部分输入带附加输出位（扇出）"""
+    engine = MappingEngine(layout)
+    for i in range(engine.layout.bit_count):
+        key = str(i)
+        engine.enabled[key] = rnd.random() < enable_ratio
+        engine.mapping[key] = rnd.randrange(*output_range)
+        engine.latch[key] = rnd.random() < latch_ratio
+        if rnd.random() < fanout_ratio:
+            engine.fanout[key] = [rnd.randrange(*output_range) for _ in range(rnd.randrange(1, 4))]
+    engine.invalidate()
+    return engine
+
+
+def random_frame(rnd, lengths=(26,), header=0x5A):
+    return bytes([header]) + rnd.randbytes(rnd.choice(lengths) - 1)
+
+
+def assert_equivalent(engine, frames):
+    reference = copy.deepcopy(engine)
+    for frame in frames:
+        assert engine.convert(frame) == reference.convert_reference(frame), frame.hex()
+    assert engine.latch_states == reference.latch_states
+    assert engine.prev_values == reference.prev_values
+
+
+def test_random_mappings():
+    """随机映射和随机帧，包括全部启用、重复输出位和自锁"""
+    rnd = random.Random(12)
+    for enable_ratio in (0, 0.05, 0.3, 1):
+        for latch_ratio in (0, 0.3):
+            for _ in range(20):
+                engine = random_engine(rnd, enable_ratio, latch_ratio)
+                assert_equivalent(engine, [random_frame(rnd) for _ in range(50)])
+
+
+def test_short_and_long_frames():
+    """帧长度不足时退回逐步执行，超长帧忽略多余字节"""
+    rnd = random.Random(34)
+    for _ in range(50):
+        engine = random_engine(rnd, 0.3, 0.2)
+        assert_equivalent(engine, [random_frame(rnd, (1, 2, 5, 13, 25, 26, 40)) for _ in range(50)])
+
+
+def test_output_out_of_range():
+    """输出位超出D0~D23时不写输出，但自锁状态照常更新"""
+    rnd = random.Random(56)
+    for _ in range(50):
+        engine = random_engine(rnd, 0.3, 0.3, output_range=(-16, BIT_COUNT + 16))
+        assert_equivalent(engine, [random_frame(rnd) for _ in range(30)])
+
+
+def test_config_change_invalidates_plan():
+    """修改配置并调用invalidate()后按新配置转换"""
+    rnd = random.Random(78)
+    engine = random_engine(rnd, 0.2, 0.2)
+    reference = copy.deepcopy(engine)
+    for _ in range(200):
+        frame = random_frame(rnd)
+        assert engine.convert(frame) == reference.convert_reference(frame)
+        key = str(rnd.randrange(BIT_COUNT))
+        field = rnd.choice(('enabled', 'latch', 'mapping', 'fanout'))
+        if field == 'mapping':
+            value = rnd.randrange(BIT_COUNT)
+        elif field == 'fanout':
+            value = [rnd.randrange(BIT_COUNT) for _ in range(rnd.randrange(3))]
+        else:
+            value = rnd.random() < 0.5
+        getattr(engine, field)[key] = value
+        getattr(reference, field)[key] = value
+        engine.invalidate()
+
+
+def test_fan_in_or():
+    """多个输入路由到同一输出位时按位或"""
+    engine = MappingEngine()
+    for key in ('0', '1'):
+        engine.enabled[key] = True
+        engine.mapping[key] = 8
+    engine.invalidate()
+    assert engine.convert(bytes([0x5A, 0x80]) + bytes(24))[2] == 0x80
+    assert engine.convert(bytes([0x5A, 0x40]) + bytes(24))[2] == 0x80
+    assert engine.convert(bytes([0x5A, 0x00]) + bytes(24))[2] == 0
+
+
+def test_baseline_without_fan_in():
+    """每个输出位最多一个输入（没有扇入和扇出）时，结果和自锁状态与原算法相同"""
+    rnd = random.Random(19)
+    for layout in (None, FrameLayout(64)):
+        for enable_ratio, latch_ratio in ((0.05, 0), (0.3, 0.3), (1, 0.2)):
+            for _ in range(10):
+                engine = MappingEngine(layout)
+                bit_count = engine.layout.bit_count
+                outputs = rnd.sample(range(-16, bit_count + 16), bit_count)  # 互不相同，部分超出范围
+                for i in range(bit_count):
+                    key = str(i)
+                    engine.enabled[key] = rnd.random() < enable_ratio
+                    engine.mapping[key] = outputs[i]
+                    engine.latch[key] = rnd.random() < latch_ratio
+                engine.invalidate()
+                baseline = copy.deepcopy(engine)
+                lengths = (engine.layout.input_frame_length, 1, 2, 9, engine.layout.input_frame_length + 5)
+                for _ in range(30):
+                    frame = random_frame(rnd, lengths)
+                    assert engine.convert(frame) == baseline.convert_baseline(frame), frame.hex()
+                assert engine.latch_states == baseline.latch_states
+                assert engine.prev_values == baseline.prev_values
+
+
+def test_fan_in_differs_from_baseline():
+    """行为变化：原算法中映射到同一输出位的多个输入只有最后处理的生效（置位或清零），现在按位或"""
+    engine = MappingEngine()
+    for key in ('0', '1'):
+        engine.enabled[key] = True
+        engine.mapping[key] = 8
+    engine.invalidate()
+    only_first = bytes([0x5A, 0x80]) + bytes(24)  # I0=1, I1=0
+    assert engine.convert(only_first)[2] == 0x80
+    assert engine.convert_reference(only_first)[2] == 0x80
+    assert engine.convert_baseline(only_first)[2] == 0  # I1后处理，把O8清零
+    only_second = bytes([0x5A, 0x40]) + bytes(24)
+    assert engine.convert(only_second)[2] == engine.convert_baseline(only_second)[2] == 0x80
+
+
+def test_fan_out():
+    """一个输入驱动多个输出位；自锁输入每帧只翻转一次；配置往返保留附加输出位"""
+    engine = MappingEngine()
+    engine.enabled['0'] = True
+    engine.fanout['0'] = [8, 191, 8, 300]
+    engine.invalidate()
+    assert engine.outputs_of(0) == [0, 8, 191, 300]
+    output = engine.convert(bytes([0x5A, 0x80]) + bytes(24))
+    assert (output[1], output[2], output[24]) == (0x80, 0x80, 0x01)
+
+    engine.latch['0'] = True
+    engine.invalidate()
+    output = engine.convert(bytes([0x5A, 0x80]) + bytes(24))
+    assert (output[1], output[2], output[24]) == (0x80, 0x80, 0x01)
+    assert engine.latch_states['0'] == 1
+
+    restored = MappingEngine.from_config(engine.to_config())
+    assert restored.routes() == {0: [0, 8, 191, 300]}
+
+
+def test_output_cache():
+    """重复输入命中输出帧缓存，结果与参考实现相同；修改配置后缓存失效"""
+    rnd = random.Random(90)
+    engine = random_engine(rnd, 0.3, 0)
+    reference = copy.deepcopy(engine)
+    frames = [random_frame(rnd) for _ in range(5)]
+    for _ in range(20):
+        frame = rnd.choice(frames)
+        assert engine.convert(frame) == reference.convert_reference(frame)
+    assert engine.cache_misses == 5 and engine.cache_hits == 15
+
+    # 修改返回的输出帧不影响缓存
+    engine.convert(frames[0])[1] ^= 0xFF
+    assert engine.convert(frames[0]) == reference.convert_reference(frames[0])
+
+    for key in engine.enabled:
+        engine.enabled[key] = not engine.enabled[key]
+        reference.enabled[key] = engine.enabled[key]
+    engine.invalidate()
+    for frame in frames:
+        assert engine.convert(frame) == reference.convert_reference(frame)
+
+
+def test_default_frame():
+    """未启用任何映射时输出预先计算的默认帧"""
+    engine = MappingEngine()
+    assert engine.convert(bytes([0x5A]) + bytes(range(25))) == DEFAULT_OUTPUT_FRAME
+    assert engine.convert(bytes([0x5A, 0xFF])) == engine.convert_reference(bytes([0x5A, 0xFF]))
+
+
+def test_frame_layouts():
+    """64/128字节、LSB位序、不带CRC的帧格式与参考实现相同，配置往返保留帧格式"""
+    rnd = random.Random(20)
+    layouts = (FrameLayout(64), FrameLayout(128, bit_order=BIT_ORDER_LSB),
+               FrameLayout(10, input_header=0x3C, output_header=0xC3, input_trailer=b'',
+                           output_trailer=b'\x01\x02', crc=CRC_NONE, bit_order=BIT_ORDER_LSB))
+    for layout in layouts:
+        lengths = (layout.input_frame_length, 3, layout.data_length)
+        for enable_ratio, latch_ratio in ((0.1, 0), (0.3, 0.3), (1, 0)):
+            engine = random_engine(rnd, enable_ratio, latch_ratio, output_range=(0, layout.bit_count), layout=layout)
+            frames = [random_frame(rnd, lengths, layout.input_header) for _ in range(30)]
+            assert_equivalent(engine, frames)
+            assert len(engine.convert(frames[0])) == layout.output_frame_length
+        restored = MappingEngine.from_config(engine.to_config())
+        assert restored.layout == layout
+        assert restored.convert(frames[0]) == engine.convert(frames[0])
+
+    # LSB位序：I0为D0的最低位；逻辑规则按位号求值
+    layout = FrameLayout(64, bit_order=BIT_ORDER_LSB)
+    engine = MappingEngine(layout)
+    engine.enabled['0'] = True
+    engine.mapping['0'] = 9
+    engine.invalidate()
+    engine.set_rules(['O500 = I1 & I0'])
+    output = engine.convert(layout.build_input_frame(bytes([0b11]) + bytes(63)))
+    assert layout.payload(output) == bytes([0, 0b10]) + bytes(60) + bytes([0b10000, 0])
+
+    # 配置中超出帧格式位数的项被忽略
+    small = MappingEngine.from_config({'enabled': {'0': True, '300': True}, 'mapping': {'0': 1}})
+    assert '300' not in small.enabled and small.routes() == {0: [1]}
+
+
+def test_state_round_trip():
+    """自锁状态和上一次输入值按帧格式的位数保存和恢复，位号不偏移"""
+    for layout in (FrameLayout(8), FrameLayout(128)):
+        bit_count = layout.bit_count
+        states = {'0': 1, '5': 1, str(bit_count - 1): 1}
+        if bit_count > 300:
+            states['300'] = 1
+        engine = MappingEngine(layout)
+        engine.latch_states = states
+        engine.prev_values = {'5': 1, str(bit_count): 1}  # 超出位数的项被忽略
+        assert {key for key, value in engine.latch_states.items() if value} == set(states)
+        assert {key for key, value in engine.prev_values.items() if value} == {'5'}
+
+        restored = MappingEngine.from_config(engine.to_config())
+        assert restored.latch_bits == engine.latch_bits and restored.prev_bits == engine.prev_bits
+        assert dict(restored.latch_states) == dict(engine.latch_states)
+        assert dict(restored.prev_values) == dict(engine.prev_values)
+
+
+def test_bit_state_view():
+    """字典视图的读写直接作用于引擎中的整数，I0为最高位"""
+    engine = MappingEngine()
+    view = engine.latch_states
+    assert isinstance(view, BitStateView)
+    assert len(view) == BIT_COUNT and list(view)[:3] == ['0', '1', '2'] and list(view)[-1] == str(BIT_COUNT - 1)
+    assert all(value == 0 for value in view.values())
+
+    view['0'] = 1
+    view[BIT_COUNT - 1] = True  # 整数键也可以
+    assert engine.latch_bits == (1 << (BIT_COUNT - 1)) | 1
+    assert view['0'] == 1 and view[str(BIT_COUNT - 1)] == 1 and view['1'] == 0
+    assert view.get('5', 0) == 0 and '5' in view
+    view['0'] = 0
+    del view[str(BIT_COUNT - 1)]
+    assert engine.latch_bits == 0
+    view.update({'3': 1, '10': 1})
+    assert engine.latch_bits == (1 << (BIT_COUNT - 4)) | (1 << (BIT_COUNT - 11))
+    assert engine.prev_bits == 0  # 两个视图互不影响
+    assert dict(view) == {str(i): 1 if i in (3, 10) else 0 for i in range(BIT_COUNT)}
+
+    for key in (str(BIT_COUNT), '-1', 'x', None):
+        try:
+            view[key]
+        except KeyError:
+            pass
+        else:
+            raise AssertionError(f"无效位号应报KeyError: {key!r}")
+        assert key not in view
+
+
+def test_latch_toggle():
+    """自锁输入每个上升沿翻转一次输出，保持高电平和下降沿不翻转"""
+    engine = MappingEngine()
+    engine.enabled['0'] = True
+    engine.latch['0'] = True
+    engine.enabled['9'] = True
+    engine.mapping['9'] = 20
+    engine.latch['9'] = True
+    engine.invalidate()
+    reference = copy.deepcopy(engine)
+
+    # I0为D0最高位，I9为D1次高位
+    inputs = [(0, 0), (1, 0), (1, 0), (0, 1), (1, 1), (0, 0), (0, 1), (1, 0)]
+    expected = [(0, 0), (1, 0), (1, 0), (1, 1), (0, 1), (0, 1), (0, 0), (1, 0)]
+    for (i0, i9), (o0, o20) in zip(inputs, expected):
+        frame = bytes([0x5A, i0 << 7, i9 << 6]) + bytes(23)
+        output = engine.convert(frame)
+        assert output == reference.convert_reference(frame)
+        assert (output[1] >> 7, (output[3] >> 3) & 1) == (o0, o20)
+        assert (engine.latch_states['0'], engine.latch_states['9']) == (o0, o20)
+        assert (engine.prev_values['0'], engine.prev_values['9']) == (i0, i9)
+    assert engine.latch_states == reference.latch_states and engine.prev_values == reference.prev_values
+
+    # 从视图修改自锁状态后，下一帧从修改后的状态继续
+    engine.latch_states['0'] = 0
+    output = engine.convert(bytes([0x5A, 0x80]) + bytes(24))
+    assert output[1] >> 7 == 0 and engine.latch_states['0'] == 0  # 输入保持高电平，没有上升沿
+    output = engine.convert(bytes([0x5A]) + bytes(25))
+    output = engine.convert(bytes([0x5A, 0x80]) + bytes(24))
+    assert output[1] >> 7 == 1 and engine.latch_states['0'] == 1
+
+
+if __name__ == "__main__":
+    test_random_mappings()
+    test_short_and_long_frames()
+    test_output_out_of_range()
+    test_config_change_invalidates_plan()
+    test_fan_in_or()
+    test_baseline_without_fan_in()
+    test_fan_in_differs_from_baseline()
+    test_fan_out()
+    test_output_cache()
+    test_default_frame()
+    test_frame_layouts()
+    test_state_round_trip()
+    test_bit_state_view()
+    test_latch_toggle()
+    print("映射引擎等价性测试通过")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+变化驱动发送测试
+输出不变时不重复发送，保活周期到期时重发上次的帧，reset()后下一帧一定发送，
+发送被拒绝的帧不记为已发送
+"""
+
+from output_gate import OutputGate
+from serial_io import SerialWriter
+
+FRAME_A = bytes([0xA5, 0x01, 0x02])
+FRAME_B = bytes([0xA5, 0x03, 0x04])
+
+
+def send(gate, frame, now):
+    """与发送方相同：判断需要发送后发出，并记为已发送"""
+    if not gate.should_send(frame, now=now):
+        return False
+    gate.mark_sent(frame, now=now)
+    return True
+
+
+def test_change_suppression():
+    """相同的帧只发送一次，内容变化时立即发送，统计节省的字节数"""
+    gate = OutputGate(keepalive=0)
+    assert send(gate, FRAME_A, 0.0)
+    for i in range(5):
+        assert not send(gate, bytearray(FRAME_A), 0.1 * i)
+    assert send(gate, FRAME_B, 1.0)
+    assert send(gate, FRAME_A, 1.1)
+    assert (gate.sent_count, gate.suppressed_count, gate.saved_bytes) == (3, 5, 5 * len(FRAME_A))
+    assert gate.keepalive_remaining() is None and gate.keepalive_due(now=100.0) is None
+
+    # 关闭时每帧都发送
+    gate = OutputGate(enabled=False)
+    assert all(send(gate, FRAME_A, 0.0) for _ in range(3))
+    assert gate.suppressed_count == 0 and gate.keepalive_count == 0 and gate.keepalive_due(now=100.0) is None
+
+    gate.reset_stats()
+    assert (gate.sent_count, gate.keepalive_count, gate.suppressed_count, gate.saved_bytes) == (0, 0, 0, 0)
+
+
+def test_keepalive_expiry():
+    """输出不变时超过保活周期重发，重发后重新计时"""
+    gate = OutputGate(keepalive=1.0)
+    assert gate.keepalive_remaining() is None  # 还没有发送过
+    assert send(gate, FRAME_A, 10.0)
+    assert not send(gate, FRAME_A, 10.9)
+    assert gate.keepalive_remaining(now=10.25) == 0.75
+    assert send(gate, FRAME_A, 11.0)  # 到期
+    assert gate.keepalive_count == 1
+    assert not send(gate, FRAME_A, 11.5)
+
+    # 没有新的输出帧时由定时检查发送保活帧，发出后重新计时
+    assert gate.keepalive_due(now=11.9) is None
+    assert gate.keepalive_due(now=12.0) == FRAME_A
+    assert gate.keepalive_due(now=12.0) == FRAME_A  # 还没有记为已发送
+    gate.mark_sent(FRAME_A, now=12.0)
+    assert gate.keepalive_due(now=12.5) is None
+    assert gate.keepalive_remaining(now=12.5) == 0.5
+    assert (gate.sent_count, gate.keepalive_count) == (3, 2)
+
+
+def test_reset():
+    """reset()后相同的帧也会发送，统计不清零"""
+    gate = OutputGate(keepalive=0)
+    assert send(gate, FRAME_A, 0.0)
+    assert not send(gate, FRAME_A, 0.1)
+    gate.reset()
+    assert gate.keepalive_due(now=100.0) is None
+    assert send(gate, FRAME_A, 0.2)
+    assert not send(gate, FRAME_A, 0.3)
+    assert (gate.sent_count, gate.suppressed_count) == (2, 2)
+
+
+def test_rejected_submit():
+    """发送队列已满、提交被拒绝的帧不记为已发送，下一个相同的帧仍然发送"""
+    gate = OutputGate(keepalive=0)
+    writer = SerialWriter(serial_port=None, max_queue=1)
+    assert writer.submit(b'\x00')  # 发送线程未启动，队列已满
+
+    for now in (0.0, 0.1):
+        assert gate.should_send(FRAME_A, now=now)
+        if writer.submit(FRAME_A, SerialWriter.PRIORITY_OUTPUT):
+            gate.mark_sent(FRAME_A, now=now)
+    assert writer.dropped_count == 2 and gate.sent_count == 0 and gate.last_frame is None
+
+    writer._queue.get_nowait()  # 队列有空位后发送成功
+    assert gate.should_send(FRAME_A, now=0.2)
+    assert writer.submit(FRAME_A, SerialWriter.PRIORITY_OUTPUT)
+    gate.mark_sent(FRAME_A, now=0.2)
+    assert not gate.should_send(FRAME_A, now=0.3)
+    assert gate.sent_count == 1
+
+
+if __name__ == "__main__":
+    test_change_suppression()
+    test_keepalive_expiry()
+    test_reset()
+    test_rejected_submit()
+    print("变化驱动发送测试通过")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多串口会话管理测试（需要pty，仅Linux/macOS）
+同一串口重复打开时复用会话，共享刷新定时器随第一个会话启动、随最后一个会话停止，
+会话按打开时指定的帧格式组帧
+"""
+
+import os
+import time
+
+import pytest
+from PyQt5.QtCore import QCoreApplication
+
+from frame_layout import DEFAULT_LAYOUT, FrameLayout
+from port_session import SessionManager
+
+if not hasattr(os, 'openpty'):
+    pytest.skip("需要pty", allow_module_level=True)
+
+
+@pytest.fixture
+def app():
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def ptys():
+    """按需创建pty，测试结束后全部关闭，返回(主端fd, 从端设备名)"""
+    created = []
+
+    def create():
+        master_fd, slave_fd = os.openpty()
+        created.append((master_fd, slave_fd))
+        return master_fd, os.ttyname(slave_fd)
+
+    yield create
+    for master_fd, slave_fd in created:
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+def wait_until(app, condition, timeout=2.0):
+    """处理事件直到condition()成立或超时"""
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    return condition()
+
+
+def test_open_close_reuse(app, ptys):
+    """重复打开返回同一会话且只通知一次；定时器在有会话时运行，最后一个会话关闭后停止"""
+    manager = SessionManager(interval=10)
+    opened, closed = [], []
+    manager.session_opened.connect(opened.append)
+    manager.session_closed.connect(closed.append)
+    (_, first), (_, second) = ptys(), ptys()
+    try:
+        assert not manager.timer.isActive()
+        session = manager.open_port(first)
+        assert session.is_open and manager.timer.isActive()
+        assert manager.open_port(first) is session and opened == [first]
+        other = manager.open_port(second)
+        assert other is not session and list(manager.sessions) == [first, second]
+
+        manager.close_port(first)
+        assert not session.is_open and session.reader is None and session.writer is None
+        assert manager.timer.isActive() and closed == [first]
+        manager.close_port(first)  # 已关闭的串口不再通知
+        assert closed == [first]
+
+        assert manager.open_port(first) is not session  # 关闭后重新打开是新的会话
+        manager.close_all()
+        assert manager.sessions == {} and not manager.timer.isActive()
+        assert sorted(closed) == sorted([first, first, second]) and opened == [first, second, first]
+    finally:
+        manager.close_all()
+
+
+def test_shared_tick(app, ptys):
+    """所有会话共用一个定时器，关闭全部会话后不再发出tick"""
+    manager = SessionManager(interval=10)
+    ticks = []
+    manager.tick.connect(lambda: ticks.append(time.monotonic()))
+    try:
+        manager.open_port(ptys()[1])
+        manager.open_port(ptys()[1])
+        assert wait_until(app, lambda: len(ticks) >= 3)
+        manager.close_all()
+        count = len(ticks)
+        wait_until(app, lambda: False, timeout=0.1)
+        assert len(ticks) == count
+    finally:
+        manager.close_all()
+
+
+def test_session_layout(app, ptys):
+    """会话按打开时的帧格式组帧，默认是24字节格式"""
+    manager = SessionManager()
+    layout = FrameLayout(64)
+    try:
+        for frame_layout, kwargs in ((layout, {'layout': layout}), (DEFAULT_LAYOUT, {})):
+            master_fd, name = ptys()
+            session = manager.open_port(name, **kwargs)
+            assert session.frame_assembler.frame_length == frame_layout.input_frame_length
+            frames = [frame_layout.build_input_frame(bytes([i]) * frame_layout.data_length) for i in range(3)]
+            data = b''.join(frames)
+            os.write(master_fd, data[:30])
+            os.write(master_fd, data[30:])
+            assert wait_until(app, lambda: session.rx_count == len(data))
+            assert [frame for _, frame in session.take_pending()] == frames
+            assert session.frame_assembler.garbage_bytes == 0
+
+        # 不组帧时按原样交付
+        master_fd, name = ptys()
+        session = manager.open_port(name, frame_mode=False)
+        assert session.frame_assembler is None
+        os.write(master_fd, b'\x01\x02\x03')
+        assert wait_until(app, lambda: session.rx_count == 3)
+        assert b''.join(data for _, data in session.take_pending()) == b'\x01\x02\x03'
+    finally:
+        manager.close_all()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接收区日志模型测试
+行数不超过容量，存储淘汰的记录从显示中移除，显示模式切换不丢失数据，导出文本与原接收区格式一致
+"""
+
+from frame_store import DIRECTION_RX, DIRECTION_TX, FrameStore
+from receive_log import HtmlRole, ReceiveLogModel
+
+
+def append_frames(store, count, start=0):
+    return [store.append((1000 + i) * 10**9, DIRECTION_RX, bytes([0x5A, i & 0xFF, 0xEB, 0x01]))
+            for i in range(start, start + count)]
+
+
+def test_bounded_rows():
+    """超出容量时丢弃最旧的行，包括单批超过容量"""
+    store = FrameStore()
+    model = ReceiveLogModel(store, capacity=100)
+    for batch in range(30):
+        model.append_records(append_frames(store, 7, batch * 7))
+        assert model.rowCount() == min(100, (batch + 1) * 7)
+    assert model.row_text(0).endswith("5A 6E EB 01")  # 第110帧
+    model.append_records(append_frames(store, 250))
+    assert model.rowCount() == 100
+    assert model.row_text(0).endswith("5A 96 EB 01")
+
+
+def test_store_eviction():
+    """存储淘汰的记录在下次追加时从头部移除"""
+    store = FrameStore(capacity_frames=50)
+    model = ReceiveLogModel(store, capacity=1000)
+    model.append_records(append_frames(store, 40))
+    model.append_records(append_frames(store, 20, 40), "[省略] 3 条")
+    assert model.rowCount() == 51 and model.row_text(0).endswith("5A 0A EB 01")
+    assert model.row_text(50) == "[省略] 3 条"
+    append_frames(store, 30, 60)  # 未显示的记录也会淘汰已显示的行
+    assert model.row_text(0) == ''
+    model.append_records([])
+    assert model.rowCount() == 51
+    model.append_records(append_frames(store, 1, 90))
+    assert model.rowCount() == 21 and model.row_text(0).endswith("5A 29 EB 01")
+    model.append_records(append_frames(store, 60, 91))  # 批中已被淘汰的记录不再显示
+    assert model.rowCount() == 50 and model.row_text(0).endswith("5A 65 EB 01")
+
+
+def test_rows_and_modes():
+    store = FrameStore()
+    model = ReceiveLogModel(store)
+    seqs = [store.append(1000 * 10**9, DIRECTION_RX, b'AB\r\n'),
+            store.append(1000 * 10**9 + 5 * 10**8, DIRECTION_RX, bytes([0x12, 0x34]))]
+    model.append_records(seqs, "[省略] 3 条")
+    model.append_records([store.append(1001 * 10**9, DIRECTION_TX, bytes([0xA5, 0x00, 0x01]))])
+    assert model.rowCount() == 4
+    assert model.row_text(0).endswith("[接收] 41 42 0D 0A")
+    assert model.row_text(1).endswith(".500] [接收] 12 34")
+    assert model.row_text(2) == "[省略] 3 条"
+    assert model.row_text(3).endswith("[发送] A5 00 01")
+    assert model.data(model.index(0), HtmlRole) is None  # 没有5A/EB时不需要HTML绘制
+    assert model.data(model.index(3), HtmlRole) is None  # 发送行不着色
+
+    model.set_hex_mode(False)
+    assert model.row_text(0).endswith("[接收] AB ")
+    assert model.data(model.index(1), HtmlRole) is None
+    model.set_hex_mode(True)
+    text = model.export_text()
+    assert text.count('\n') == 3 and "41 42 0D 0A" in text and "[省略]" not in text
+
+    model.append_records(append_frames(store, 1))
+    html = model.data(model.index(4), HtmlRole)
+    assert '<span style="color: green;">5A</span>' in html and '<span style="color: red;">EB</span>' in html
+    model.clear()
+    assert model.rowCount() == 0 and len(store) == 4
+
+
+def test_collapsed_repeats():
+    """折叠了重复的记录显示次数和首末时间，只有显示该记录的行被重新绘制"""
+    store = FrameStore()
+    model = ReceiveLogModel(store)
+    seq = store.append(1000 * 10**9, DIRECTION_RX, bytes([0x5A, 0x01]))
+    model.append_records([seq], "[省略] 3 条")
+    changed = []
+    model.dataChanged.connect(lambda first, last: changed.append((first.row(), last.row())))
+    for i in range(1, 100):
+        store.repeat_last(seq, 1000 * 10**9 + i * 10**7)
+    model.refresh_record(seq)
+    assert changed == [(0, 0)]
+    assert model.row_text(0).endswith(".990] [接收] ×100 5A 01")
+    assert "×100 " in model.data(model.index(0), HtmlRole)
+    assert "×100 5A 01\n" in model.export_text()
+    model.refresh_record(seq + 1)  # 未显示的记录
+    assert changed == [(0, 0)]
+
+
+if __name__ == "__main__":
+    test_bounded_rows()
+    test_store_eviction()
+    test_rows_and_modes()
+    test_collapsed_repeats()
+    print("接收区日志测试通过")
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+刷新调度测试
+窗口不可见时定时器停止、重新可见时补齐一次，接收区刷新间隔随帧率变化
+"""
+
+import time
+
+from refresh_governor import FLUSH_INTERVALS, SLOW_INTERVAL, RefreshGovernor, interval_for_rate
+
+
+class FakeWindow:
+    """只提供调度器用到的窗口接口"""
+
+    def __init__(self, visible=True):
+        self.visible = visible
+        self.minimized = False
+
+    def isVisible(self):
+        return self.visible
+
+    def isMinimized(self):
+        return self.minimized
+
+    def window(self):
+        return self
+
+    def windowHandle(self):
+        return None
+
+    def installEventFilter(self, obj):
+        pass
+
+
+class FakeTimer:
+    def __init__(self):
+        self.active = False
+        self.interval = None
+        self.single_shot = False
+
+    def start(self, interval):
+        self.active = True
+        self.interval = interval
+
+    def stop(self):
+        self.active = False
+
+    def isActive(self):
+        return self.active
+
+    def setSingleShot(self, single_shot):
+        self.single_shot = single_shot
+
+
+def test_interval_for_rate():
+    intervals = [interval_for_rate(rate) for rate in (0, 10, 100, 1000, 100000)]
+    assert intervals == sorted(intervals) and intervals[0] == FLUSH_INTERVALS[0][1]
+    assert intervals[-1] == FLUSH_INTERVALS[-1][1]
+
+
+def test_pause_and_resume():
+    governor = RefreshGovernor()
+    window = FakeWindow(visible=False)
+    timer = FakeTimer()
+    resumed = []
+    governor.register('led', window, timer, 100, on_resume=lambda: resumed.append(1))
+    assert not timer.active and not governor.is_active('led')
+
+    window.visible = True
+    governor.update()
+    assert timer.active and timer.interval == 100 and resumed == [1]
+    governor.update()
+    assert resumed == [1]  # 可见性没有变化时不重复补齐
+
+    window.minimized = True
+    governor.update()
+    assert not timer.active and not governor.is_active('led')
+    window.minimized = False
+    governor.update()
+    assert timer.active and resumed == [1, 1]
+
+    # 控件稍后才创建
+    later = {}
+    list_timer = FakeTimer()
+    governor.register('list', lambda: later.get('window'), list_timer, 1000)
+    assert not list_timer.active
+    later['window'] = FakeWindow()
+    governor.update()
+    assert list_timer.active
+
+    governor.stop()
+    window.visible = True
+    governor.update()
+    assert not timer.active and not list_timer.active
+
+
+def test_data_driven_flush():
+    governor = RefreshGovernor()
+    window = FakeWindow()
+    timer = FakeTimer()
+    behind = [False]
+    governor.register('receive', window, timer, data_driven=True, slow=lambda: behind[0])
+    assert timer.single_shot and not timer.active  # 没有数据时不启动
+
+    now = time.monotonic() + 10  # 空闲10秒后的第一帧
+    governor.data_arrived(1, now=now)
+    assert timer.active and timer.interval == interval_for_rate(governor.rate)
+    timer.stop()
+
+    # 高帧率：间隔变长
+    for _ in range(20):
+        now += 0.1
+        governor.data_arrived(500, now=now)
+    assert governor.rate > 2000
+    timer.stop()
+    governor.data_arrived(1, now=now + 0.01)
+    assert timer.interval == FLUSH_INTERVALS[-1][1]
+
+    timer.stop()
+    behind[0] = True
+    governor.data_arrived(1, now=now + 0.02)
+    assert timer.interval == SLOW_INTERVAL
+
+    timer.stop()
+    window.visible = False
+    governor.update()
+    governor.data_arrived(100, now=now + 0.03)
+    assert not timer.active  # 不可见时不刷新
+
+
+if __name__ == "__main__":
+    test_interval_for_rate()
+    test_pause_and_resume()
+    test_data_driven_flush()
+    print("刷新调度测试通过")
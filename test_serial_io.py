@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口收发核心测试（读取测试需要pty，仅Linux/macOS）
+各读取模式收到的数据与发送的完全相同（包括超过环形缓冲区长度和跨越环末尾的写入），stop()立即唤醒阻塞中的读取线程；
+发送按优先级排序并合并小数据包，队列满时丢弃新请求，停止标记总能入队
+"""
+
+import os
+import random
+import struct
+import threading
+import time
+
+import pytest
+import serial
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Windows
+    fcntl = termios = None
+
+from serial_io import SerialReader, SerialWriter
+
+needs_pty = pytest.mark.skipif(not hasattr(os, 'openpty'), reason="需要pty")
+
+
+class NoFilenoPort:
+    """隐藏fileno()的串口，模拟没有文件描述符的平台，读取器退化为阻塞read"""
+
+    def __init__(self, port):
+        self._port = port
+
+    def __getattr__(self, name):
+        if name == 'fileno':
+            raise AttributeError(name)
+        return getattr(self._port, name)
+
+
+class PtyReader:
+    """pty从端上运行的读取线程，收到的数据复制后保存（memoryview只在回调期间有效）"""
+
+    def __init__(self, mode=SerialReader.MODE_EVENT, ring_size=65536, blocking=False, timeout=5):
+        self.master_fd, self.slave_fd = os.openpty()
+        self.port = serial.Serial(os.ttyname(self.slave_fd), baudrate=115200, timeout=timeout)
+        self.chunks = []
+        self.views = 0  # 以环形缓冲区视图交付的次数
+        self.received = 0
+        self._lock = threading.Lock()
+        port = NoFilenoPort(self.port) if blocking else self.port
+        self.reader = SerialReader(port, self.on_data, mode=mode, poll_interval=0.001, wait_timeout=timeout,
+                                   ring_size=ring_size)
+        self.thread = threading.Thread(target=self.reader.run, daemon=True)
+        self.thread.start()
+        time.sleep(0.05)
+
+    def on_data(self, data):
+        if isinstance(data, memoryview):
+            assert data.obj is self.reader.ring
+            self.views += 1
+        with self._lock:
+            self.chunks.append(bytes(data))
+            self.received += len(data)
+
+    def send(self, data, chunk_sizes=(len,), pause=0.0):
+        """分块写入主端，chunk_sizes循环使用"""
+        pos = 0
+        index = 0
+        while pos < len(data):
+            size = chunk_sizes[index % len(chunk_sizes)]
+            size = size(data) if callable(size) else size
+            pos += os.write(self.master_fd, data[pos:pos + size])
+            index += 1
+            if pause:
+                time.sleep(pause)
+
+    def wait_for(self, size, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.received < size and time.monotonic() < deadline:
+            time.sleep(0.005)
+        with self._lock:
+            return b''.join(self.chunks)
+
+    def close(self):
+        self.reader.stop()
+        self.thread.join(2)
+        alive = self.thread.is_alive()
+        self.port.close()
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+        return alive
+
+
+MODES = (
+    pytest.param(dict(mode=SerialReader.MODE_POLL), id='poll'),
+    pytest.param(dict(mode=SerialReader.MODE_EVENT), id='select-ring'),
+    pytest.param(dict(mode=SerialReader.MODE_EVENT, ring_size=0), id='select-bytes'),
+    pytest.param(dict(mode=SerialReader.MODE_EVENT, blocking=True), id='blocking-ring'),
+    pytest.param(dict(mode=SerialReader.MODE_EVENT, blocking=True, ring_size=0), id='blocking-bytes'),
+)
+
+
+@needs_pty
+@pytest.mark.parametrize('options', MODES)
+def test_modes_lose_no_bytes(options):
+    """分多次、不同大小写入的数据全部按顺序收到"""
+    rnd = random.Random(1)
+    data = rnd.randbytes(20000)
+    reader = PtyReader(**options)
+    try:
+        reader.send(data, (1, 26, 7, 300, 1024), pause=0.0005)
+        assert reader.wait_for(len(data)) == data
+    finally:
+        assert not reader.close()
+
+
+@needs_pty
+@pytest.mark.parametrize('options', MODES)
+def test_stop_wakes_blocked_reader(options):
+    """读取线程在select/read中等待（超时5秒）时，stop()使其立即退出"""
+    reader = PtyReader(**options)
+    reader.send(b'\x5A\x01')
+    assert reader.wait_for(2) == b'\x5A\x01'
+    time.sleep(0.05)  # 进入等待
+    start = time.monotonic()
+    assert not reader.close()
+    assert time.monotonic() - start < 1.0
+    assert not reader.reader.running
+
+
+class PipePort:
+    """以管道代替串口，in_waiting为管道中可读的字节数"""
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+
+    @property
+    def in_waiting(self):
+        return struct.unpack('i', fcntl.ioctl(self.read_fd, termios.FIONREAD, b'\0\0\0\0'))[0]
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+@needs_pty
+def test_read_burst_wrap():
+    """环形缓冲区末尾放不下时从头写入，超过环长度的数据分多次交付，视图指向环形缓冲区"""
+    port = PipePort()
+    reader = SerialReader(port, None, ring_size=64)
+    try:
+        os.write(port.write_fd, bytes(range(40)))
+        view = reader._read_burst(port.read_fd)
+        assert view.obj is reader.ring and bytes(view) == bytes(range(40)) and reader._write_pos == 40
+
+        # 末尾剩24字节，30字节从头写入
+        os.write(port.write_fd, bytes(range(100, 130)))
+        view = reader._read_burst(port.read_fd)
+        assert bytes(view) == bytes(range(100, 130)) and reader.ring[:30] == bytes(range(100, 130))
+        assert reader._write_pos == 30
+
+        # 超过环长度：每次最多交付整个环，剩余部分下次从头写入
+        data = bytes(range(200))
+        os.write(port.write_fd, data)
+        parts = []
+        while port.in_waiting:
+            view = reader._read_burst(port.read_fd)
+            assert 0 < len(view) <= 64 and view.obj is reader.ring
+            parts.append(bytes(view))
+        assert b''.join(parts) == data and [len(part) for part in parts] == [64, 64, 64, 8]
+
+        # 放得下时接着上次的位置写入
+        os.write(port.write_fd, b'abc')
+        start = reader._write_pos
+        assert bytes(reader._read_burst(port.read_fd)) == b'abc' and reader._write_pos == start + 3
+    finally:
+        port.close()
+
+
+@needs_pty
+@pytest.mark.parametrize('blocking', (False, True), ids=('select', 'blocking'))
+@pytest.mark.parametrize('chunk_sizes', ((1000,), (50, 31, 64, 1), (97,)), ids=('larger', 'mixed', 'straddle'))
+def test_small_ring(blocking, chunk_sizes):
+    """环形缓冲区只有64字节：单次写入大于环、写入跨越环末尾时，收到的数据与发送的完全相同"""
+    data = random.Random(3).randbytes(30000)
+    reader = PtyReader(ring_size=64, blocking=blocking)
+    try:
+        reader.send(data, chunk_sizes, pause=0.0002)
+        assert reader.wait_for(len(data)) == data
+        assert reader.views == len(reader.chunks)  # 全部以环形缓冲区的视图交付
+    finally:
+        assert not reader.close()
+
+
+@needs_pty
+def test_benchmark_smoke():
+    """基准测试脚本的测量函数在pty上能收到全部数据"""
+    import serial_benchmark
+    latencies, _, stop_ms = serial_benchmark.measure_latency(SerialReader.MODE_EVENT, 20, 1, 0.01)
+    assert len(latencies) == 20 and stop_ms < 1000
+    rate, callbacks, _ = serial_benchmark.measure_throughput(4096, 'frames', 2000, False)
+    assert rate > 0 and callbacks > 0
+
+
+class FakePort:
+    """记录每次write的假串口"""
+
+    def __init__(self):
+        self.is_open = True
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return len(data)
+
+
+def drain(writer, timeout=2.0):
+    """在线程中运行发送循环直到队列清空，然后停止"""
+    thread = threading.Thread(target=writer.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while writer.queue_depth and time.monotonic() < deadline:
+        time.sleep(0.005)
+    time.sleep(0.02)  # 最后一次write完成
+    writer.stop()
+    thread.join(2)
+    assert not thread.is_alive() and not writer.running
+
+
+def test_writer_priority_and_coalescing():
+    """输出更新先于手动发送、手动发送先于批量发送；同优先级连续的小包合并，合并后不超过coalesce_bytes"""
+    port = FakePort()
+    written = []
+    writer = SerialWriter(port, on_written=written.append)
+    for data, priority in ((b'b1', SerialWriter.PRIORITY_BULK), (b'n1', SerialWriter.PRIORITY_NORMAL),
+                           (b'o1', SerialWriter.PRIORITY_OUTPUT), (b'b2', SerialWriter.PRIORITY_BULK),
+                           (b'n2', SerialWriter.PRIORITY_NORMAL), (b'o2', SerialWriter.PRIORITY_OUTPUT)):
+        assert writer.submit(data, priority)
+    drain(writer)
+    assert port.writes == [b'o1o2', b'n1n2', b'b1b2']
+    assert written == [4, 4, 4]
+
+    port = FakePort()
+    writer = SerialWriter(port, coalesce_bytes=256)
+    chunks = [bytes([i]) * size for i, size in enumerate((100, 100, 100, 56, 300, 10, 246, 1))]
+    for chunk in chunks:
+        writer.submit(chunk)
+    drain(writer)
+    assert [len(data) for data in port.writes] == [200, 156, 300, 256, 1]
+    assert b''.join(port.writes) == b''.join(chunks)
+
+
+def test_writer_queue_limit():
+    """队列中有max_queue个请求时新请求被丢弃并计数，多个线程同时提交时也不超过上限"""
+    writer = SerialWriter(FakePort(), max_queue=3)
+    assert all(writer.submit(b'x') for _ in range(3))
+    assert not writer.submit(b'y', SerialWriter.PRIORITY_OUTPUT)
+    assert writer.dropped_count == 1 and writer.queue_depth == 3
+
+    writer = SerialWriter(FakePort(), max_queue=50)
+    accepted = []
+    barrier = threading.Barrier(8)
+
+    def submit_many():
+        barrier.wait()
+        accepted.append(sum(writer.submit(b'x') for _ in range(100)))
+
+    threads = [threading.Thread(target=submit_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(accepted) == 50 and writer.queue_depth == 50 and writer.dropped_count == 750
+
+
+def test_writer_stop():
+    """停止标记在队列已满时也能入队并先于其他请求处理；等待请求的发送线程被立即唤醒"""
+    port = FakePort()
+    writer = SerialWriter(port, max_queue=2)
+    writer.submit(b'a', SerialWriter.PRIORITY_OUTPUT)
+    writer.submit(b'b')
+    writer.stop()
+    assert writer.queue_depth == 2
+    writer.run()  # 立即退出，不再发送
+    assert port.writes == [] and not writer.running
+
+    writer = SerialWriter(port)
+    thread = threading.Thread(target=writer.run, daemon=True)
+    thread.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    writer.stop()
+    thread.join(1)
+    assert not thread.is_alive() and time.monotonic() - start < 0.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串口读取线程批量发送测试
+达到条数上限或时间窗口到期时整批发送，批次等待期间缩短读取等待时间，
+待处理批次计数随发送和batch_done()增减
+"""
+
+import os
+import time
+
+import pytest
+import serial
+from PyQt5.QtCore import Qt
+
+import serial_threads
+from frame_assembler import FrameAssembler
+from serial_threads import SerialThread
+
+FRAME = bytes([0x5A]) + bytes(range(24)) + b'\x01'
+
+
+class Clock:
+    """替换time.monotonic，测试中手动推进时间"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_thread(monkeypatch=None, **kwargs):
+    """不启动读取循环，直接调用handle_data/flush_batch；批次在调用线程中同步收集"""
+    thread = SerialThread(None, **kwargs)
+    batches = []
+    thread.batch_received.connect(batches.append, Qt.DirectConnection)
+    clock = None
+    if monkeypatch is not None:
+        clock = Clock()
+        monkeypatch.setattr(serial_threads.time, 'monotonic', clock)
+    return thread, batches, clock
+
+
+def test_batch_max_items():
+    """条数达到batch_max_items时立即发送，不等时间窗口"""
+    thread, batches, _ = make_thread(batch_interval=10.0, batch_max_items=3)
+    thread.handle_data(b'a')
+    thread.handle_data(memoryview(b'b'))
+    assert batches == [] and len(thread._batch) == 2
+    thread.handle_data(b'c')
+    assert [[data for _, data in batch] for batch in batches] == [[b'a', b'b', b'c']]
+    assert thread._batch == [] and thread._batch_deadline is None
+
+    # 一次读取组出多帧时，超过上限的部分也在同一批中发送
+    thread, batches, _ = make_thread(batch_interval=10.0, batch_max_items=2,
+                                     frame_assembler=FrameAssembler())
+    thread.handle_data(FRAME * 3)
+    assert len(batches) == 1 and [data for _, data in batches[0]] == [FRAME] * 3
+
+
+def test_batch_interval(monkeypatch):
+    """时间窗口从批次中第一条数据开始计时，到期后收到的数据使整批发送"""
+    thread, batches, clock = make_thread(monkeypatch, batch_interval=0.01, batch_max_items=100)
+    thread.handle_data(b'a')
+    assert thread._batch_deadline == pytest.approx(100.01)
+    clock.now += 0.004
+    thread.handle_data(b'b')
+    assert batches == [] and thread._batch_deadline == pytest.approx(100.01)  # 不随新数据顺延
+    clock.now += 0.006
+    thread.handle_data(b'c')
+    assert len(batches) == 1 and [data for _, data in batches[0]] == [b'a', b'b', b'c']
+    timestamps = [timestamp for timestamp, _ in batches[0]]
+    assert timestamps == sorted(timestamps)
+
+    # 窗口为0时每次读取后立即发送
+    thread, batches, _ = make_thread(batch_interval=0)
+    thread.handle_data(b'a')
+    thread.handle_data(b'b')
+    assert [[data for _, data in batch] for batch in batches] == [[b'a'], [b'b']]
+
+    # 不完整的帧不产生数据，也不开始计时
+    thread, batches, _ = make_thread(frame_assembler=FrameAssembler())
+    thread.handle_data(FRAME[:10])
+    assert batches == [] and thread._batch_deadline is None
+    thread.handle_data(FRAME[10:])
+    assert thread._batch_deadline is not None and [data for _, data in thread._batch] == [FRAME]
+
+
+def test_shortened_wait(monkeypatch):
+    """有待发送的批次时读取等待时间缩短为窗口剩余时间，发送后恢复空闲等待时间"""
+    thread, batches, clock = make_thread(monkeypatch, batch_interval=0.05, batch_max_items=100)
+    idle = thread.reader.wait_timeout
+    assert idle == thread._idle_timeout and idle > 0.05
+    thread.handle_data(b'a')
+    assert thread.reader.wait_timeout == pytest.approx(0.05)
+    clock.now += 0.03
+    thread.handle_data(b'b')
+    assert thread.reader.wait_timeout == pytest.approx(0.02)
+
+    # 等待超时后由on_idle发送
+    thread.reader.on_idle()
+    assert len(batches) == 1 and thread.reader.wait_timeout == idle
+    thread.reader.on_idle()  # 没有数据时不发送空批次
+    assert len(batches) == 1
+
+
+def test_pending_batches():
+    """每发送一批pending_batches加1，batch_done()减1且不小于0，max_pending_batches记录峰值"""
+    thread, batches, _ = make_thread(batch_interval=0)
+    for data in (b'a', b'b', b'c'):
+        thread.handle_data(data)
+    assert (thread.pending_batches, thread.max_pending_batches) == (3, 3)
+    thread.batch_done()
+    thread.batch_done()
+    assert (thread.pending_batches, thread.max_pending_batches) == (1, 3)
+    thread.handle_data(b'd')
+    assert (thread.pending_batches, thread.max_pending_batches) == (2, 3)
+    for _ in range(3):
+        thread.batch_done()
+    assert (thread.pending_batches, thread.max_pending_batches) == (0, 3)
+    assert len(batches) == 4
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="需要pty")
+def test_window_flush_on_pty():
+    """读取线程空闲等待5秒时，批次仍在时间窗口到期后立即发送"""
+    master_fd, slave_fd = os.openpty()
+    port = serial.Serial(os.ttyname(slave_fd), timeout=5)
+    thread = SerialThread(port, batch_interval=0.05, batch_max_items=100)
+    thread.reader.wait_timeout = thread._idle_timeout = 5.0
+    received = []
+    thread.batch_received.connect(lambda batch: received.append((time.monotonic(), batch)), Qt.DirectConnection)
+    try:
+        thread.start()
+        time.sleep(0.05)
+        sent = time.monotonic()
+        os.write(master_fd, b'\x01\x02\x03')
+        deadline = sent + 2.0
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert received, "批次未在窗口到期后发送"
+        flushed, batch = received[0]
+        assert b''.join(data for _, data in batch) == b'\x01\x02\x03'
+        assert 0.04 <= flushed - sent < 1.0
+        assert thread.pending_batches == 1
+    finally:
+        thread.stop()
+        port.close()
+        os.close(master_fd)
+        os.close(slave_fd)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-q"])